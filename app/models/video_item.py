@@ -0,0 +1,38 @@
+class VideoItem:
+    """
+    YouTube検索結果1件分のレコード
+
+    検索サービス・リストモデル・メインウィンドウで共有する。
+    描画のたびに辞書を組み立てずに済むよう、属性は __slots__ で固定している。
+    """
+    __slots__ = (
+        'video_id',
+        'title',
+        'duration',
+        'url',
+        'thumbnail_url',
+        'thumbnail_preview_url',
+        'description',
+        'thumbnail',
+        'thumbnail_is_preview',
+    )
+
+    def __init__(self, video_id: str, title: str = '', duration: str = '', url: str = '',
+                 thumbnail_url: str = '', thumbnail_preview_url: str = '', description: str = '',
+                 thumbnail=None, thumbnail_is_preview: bool = False):
+        self.video_id = video_id
+        self.title = title
+        self.duration = duration
+        self.url = url or f"https://www.youtube.com/watch?v={video_id}"
+        self.thumbnail_url = thumbnail_url
+        self.thumbnail_preview_url = thumbnail_preview_url
+        self.description = description
+        self.thumbnail = thumbnail  # GUIスレッドで設定される QPixmap（未取得なら None）
+        self.thumbnail_is_preview = thumbnail_is_preview
+
+    def has_thumbnail(self) -> bool:
+        """表示可能なサムネイルを持っているか"""
+        return self.thumbnail is not None and not self.thumbnail.isNull()
+
+    def __repr__(self):
+        return f"VideoItem(video_id={self.video_id!r}, title={self.title!r}, duration={self.duration!r})"
@@ -48,6 +48,30 @@ class ConfigService:
             "always_on_top": False,
             "bring_to_back_delay_s": 3,
             "player_port": 8080,
+            "player_command_max_age_s": 5,
+            "player_output_mode": "browser",
+            "player_pool_size": 4,
+            "player_recycle_after": 50,
+            "warm_top_k": 2,
+            "play_at_lead_ms": 500,
+            "position_sync_enabled": False,
+            "position_sync_leader": "",
+            "preload_quality": "auto",
+            "preload_deadline_ms": 4000,
+            "preload_max_quality": "hd1080",
+            "auto_preload_policy": "confident",
+            "auto_preload_min_score": 0.5,
+            "lookahead_tracks": 3,
+            "prefetch_quota_units": 1010,
+            "prefetch_thumbnails_per_track": 5,
+            "search_cache_ttl_h": 168,
+            "set_prep_playlists": [],
+            "set_prep_concurrency": 4,
+            "set_prep_requests_per_s": 2.0,
+            "set_prep_quota_units": 8000,
+            "osc_enabled": False,
+            "osc_host": "127.0.0.1",
+            "osc_port": 9000,
             "youtube_api_key": "",
             "youtube_search_template": "%tracktitle% %comment%",
             "enable_logging": True
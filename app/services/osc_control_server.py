@@ -0,0 +1,303 @@
+"""
+OSC（UDP）コントロール受信サービス
+照明卓やコントローラーブリッジから送られる OSC メッセージを、ホットキーと同じ操作にマッピングする
+"""
+
+import socket
+import struct
+import threading
+import time
+from PySide6.QtCore import QObject, Signal
+
+from app.utils.logger import debug
+
+
+# OSCアドレス -> 発行するシグナル名（HotkeyService と同じ名前）
+OSC_ADDRESS_MAP = {
+    "/vj/move/up": "move_up_triggered",
+    "/vj/move/down": "move_down_triggered",
+    "/vj/move/left": "move_left_triggered",
+    "/vj/move/right": "move_right_triggered",
+    "/vj/preload": "preload_triggered",
+    "/vj/play": "play_triggered",
+    "/vj/search": "search_triggered",
+    "/vj/rewind": "rewind_triggered",
+    "/vj/forward": "forward_triggered",
+}
+
+# 時刻指定の再生（引数は遅延ミリ秒。バンドルのタイムタグがあればその時刻に切り替える）
+OSC_PLAY_AT_ADDRESS = "/vj/play_at"
+
+# OSC のタイムタグ（1900年起点）と Unix 時刻の差（秒）
+NTP_UNIX_OFFSET = 2208988800
+
+# 1パケットの上限（UDPの最大ペイロード）
+MAX_PACKET_SIZE = 65507
+
+
+class OscParseError(Exception):
+    """OSCパケットの形式が不正"""
+    pass
+
+
+def _read_padded_string(data: bytes, offset: int):
+    """NUL終端・4バイト境界のOSC文字列を読み取り (文字列, 次のオフセット) を返す"""
+    end = data.find(b'\0', offset)
+    if end < 0:
+        raise OscParseError("unterminated string")
+    text = data[offset:end].decode('utf-8', errors='replace')
+    return text, (end + 4) & ~3
+
+
+def parse_osc_message(data: bytes):
+    """OSCメッセージを (アドレス, 引数リスト) に変換する
+
+    対応する型タグ: i, f, s, b, h, d, T, F, N, I
+    """
+    address, offset = _read_padded_string(data, 0)
+    if not address.startswith('/'):
+        raise OscParseError(f"invalid address: {address!r}")
+    if offset >= len(data):
+        # 型タグ文字列を省略した古い送信元
+        return address, []
+
+    tags, offset = _read_padded_string(data, offset)
+    if not tags.startswith(','):
+        raise OscParseError(f"invalid type tags: {tags!r}")
+
+    args = []
+    try:
+        for tag in tags[1:]:
+            if tag == 'i':
+                args.append(struct.unpack_from('>i', data, offset)[0])
+                offset += 4
+            elif tag == 'f':
+                args.append(struct.unpack_from('>f', data, offset)[0])
+                offset += 4
+            elif tag == 'h':
+                args.append(struct.unpack_from('>q', data, offset)[0])
+                offset += 8
+            elif tag == 'd':
+                args.append(struct.unpack_from('>d', data, offset)[0])
+                offset += 8
+            elif tag == 's':
+                value, offset = _read_padded_string(data, offset)
+                args.append(value)
+            elif tag == 'b':
+                size = struct.unpack_from('>i', data, offset)[0]
+                offset += 4
+                args.append(data[offset:offset + size])
+                offset = (offset + size + 3) & ~3
+            elif tag == 'T':
+                args.append(True)
+            elif tag == 'F':
+                args.append(False)
+            elif tag in ('N', 'I'):
+                args.append(None)
+            else:
+                raise OscParseError(f"unsupported type tag: {tag!r}")
+    except struct.error as e:
+        raise OscParseError(f"truncated argument: {e}")
+    return address, args
+
+
+def parse_timetag(data: bytes, offset: int):
+    """OSCのタイムタグを Unix 時刻（秒）に変換する。即時（値 1）の場合は None"""
+    try:
+        seconds, fraction = struct.unpack_from('>II', data, offset)
+    except struct.error as e:
+        raise OscParseError(f"truncated timetag: {e}")
+    if seconds == 0 and fraction <= 1:
+        return None
+    return seconds - NTP_UNIX_OFFSET + fraction / 2 ** 32
+
+
+def iter_osc_messages(data: bytes, timetag=None):
+    """OSCパケット（メッセージまたはバンドル）に含まれるメッセージを (アドレス, 引数, タイムタグ) で順に返す
+
+    メッセージは受信した時点で即座に処理する。タイムタグ（Unix 時刻の秒、即時なら None）は
+    /vj/play_at の切り替え時刻にだけ使う。
+    """
+    if data.startswith(b'#bundle\0'):
+        bundle_timetag = parse_timetag(data, 8)
+        offset = 16  # "#bundle\0" + タイムタグ(8バイト)
+        while offset + 4 <= len(data):
+            size = struct.unpack_from('>i', data, offset)[0]
+            offset += 4
+            if size <= 0 or offset + size > len(data):
+                raise OscParseError("invalid bundle element size")
+            yield from iter_osc_messages(data[offset:offset + size], bundle_timetag)
+            offset += size
+    else:
+        address, args = parse_osc_message(data)
+        yield address, args, timetag
+
+
+def is_press(args) -> bool:
+    """ボタンの押下として扱うか判定
+
+    TouchOSC などは押下で 1、離したときに 0 を送るため、先頭引数が 0/False のときは無視する。
+    引数なしのメッセージは押下として扱う。
+    """
+    if not args:
+        return True
+    first = args[0]
+    if isinstance(first, (bool, int, float)):
+        return bool(first)
+    return True
+
+
+class OscControlServer(QObject):
+    """OSCメッセージを受信してホットキーと同じシグナルを発行するUDPサーバー
+
+    シグナルは受信スレッドから発行されるため、GUIスレッドのスロットにはキュー経由で届く。
+    """
+
+    move_up_triggered = Signal()
+    move_down_triggered = Signal()
+    move_left_triggered = Signal()
+    move_right_triggered = Signal()
+    preload_triggered = Signal()
+    play_triggered = Signal()
+    search_triggered = Signal()
+    rewind_triggered = Signal()
+    forward_triggered = Signal()
+    # 時刻指定の再生。切り替え時刻（サーバー時計の Unix ミリ秒、0 なら既定の猶予後）
+    play_at_triggered = Signal(float)
+
+    def __init__(self, host='127.0.0.1', port=9000):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.server_thread = None
+        self.is_running = False
+        self._stop_event = threading.Event()
+
+        # 統計（/status やデバッグ表示用）
+        self.received = 0
+        self.dispatched = 0
+        self.ignored = 0
+        self.last_address = None
+        self.last_received_at = 0.0
+
+    def start(self):
+        """受信開始"""
+        if self.is_running:
+            print(f"OscControlServer: Already listening on {self.host}:{self.port}")
+            return
+
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+            # 停止要求を確認するためのタイムアウト
+            self.sock.settimeout(0.5)
+            self._stop_event.clear()
+            self.is_running = True
+
+            self.server_thread = threading.Thread(target=self._run_server, daemon=True)
+            self.server_thread.start()
+
+            print(f"OscControlServer: Listening on udp://{self.host}:{self.port}")
+
+        except Exception as e:
+            print(f"OscControlServer: Failed to start: {e}")
+            self.is_running = False
+            if self.sock:
+                self.sock.close()
+                self.sock = None
+
+    def _run_server(self):
+        """受信ループ"""
+        while not self._stop_event.is_set():
+            try:
+                data, address = self.sock.recvfrom(MAX_PACKET_SIZE)
+            except socket.timeout:
+                continue
+            except OSError:
+                # 停止時にソケットが閉じられた
+                break
+
+            self.received += 1
+            self.last_received_at = time.time()
+            try:
+                for osc_address, args, timetag in iter_osc_messages(data):
+                    self._dispatch(osc_address, args, address, timetag)
+            except OscParseError as e:
+                self.ignored += 1
+                debug(f"Ignored malformed packet from {address[0]}: {e}", "OscControlServer")
+
+    def _dispatch(self, osc_address, args, sender=None, timetag=None):
+        """OSCアドレスに対応するシグナルを発行"""
+        if osc_address.rstrip('/').lower() == OSC_PLAY_AT_ADDRESS:
+            self._dispatch_play_at(osc_address, args, timetag)
+            return
+        signal_name = OSC_ADDRESS_MAP.get(osc_address.rstrip('/').lower())
+        if signal_name is None:
+            self.ignored += 1
+            debug(f"Unknown address: {osc_address} {args}", "OscControlServer")
+            return
+        if not is_press(args):
+            return
+
+        self.dispatched += 1
+        self.last_address = osc_address
+        debug(f"{osc_address} {args} -> {signal_name}", "OscControlServer")
+        getattr(self, signal_name).emit()
+
+    def _dispatch_play_at(self, osc_address, args, timetag):
+        """/vj/play_at: タイムタグ > 引数（遅延ミリ秒）> 既定の猶予 の順で切り替え時刻を決める"""
+        if timetag is not None:
+            at_ms = timetag * 1000
+        elif args and isinstance(args[0], (int, float)) and not isinstance(args[0], bool):
+            at_ms = time.time() * 1000 + max(0.0, float(args[0]))
+        else:
+            at_ms = 0.0
+
+        self.dispatched += 1
+        self.last_address = osc_address
+        debug(f"{osc_address} {args} timetag={timetag} -> play_at_triggered({at_ms:.0f})", "OscControlServer")
+        self.play_at_triggered.emit(at_ms)
+
+    def stop(self):
+        """受信停止"""
+        if not self.is_running:
+            return
+
+        try:
+            self._stop_event.set()
+            if self.sock:
+                self.sock.close()
+                self.sock = None
+
+            if self.server_thread and self.server_thread.is_alive():
+                self.server_thread.join(timeout=2)
+
+            self.is_running = False
+            print("OscControlServer: Stopped")
+
+        except Exception as e:
+            print(f"OscControlServer: Error stopping: {e}")
+
+
+# グローバルインスタンス
+osc_server = None
+
+
+def start_osc_server(host='127.0.0.1', port=9000):
+    """OSCサーバーを起動"""
+    global osc_server
+    if osc_server is None:
+        osc_server = OscControlServer(host=host, port=port)
+    osc_server.host = host
+    osc_server.port = port
+    osc_server.start()
+    return osc_server
+
+
+def stop_osc_server():
+    """OSCサーバーを停止"""
+    global osc_server
+    if osc_server:
+        osc_server.stop()
+        osc_server = None
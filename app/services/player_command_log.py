@@ -0,0 +1,449 @@
+"""
+プレイヤーコマンドの共有ログ
+
+送信したコマンドを連番付きで1本のログに積み、接続しているプレイヤー（出力画面）ごとに
+カーソルを持たせる。各クライアントは自分のカーソル以降のコマンドをすべて受け取るため、
+プロジェクターとLEDウォールのように複数の画面を開いても、全画面が同じコマンドを受信する。
+
+配信時には未配信分をまとめて1バッチにし、置き換えられたコマンド（後続の PRELOAD / PLAY / PLAY_AT に
+上書きされたもの）を捨て、連続するシークは合算する。古すぎるコマンドは配信しない。
+プレイヤーはバッチの末尾連番を ack として返し、ack のない配信は再送する。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+
+# プレイヤーの状態スナップショットとして保持する項目
+SNAPSHOT_FIELDS = ('currentVideoId', 'currentPlayer', 'playing', 'currentTime', 'nextVideoId', 'nextPlayer', 'nextReady', 'timestamp')
+
+# シークコマンドと移動方向
+SEEK_DIRECTIONS = {'FORWARD': 1, 'REWIND': -1}
+
+# 動画を切り替えるコマンド（PLAY_AT は時刻指定の PLAY。統合では同じものとして扱う）
+PLAY_COMMANDS = ('PLAY', 'PLAY_AT')
+
+# 最後の1件だけが意味を持つコマンド
+LAST_ONLY_COMMANDS = ('PRELOAD_MANY', 'SYNC')
+
+
+def _seek_delta(command: dict) -> float:
+    """シークコマンドの移動量（秒、符号付き）"""
+    try:
+        seconds = float(command.get('videoId') or 10)
+    except (TypeError, ValueError):
+        seconds = 10.0
+    return SEEK_DIRECTIONS[command.get('cmd')] * seconds
+
+
+def _merge_seeks(first: dict, second: dict):
+    """連続する2つのシークを1つにまとめる（相殺して0秒になった場合は None）"""
+    total = _seek_delta(first) + _seek_delta(second)
+    if abs(total) < 1e-6:
+        return None
+    merged = dict(second)
+    merged['cmd'] = 'FORWARD' if total > 0 else 'REWIND'
+    merged['videoId'] = f"{abs(total):g}"
+    return merged
+
+
+def coalesce_commands(commands: List[dict]) -> List[dict]:
+    """未配信コマンドのうち、後続のコマンドで意味がなくなったものを取り除く
+
+    - 最後の PLAY より前の PLAY とシークは捨てる（直後に別の動画へ切り替わるため。PLAY_AT も PLAY として扱う）
+    - 最後の PLAY より前の PRELOAD は、その PLAY と同じ動画の最後の1件だけ残す
+    - 最後の PLAY より後の PRELOAD は最後の1件だけ残す
+    - PRELOAD_MANY（候補の先読み）と SYNC（再生位置の同期）は最後の1件だけ残す
+    - 連続するシークは移動量を合算する
+    """
+    last_play = max((i for i, c in enumerate(commands) if c.get('cmd') in PLAY_COMMANDS), default=-1)
+    play_video_id = commands[last_play].get('videoId') if last_play >= 0 else None
+    last_preload_for_play = max(
+        (i for i, c in enumerate(commands[:max(last_play, 0)])
+         if c.get('cmd') == 'PRELOAD' and c.get('videoId') == play_video_id),
+        default=-1
+    )
+    last_preload = max(
+        (i for i, c in enumerate(commands) if c.get('cmd') == 'PRELOAD' and i > last_play),
+        default=-1
+    )
+    last_of_kind = {}
+    for i, c in enumerate(commands):
+        if c.get('cmd') in LAST_ONLY_COMMANDS:
+            last_of_kind[c.get('cmd')] = i
+
+    result = []
+    for i, command in enumerate(commands):
+        cmd = command.get('cmd')
+        if cmd in LAST_ONLY_COMMANDS and i != last_of_kind[cmd]:
+            continue
+        if i < last_play:
+            if cmd in PLAY_COMMANDS or cmd in SEEK_DIRECTIONS:
+                continue
+            if cmd == 'PRELOAD' and i != last_preload_for_play:
+                continue
+        elif cmd == 'PRELOAD' and i != last_preload:
+            continue
+
+        if cmd in SEEK_DIRECTIONS and result and result[-1].get('cmd') in SEEK_DIRECTIONS:
+            merged = _merge_seeks(result[-1], command)
+            if merged is None:
+                result.pop()
+            else:
+                result[-1] = merged
+            continue
+        result.append(command)
+    return result
+
+
+class PlayerClient:
+    """接続しているプレイヤー1つ分の状態"""
+
+    def __init__(self, client_id: str, cursor: int):
+        self.client_id = client_id
+        self.cursor = cursor  # 配信済みの最後の連番
+        self.transport = None  # 'websocket' / 'poll'
+        self.address = None
+        self.connections = 0  # 現在の接続数（WebSocket）
+        self.connected_at = time.time()
+        self.last_seen = time.time()
+        self.delivered = 0
+        # ack（プレイヤーが処理済みの末尾連番）。ack を返すクライアントだけ再送対象にする
+        self.acked = cursor
+        self.acks_enabled = False
+        self.last_sent_at = 0.0
+        self.retransmits = 0
+        self.last_state = None
+        self.last_video_id = None
+        self.last_feedback_at = None
+        # プレイヤーが報告した直近の状態スナップショット（A/B の動画と準備状態）
+        self.snapshot = None
+        # プレイヤーが推定したサーバー時計とのずれ（ハートビートで報告される）
+        self.clock = None
+        # PLAY_AT の予定時刻と実際の切り替え時刻の差（ミリ秒、直近分）
+        self.play_at_offsets = deque(maxlen=32)
+        # 再生位置の同期: リーダーとのずれ（ミリ秒、直近分）と補正の回数
+        self.drift_samples = deque(maxlen=120)
+        self.sync_nudges = 0
+        self.sync_seeks = 0
+        # ハートビートで報告されたリソースの状況（JSヒープ・DOMノード数など）
+        self.resources = None
+
+    def to_dict(self, head_seq: int) -> dict:
+        """/status 用の辞書を返す"""
+        return {
+            "client_id": self.client_id,
+            "transport": self.transport,
+            "address": self.address,
+            "connected": self.connections > 0 or (time.time() - self.last_seen) < 30,
+            "pending": max(0, head_seq - self.cursor),
+            "delivered": self.delivered,
+            "acked": self.acked if self.acks_enabled else None,
+            "retransmits": self.retransmits,
+            "last_state": self.last_state,
+            "last_video_id": self.last_video_id,
+            "last_seen_s": round(time.time() - self.last_seen, 1),
+            "last_feedback_s": round(time.time() - self.last_feedback_at, 1) if self.last_feedback_at else None,
+            "snapshot": self.snapshot,
+            "clock": self.clock,
+            "play_at": self._play_at_stats(),
+            "sync": self._sync_stats(),
+            "resources": self.resources,
+        }
+
+    def _sync_stats(self):
+        """再生位置の同期のずれの統計（フォロワーとして SYNC を受けた出力のみ）"""
+        if not self.drift_samples:
+            return None
+        ordered = sorted(abs(drift) for drift in self.drift_samples)
+        return {
+            "samples": len(ordered),
+            "last_drift_ms": self.drift_samples[-1],
+            "p50_abs_ms": ordered[(len(ordered) - 1) // 2],
+            "p95_abs_ms": ordered[int((len(ordered) - 1) * 0.95)],
+            "max_abs_ms": ordered[-1],
+            "nudges": self.sync_nudges,
+            "seeks": self.sync_seeks,
+        }
+
+    def _play_at_stats(self):
+        """PLAY_AT の切り替え時刻のずれの統計（絶対値のミリ秒）"""
+        if not self.play_at_offsets:
+            return None
+        ordered = sorted(abs(offset) for offset in self.play_at_offsets)
+        return {
+            "count": len(ordered),
+            "last_ms": self.play_at_offsets[-1],
+            "p50_abs_ms": ordered[(len(ordered) - 1) // 2],
+            "max_abs_ms": ordered[-1],
+        }
+
+
+class PlayerCommandLog:
+    """連番付きコマンドログとクライアントごとのカーソル（スレッドセーフ）"""
+
+    # 最後のアクセスからこの秒数を超えたクライアントは一覧から外す
+    CLIENT_EXPIRE_SECONDS = 300
+    # 配信後この秒数以内に ack がなければ再送する
+    ACK_TIMEOUT_SECONDS = 1.5
+
+    def __init__(self, max_entries: int = 256, max_age: float = 5.0):
+        self._entries = deque(maxlen=max_entries)
+        self._next_seq = 1
+        # これより古いコマンドは配信しない（秒）
+        self.max_age = max_age
+        # プロセスごとの識別子。アプリ再起動で連番が戻ったことをプレイヤーが検知するために使う
+        self.epoch = str(int(time.time() * 1000))
+        self.dropped_stale = 0
+        self.coalesced = 0
+        self._clients: Dict[str, PlayerClient] = {}
+        self._condition = threading.Condition()
+        self.shutting_down = False
+        # いずれかのクライアントが最後にアクセスした時刻（プレイヤー起動済み判定用）
+        self.last_activity = 0.0
+        # 追加されたコマンドを直接受け取るリスナー（アプリ内出力など、HTTP を経由しない配信先）
+        self._listeners = []
+
+    @property
+    def head_seq(self) -> int:
+        """最後に追加したコマンドの連番"""
+        return self._next_seq - 1
+
+    def append(self, command: dict) -> int:
+        """コマンドを追加して待機中のクライアントを起こす。付与した連番を返す"""
+        with self._condition:
+            seq = self._next_seq
+            self._next_seq += 1
+            entry = dict(command, seq=seq)
+            entry.setdefault('timestamp', time.time())
+            self._entries.append(entry)
+            self._condition.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(dict(entry))
+            except Exception as e:
+                print(f"PlayerCommandLog: Listener error: {e}")
+        return seq
+
+    def add_listener(self, callback):
+        """コマンド追加時に呼ばれるコールバックを登録（append を呼んだスレッドで呼ばれる）"""
+        with self._condition:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """add_listener で登録したコールバックを解除"""
+        with self._condition:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def register(self, client_id: str, transport: str = None, address: str = None) -> PlayerClient:
+        """クライアントを登録（既存なら状態を更新）して返す
+
+        新規クライアントは現在の末尾から受信を始め、過去のコマンドは再生しない。
+        再接続したクライアントは前回のカーソルから続きを受け取る。
+        """
+        with self._condition:
+            client = self._clients.get(client_id)
+            if client is None:
+                client = PlayerClient(client_id, self.head_seq)
+                self._clients[client_id] = client
+            if transport:
+                client.transport = transport
+            if address:
+                client.address = address
+            client.last_seen = self.last_activity = time.time()
+            return client
+
+    def connect(self, client_id: str, transport: str, address: str = None) -> PlayerClient:
+        """常時接続（WebSocket）の開始を記録"""
+        client = self.register(client_id, transport, address)
+        with self._condition:
+            client.connections += 1
+            # 前回の接続で ack されなかった分は再送する
+            if client.acks_enabled and client.acked < client.cursor:
+                client.cursor = client.acked
+                client.retransmits += 1
+        return client
+
+    def disconnect(self, client_id: str):
+        """常時接続の終了を記録し、そのクライアントの待機を解除する"""
+        with self._condition:
+            client = self._clients.get(client_id)
+            if client:
+                client.connections = max(0, client.connections - 1)
+                client.last_seen = time.time()
+            self._condition.notify_all()
+
+    def _pending_locked(self, client: PlayerClient) -> List[dict]:
+        return [entry for entry in self._entries if entry['seq'] > client.cursor]
+
+    def _batch_locked(self, client: PlayerClient) -> Tuple[List[dict], int]:
+        """未配信分を古いものを除いて統合し、(コマンド一覧, 末尾連番) を返す"""
+        pending = self._pending_locked(client)
+        if not pending:
+            return [], client.cursor
+        through_seq = pending[-1]['seq']
+
+        if self.max_age > 0:
+            oldest = time.time() - self.max_age
+            fresh = [entry for entry in pending if entry.get('timestamp', 0) >= oldest]
+            self.dropped_stale += len(pending) - len(fresh)
+        else:
+            fresh = pending
+        commands = coalesce_commands(fresh)
+        self.coalesced += len(fresh) - len(commands)
+        return commands, through_seq
+
+    def _maybe_retransmit_locked(self, client: PlayerClient):
+        """ack が返ってこない配信があればカーソルを戻して再送させる"""
+        if (client.acks_enabled and client.acked < client.cursor
+                and time.time() - client.last_sent_at > self.ACK_TIMEOUT_SECONDS):
+            client.cursor = client.acked
+            client.retransmits += 1
+
+    def wait_for_commands(self, client_id: str, timeout: float, is_closed=None) -> Tuple[List[dict], int]:
+        """クライアントの未配信コマンドを最大 timeout 秒待ち、(コマンド一覧, 末尾連番) を返す
+
+        カーソルは進めない。配信に成功したら mark_delivered() に末尾連番を渡す。
+        統合の結果すべて捨てられた場合は、その分のカーソルを進めて待機を続ける。
+        is_closed が真を返した場合は待機を打ち切る。
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            client = self._clients.get(client_id)
+            if client is None:
+                return [], 0
+            while True:
+                self._maybe_retransmit_locked(client)
+                commands, through_seq = self._batch_locked(client)
+                if commands:
+                    return commands, through_seq
+                if through_seq > client.cursor:
+                    # 古すぎる・相殺されたコマンドだけだった
+                    client.cursor = through_seq
+                    client.acked = max(client.acked, through_seq)
+                remaining = deadline - time.time()
+                if remaining <= 0 or self.shutting_down or (is_closed and is_closed()):
+                    return [], client.cursor
+                self._condition.wait(min(remaining, 1.0))
+                # 待機中も接続中として扱う
+                client.last_seen = self.last_activity = time.time()
+
+    def mark_delivered(self, client_id: str, through_seq: int, count: int = 1):
+        """クライアントへの配信完了を記録してカーソルを進める"""
+        with self._condition:
+            client = self._clients.get(client_id)
+            if client and through_seq > client.cursor:
+                client.cursor = through_seq
+                client.delivered += count
+                client.last_sent_at = time.time()
+                if not client.acks_enabled:
+                    client.acked = through_seq
+
+    def acknowledge(self, client_id: str, seq: int, rewind: bool = False):
+        """プレイヤーが処理済みの末尾連番を記録する
+
+        rewind=True（ポーリングで ack を受け取った場合）は、前回の応答が届かなかったとみなして
+        ack 以降をすぐに再送させる。
+        """
+        with self._condition:
+            client = self._clients.get(client_id)
+            if client is None:
+                return
+            client.acks_enabled = True
+            # WebSocket の ack は mark_delivered より先に届くことがあるため末尾連番で制限する
+            seq = max(0, min(seq, client.cursor if rewind else self.head_seq))
+            if rewind:
+                client.acked = seq
+                if seq < client.cursor:
+                    client.cursor = seq
+                    client.retransmits += 1
+            elif seq > client.acked:
+                client.acked = seq
+
+    def record_feedback(self, client_id: str, feedback: dict):
+        """クライアントごとの最新状態を記録"""
+        with self._condition:
+            client = self._clients.get(client_id)
+            if client is None:
+                return
+            now = time.time()
+            client.last_seen = self.last_activity = now
+            state = feedback.get('state')
+            if state == 'snapshot':
+                client.snapshot = {key: feedback.get(key) for key in SNAPSHOT_FIELDS}
+                client.last_video_id = feedback.get('currentVideoId')
+            elif state == 'position':
+                self._record_drift_locked(client, feedback)
+            elif state and state != 'HEARTBEAT':
+                client.last_state = state
+                client.last_video_id = feedback.get('videoId')
+            if isinstance(feedback.get('resources'), dict):
+                client.resources = feedback['resources']
+            if feedback.get('clockOffsetMs') is not None:
+                client.clock = {
+                    "offset_ms": feedback.get('clockOffsetMs'),
+                    "rtt_ms": feedback.get('clockRttMs'),
+                }
+            if state == 'playing' and feedback.get('scheduledAt') is not None:
+                try:
+                    client.play_at_offsets.append(round(float(feedback.get('offsetMs')), 1))
+                except (TypeError, ValueError):
+                    pass
+            client.last_feedback_at = now
+
+    def _record_drift_locked(self, client: PlayerClient, feedback: dict):
+        """position フィードバックに載っている、直前の SYNC に対するずれと補正を記録"""
+        drift = feedback.get('driftMs')
+        if drift is None:
+            return
+        try:
+            client.drift_samples.append(round(float(drift), 1))
+        except (TypeError, ValueError):
+            return
+        correction = feedback.get('correction')
+        if correction == 'nudge':
+            client.sync_nudges += 1
+        elif correction == 'seek':
+            client.sync_seeks += 1
+
+    def clear(self):
+        """未配信のコマンドを破棄（全クライアントのカーソルを末尾へ）"""
+        with self._condition:
+            self._entries.clear()
+            for client in self._clients.values():
+                client.cursor = client.acked = self.head_seq
+
+    def pending_count(self) -> int:
+        """未配信コマンド数（クライアントごとの最大値。クライアントがいなければログの件数）"""
+        with self._condition:
+            if not self._clients:
+                return len(self._entries)
+            return max(len(self._pending_locked(client)) for client in self._clients.values())
+
+    def clients(self) -> List[dict]:
+        """クライアント一覧（/status 用）。長時間アクセスのないクライアントは削除する"""
+        with self._condition:
+            now = time.time()
+            expired = [
+                client_id for client_id, client in self._clients.items()
+                if client.connections == 0 and now - client.last_seen > self.CLIENT_EXPIRE_SECONDS
+            ]
+            for client_id in expired:
+                del self._clients[client_id]
+            return [client.to_dict(self.head_seq) for client in self._clients.values()]
+
+    def start(self):
+        """サーバー起動時の初期化"""
+        with self._condition:
+            self.shutting_down = False
+
+    def shutdown(self):
+        """待機中のクライアントをすべて解放"""
+        with self._condition:
+            self.shutting_down = True
+            self._condition.notify_all()
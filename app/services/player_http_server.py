@@ -5,7 +5,8 @@ YouTubeプレイヤーへのコマンド送信を管理
 
 import json
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse
 import time
 import os
@@ -13,37 +14,273 @@ import sys
 from pathlib import Path
 from PySide6.QtCore import QObject, Signal
 
+from app.utils.logger import debug
+from app.utils import websocket
+from app.services.player_command_log import PlayerCommandLog
+from app.services.player_position_sync import PositionSync
+
 
 class FeedbackSignals(QObject):
     """プレイヤーからのフィードバックを通知する信号"""
-    feedback_received = Signal(dict)
+    # バッファが空の状態からフィードバックが入ったときだけ発行される（GUI側で drain する）
+    feedback_pending = Signal()
 
 
 # グローバル信号インスタンス
 feedback_signals = FeedbackSignals()
 
 
+class FeedbackBuffer:
+    """プレイヤーごと・種類ごとの最新フィードバックを保持するバッファ（スレッドセーフ）
+    
+    サーバースレッドが put() し、GUIスレッドが drain() でまとめて取り出す。
+    GUIが取り出す前に同じプレイヤーから同じ種類（category()）の次の状態が届いた場合は、最新のものだけが残る。
+    再生中の動画（'playing'）と次のスロット（'preloading' / 'ready'）は別の種類なので、
+    [PLAY a, PRELOAD b] が1フレーム内に届いても 'playing a' は消えない。
+    再バッファ（'rebuffer'）は回数を数えるため上書きせず、届いた順にすべて返す。
+    状態スナップショット（state == 'snapshot'）と先読み候補の一覧（state == 'pool'）は
+    後続の状態変化で消えないよう別枠で保持し、drain() では通常のフィードバックより先に返す。
+    """
+    
+    # GUI が止まっていても溜め込みすぎないよう、再バッファは直近のものだけ残す
+    MAX_EVENTS = 64
+    
+    def __init__(self):
+        self._latest = {}  # (client_id, category) -> feedback（到着順）
+        self._events = deque(maxlen=self.MAX_EVENTS)  # 上書きしないフィードバック（再バッファ）
+        self._snapshots = {}  # client_id -> 状態スナップショット
+        self._pools = {}  # client_id -> 先読み候補の一覧
+        self._lock = threading.Lock()
+        self.received = 0
+        self.superseded = 0
+    
+    @staticmethod
+    def category(state: str) -> str:
+        """上書きの単位になる種類（'current' = 再生中、'next' = 次のスロット、それ以外は state のまま）"""
+        if state == 'playing':
+            return 'current'
+        if state in ('preloading', 'ready'):
+            return 'next'
+        return state or ''
+    
+    def put(self, client_id: str, feedback: dict) -> bool:
+        """フィードバックを格納する。バッファが空だった場合は True を返す"""
+        with self._lock:
+            was_empty = not self._latest and not self._events and not self._snapshots and not self._pools
+            self.received += 1
+            state = feedback.get('state')
+            if state == 'rebuffer':
+                self._events.append(feedback)
+                return was_empty
+            if state == 'snapshot':
+                target, key = self._snapshots, client_id
+            elif state == 'pool':
+                target, key = self._pools, client_id
+            else:
+                target, key = self._latest, (client_id, self.category(state))
+            if target.pop(key, None) is not None:
+                self.superseded += 1
+            target[key] = feedback
+            return was_empty
+    
+    def drain(self) -> list:
+        """溜まっているフィードバックをすべて取り出す（スナップショット、先読み候補の順に先に返す）"""
+        with self._lock:
+            items = (list(self._snapshots.values()) + list(self._pools.values())
+                     + list(self._latest.values()) + list(self._events))
+            self._snapshots.clear()
+            self._pools.clear()
+            self._latest.clear()
+            self._events.clear()
+            return items
+
+
+# グローバルバッファインスタンス
+feedback_buffer = FeedbackBuffer()
+
+
+class RequestStats:
+    """パスごとのリクエスト処理時間を記録し、p50/p95/max を集計する（スレッドセーフ）"""
+    
+    def __init__(self, window: int = 512):
+        self._window = window
+        self._samples = {}  # path -> deque[秒]
+        self._counts = {}   # path -> 累計件数
+        self._lock = threading.Lock()
+    
+    def record(self, path: str, elapsed: float):
+        """1リクエスト分の処理時間（秒）を記録"""
+        with self._lock:
+            samples = self._samples.get(path)
+            if samples is None:
+                samples = self._samples[path] = deque(maxlen=self._window)
+            samples.append(elapsed)
+            self._counts[path] = self._counts.get(path, 0) + 1
+    
+    def snapshot(self) -> dict:
+        """直近 window 件の統計（ミリ秒）を返す"""
+        with self._lock:
+            items = [(path, sorted(samples), self._counts[path]) for path, samples in self._samples.items()]
+        
+        result = {}
+        for path, samples, count in items:
+            if not samples:
+                continue
+            last = len(samples) - 1
+            result[path] = {
+                "count": count,
+                "p50_ms": round(samples[int(last * 0.50)] * 1000, 3),
+                "p95_ms": round(samples[int(last * 0.95)] * 1000, 3),
+                "max_ms": round(samples[-1] * 1000, 3),
+            }
+        return result
+    
+    def clear(self):
+        """統計をリセット"""
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+class StaticAsset:
+    """キャッシュ済みの静的ファイル1つ分"""
+    __slots__ = ('data', 'gzip_data', 'etag', 'last_modified', 'mtime', 'mtime_ns', 'size', 'content_type')
+
+
+class StaticAssetCache:
+    """web/ 配下の静的ファイルをメモリに保持する（更新時刻とサイズが変われば読み直す）"""
+    
+    # gzip 圧縮する最小サイズ（これより小さいファイルは圧縮しない）
+    GZIP_MIN_SIZE = 1024
+    
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+    
+    def get(self, file_path: Path, content_type: str) -> StaticAsset:
+        """ファイルのキャッシュを返す（なければ・更新されていれば読み込む）"""
+        stat = file_path.stat()
+        key = str(file_path)
+        with self._lock:
+            asset = self._assets.get(key)
+        if asset and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+            return asset
+        
+        import gzip
+        import hashlib
+        from email.utils import formatdate
+        
+        data = file_path.read_bytes()
+        asset = StaticAsset()
+        asset.data = data
+        asset.gzip_data = None
+        if content_type.startswith(('text/', 'application/javascript')) and len(data) >= self.GZIP_MIN_SIZE:
+            compressed = gzip.compress(data, compresslevel=6)
+            if len(compressed) < len(data):
+                asset.gzip_data = compressed
+        asset.etag = '"%s"' % hashlib.sha1(data).hexdigest()[:20]
+        asset.mtime = int(stat.st_mtime)
+        asset.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        asset.mtime_ns = stat.st_mtime_ns
+        asset.size = stat.st_size
+        asset.content_type = content_type
+        
+        with self._lock:
+            self._assets[key] = asset
+        return asset
+    
+    def clear(self):
+        """キャッシュを破棄"""
+        with self._lock:
+            self._assets.clear()
+
+
+class PlayerThreadingHTTPServer(ThreadingHTTPServer):
+    """接続ごとにスレッドで処理するサーバー（keep-alive 接続が他の接続を塞がない）"""
+    daemon_threads = True
+    block_on_close = False
+
+
 class PlayerCommandHandler(BaseHTTPRequestHandler):
-    """プレイヤーコマンド用HTTPリクエストハンドラ"""
+    """プレイヤーコマンド用HTTPリクエストハンドラ
     
-    # コマンドキュー（スレッド間共有）
-    command_queue = []
-    queue_lock = threading.Lock()
+    HTTP/1.1 keep-alive で動作するため、すべてのレスポンスに Content-Length を付ける。
+    """
+    
+    protocol_version = "HTTP/1.1"
+    # keep-alive 接続のアイドルタイムアウト（秒）。超えたら接続を閉じてスレッドを解放する
+    timeout = 30
+    # ヘッダーと本文を別々に書き込むため、Nagle と遅延ACKの組み合わせで keep-alive 上の
+    # 応答が約40ms遅れるのを防ぐ
+    disable_nagle_algorithm = True
+    
+    # コマンドログ（スレッド間共有）。出力画面（クライアント）ごとのカーソルで全画面に配信する
+    command_log = PlayerCommandLog()
+    # 複数出力の再生位置の同期（リーダーの位置を SYNC として配信する）
+    position_sync = PositionSync(command_log)
+    # ロングポーリングで保持する最大秒数（keep-alive タイムアウトより短くする）
+    max_poll_wait = 25.0
+    # 接続中の WebSocket クライアント数
+    websocket_clients = 0
     # 状態フィードバック用のコールバック
     state_callback = None
     # 静的ファイル配信用（/web 配下）
     web_root = None
+    # リクエスト処理時間の統計
+    request_stats = RequestStats()
+    # 静的ファイルのキャッシュ
+    asset_cache = StaticAssetCache()
+    # 接続中のクライアント数（keep-alive 接続を含む）
+    active_connections = 0
+    connections_lock = threading.Lock()
     
     def log_message(self, format, *args):
         """ログ出力を抑制"""
         pass
     
-    def do_OPTIONS(self):
-        """OPTIONSリクエスト処理（CORS対応）"""
-        self.send_response(200)
+    def setup(self):
+        super().setup()
+        with PlayerCommandHandler.connections_lock:
+            PlayerCommandHandler.active_connections += 1
+    
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            with PlayerCommandHandler.connections_lock:
+                PlayerCommandHandler.active_connections -= 1
+    
+    def _send_cors_headers(self):
+        """CORSヘッダーを送信"""
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+    
+    def _send_json(self, data, status=200):
+        """JSONレスポンスを送信（keep-alive のため Content-Length を必ず付ける）"""
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _timed(self, path, handler, *args):
+        """ハンドラを実行し、処理時間を統計に記録する"""
+        started = time.perf_counter()
+        try:
+            handler(*args)
+        finally:
+            self.request_stats.record(path, time.perf_counter() - started)
+    
+    def do_OPTIONS(self):
+        """OPTIONSリクエスト処理（CORS対応）"""
+        self.send_response(200)
+        self._send_cors_headers()
+        # プリフライト結果をブラウザにキャッシュさせ、POST のたびに OPTIONS が飛ばないようにする
+        self.send_header('Access-Control-Max-Age', '86400')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
@@ -51,11 +288,20 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
         parsed_path = urlparse(self.path)
 
         if parsed_path.path == '/poll':
-            self.handle_poll()
+            wait = self._parse_wait(parsed_path.query)
+            if wait > 0:
+                # 保持時間が統計を歪めないよう別枠で記録する
+                self._timed('/poll?wait', self.handle_poll, wait)
+            else:
+                self._timed('/poll', self.handle_poll)
+        elif parsed_path.path == '/ws':
+            self.handle_websocket()
         elif parsed_path.path == '/status':
-            self.handle_status()
+            self._timed('/status', self.handle_status)
+        elif parsed_path.path == '/time':
+            self.handle_time(parsed_path.query)
         elif parsed_path.path == '/' or parsed_path.path.startswith('/web/') or parsed_path.path.endswith('.html') or parsed_path.path.endswith('.js') or parsed_path.path.endswith('.css'):
-            self.handle_static(parsed_path.path)
+            self._timed('static', self.handle_static, parsed_path.path)
         else:
             self.send_error(404, "Not Found")
 
@@ -70,6 +316,7 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
             if request_path == '/':
                 self.send_response(302)
                 self.send_header('Location', '/player.html')
+                self.send_header('Content-Length', '0')
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
                 return
@@ -104,15 +351,24 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
             elif ext == '.css':
                 content_type = 'text/css; charset=utf-8'
 
-            data = file_path.read_bytes()
+            asset = self.asset_cache.get(file_path, content_type)
+            use_gzip = asset.gzip_data is not None and 'gzip' in (self.headers.get('Accept-Encoding') or '')
+            etag = asset.etag[:-1] + '-gz"' if use_gzip else asset.etag
+
+            if self._is_not_modified(asset):
+                self.send_response(304)
+                self._send_asset_headers(asset, etag)
+                self.end_headers()
+                return
 
+            data = asset.gzip_data if use_gzip else asset.data
             self.send_response(200)
-            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Type', asset.content_type)
             self.send_header('Content-Length', str(len(data)))
-            self.send_header('Cache-Control', 'no-store')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            self._send_asset_headers(asset, etag)
+            self._send_cors_headers()
             self.end_headers()
             self.wfile.write(data)
 
@@ -120,35 +376,93 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
             print(f"PlayerCommandHandler: Error in static handler: {e}")
             self.send_error(500, "Internal Server Error")
     
-    def handle_poll(self):
-        """コマンドポーリング処理"""
-        # ポーリング時刻を更新
+    def _send_asset_headers(self, asset: StaticAsset, etag: str):
+        """静的ファイルのキャッシュ検証用ヘッダーを送信"""
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', asset.last_modified)
+        # キャッシュは使わせるが、毎回 ETag で更新を確認させる（更新がなければ 304）
+        self.send_header('Cache-Control', 'no-cache')
+        if asset.gzip_data is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+    
+    def _is_not_modified(self, asset: StaticAsset) -> bool:
+        """条件付きリクエストに対して 304 を返せるか判定"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            if '*' in tags:
+                return True
+            # 弱い比較（W/ と gzip 版のサフィックスは無視する）
+            base = asset.etag.strip('"')
+            for tag in tags:
+                value = tag[2:] if tag.startswith('W/') else tag
+                value = value.strip('"')
+                if value == base or value == base + '-gz':
+                    return True
+            return False
+        
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            from email.utils import parsedate_to_datetime
+            try:
+                return asset.mtime <= int(parsedate_to_datetime(if_modified_since).timestamp())
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+        return False
+    
+    def _parse_wait(self, query: str) -> float:
+        """クエリの wait（ロングポーリングの保持秒数）を取得"""
+        from urllib.parse import parse_qs
+        try:
+            wait = float(parse_qs(query).get('wait', ['0'])[0])
+        except ValueError:
+            return 0.0
+        return max(0.0, min(wait, self.max_poll_wait))
+    
+    def _client_id(self, query: str = '', data: dict = None) -> str:
+        """クライアントIDを取得（未指定の旧プレイヤーは接続元アドレスで識別）"""
+        from urllib.parse import parse_qs
+        client_id = (data or {}).get('clientId') or parse_qs(query).get('clientId', [''])[0]
+        return str(client_id)[:64] if client_id else f"anon-{self.client_address[0]}"
+    
+    def _apply_ack(self, client_id: str, data: dict, rewind: bool = False):
+        """プレイヤーからの ack（処理済みの末尾連番）を反映する。別プロセス時代の ack は無視"""
+        ack = data.get('ack')
+        if ack in (None, '') or str(data.get('epoch', '')) != self.command_log.epoch:
+            return
         try:
-            import time
-            PlayerCommandHandler._last_poll_time = time.time()
-        except:
+            self.command_log.acknowledge(client_id, int(ack), rewind=rewind)
+        except (TypeError, ValueError):
             pass
-            
+    
+    def _command_batch(self, commands, through_seq: int) -> dict:
+        """配信するコマンドのバッチ（through はプレイヤーが ack として返す末尾連番）"""
+        return {"epoch": self.command_log.epoch, "through": through_seq, "commands": commands}
+    
+    def handle_poll(self, wait: float = 0.0):
+        """コマンドポーリング処理（wait > 0 の場合はコマンドが届くまで保持するロングポーリング）
+        
+        クライアントのカーソル以降の未配信コマンドを統合して1バッチで返す。
+        ack（前回のバッチの through）が付いていれば反映し、届かなかった分は再送する。
+        """
         try:
-            with self.queue_lock:
-                if self.command_queue:
-                    # キューからコマンドを取得
-                    command = self.command_queue.pop(0)
-                    response_data = command
-                else:
-                    # コマンドがない場合は空レスポンス
-                    response_data = {"cmd": "", "videoId": ""}
-            
-            # JSONレスポンスを送信
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.end_headers()
-            
-            response_json = json.dumps(response_data)
-            self.wfile.write(response_json.encode('utf-8'))
+            from urllib.parse import parse_qs
+            query = urlparse(self.path).query
+            params = {key: values[0] for key, values in parse_qs(query).items()}
+            client_id = self._client_id(query)
+            self.command_log.register(client_id, 'poll', self.client_address[0])
+            self._apply_ack(client_id, params, rewind=True)
+            
+            # このプロセスの epoch を知らないプレイヤー（初回・アプリ再起動後）には待たずに hello を返し、
+            # 状態スナップショットを送らせる
+            hello = params.get('epoch') != self.command_log.epoch
+            commands, through_seq = self.command_log.wait_for_commands(client_id, 0 if hello else wait)
+            batch = self._command_batch(commands, through_seq)
+            if hello:
+                batch["hello"] = True
+            self._send_json(batch)
+            if commands:
+                self.command_log.mark_delivered(client_id, through_seq, len(commands))
             
         except Exception as e:
             print(f"PlayerCommandHandler: Error in poll: {e}")
@@ -157,36 +471,48 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
     def handle_status(self):
         """ステータス確認処理"""
         try:
-            with self.queue_lock:
-                queue_size = len(self.command_queue)
+            queue_size = self.command_log.pending_count()
+            
+            with self.connections_lock:
+                active_connections = self.active_connections
+                websocket_clients = self.websocket_clients
             
             status_data = {
                 "status": "running",
                 "queue_size": queue_size,
+                "active_connections": active_connections,
+                "websocket_clients": websocket_clients,
+                "clients": self.command_log.clients(),
+                "position_sync": self.position_sync.to_dict(),
+                "commands_coalesced": self.command_log.coalesced,
+                "commands_dropped_stale": self.command_log.dropped_stale,
+                "feedback_received": feedback_buffer.received,
+                "feedback_superseded": feedback_buffer.superseded,
+                "request_stats": self.request_stats.snapshot(),
                 "timestamp": time.time()
             }
             
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            response_json = json.dumps(status_data)
-            self.wfile.write(response_json.encode('utf-8'))
+            self._send_json(status_data)
             
         except Exception as e:
             print(f"PlayerCommandHandler: Error in status: {e}")
             self.send_error(500, "Internal Server Error")
     
+    def handle_time(self, query: str):
+        """時計合わせ（NTP と同じ方式）。プレイヤーの送信時刻 t0 に、受信時刻 t1・送信時刻 t2 を付けて返す"""
+        from urllib.parse import parse_qs
+        received_ms = server_time_ms()
+        self._send_json(clock_reply(parse_qs(query).get('t0', [None])[0], received_ms))
+    
     def do_POST(self):
         """POSTリクエスト処理"""
         parsed_path = urlparse(self.path)
-        print(f"PlayerCommandHandler: Received POST request for {parsed_path.path}")
+        debug(f"Received POST request for {parsed_path.path}", "PlayerCommandHandler")
         
         if parsed_path.path == '/command':
-            self.handle_command()
+            self._timed('/command', self.handle_command)
         elif parsed_path.path == '/feedback':
-            self.handle_feedback()
+            self._timed('/feedback', self.handle_feedback)
         else:
             print(f"PlayerCommandHandler: Unknown POST path: {parsed_path.path}")
             self.send_error(404, "Not Found")
@@ -198,58 +524,128 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
             post_data = self.rfile.read(content_length)
             command_data = json.loads(post_data.decode('utf-8'))
             
-            # コマンドをキューに追加
-            with self.queue_lock:
-                self.command_queue.append(command_data)
+            # コマンドをログに追加し、待機中のクライアントを起こす
+            self.command_log.append(command_data)
             
             print(f"PlayerCommandHandler: Received command: {command_data}")
             
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            response = {"status": "success", "message": "Command received"}
-            response_json = json.dumps(response)
-            self.wfile.write(response_json.encode('utf-8'))
+            self._send_json({"status": "success", "message": "Command received"})
             
         except Exception as e:
             print(f"PlayerCommandHandler: Error in command: {e}")
             self.send_error(500, "Internal Server Error")
     
+    def _dispatch_feedback(self, feedback_data: dict):
+        """フィードバック（HTTP POST / WebSocket 共通）を記録してGUIへ通知"""
+        client_id = feedback_data.get('clientId') or self._client_id()
+        feedback_data['clientId'] = client_id
+        # フィードバックに ack が同乗している場合も反映する
+        self._apply_ack(client_id, feedback_data)
+        dispatch_feedback(feedback_data)
+    
+    def handle_websocket(self):
+        """WebSocket 接続処理（コマンドをプッシュし、フィードバックを受信する）"""
+        if not websocket.is_upgrade_request(self.headers):
+            self.send_error(400, "WebSocket upgrade required")
+            return
+        
+        self.send_response(101, "Switching Protocols")
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', websocket.accept_key(self.headers['Sec-WebSocket-Key']))
+        self.end_headers()
+        # アップグレード後は HTTP として扱わない
+        self.close_connection = True
+        # プレイヤーは5秒ごとにハートビートを送るため、それより十分長い無通信で切断する
+        self.connection.settimeout(60)
+        
+        conn = websocket.WebSocketConnection(self.rfile, self.wfile)
+        client_id = self._client_id(urlparse(self.path).query)
+        self.command_log.connect(client_id, 'websocket', self.client_address[0])
+        with PlayerCommandHandler.connections_lock:
+            PlayerCommandHandler.websocket_clients += 1
+        print(f"PlayerCommandHandler: WebSocket client connected ({client_id})")
+        
+        # ハンドシェイク: プレイヤーは hello を受けると現在の状態スナップショットを返す
+        try:
+            conn.send_text(json.dumps({"type": "hello", "epoch": self.command_log.epoch}))
+        except (websocket.WebSocketClosed, OSError):
+            pass
+        
+        # 送信はコマンド待機用のスレッド、受信はこのスレッドで行う
+        sender = threading.Thread(target=self._websocket_send_loop, args=(conn, client_id), daemon=True)
+        sender.start()
+        try:
+            while not conn.closed:
+                message = conn.receive()
+                if message is None:
+                    break
+                self._handle_websocket_message(message, client_id, conn)
+        except (websocket.WebSocketClosed, OSError):
+            pass
+        except Exception as e:
+            print(f"PlayerCommandHandler: WebSocket error: {e}")
+        finally:
+            conn.close()
+            with PlayerCommandHandler.connections_lock:
+                PlayerCommandHandler.websocket_clients -= 1
+            # 送信スレッドを起こして終了させる
+            self.command_log.disconnect(client_id)
+            sender.join(timeout=2)
+            print(f"PlayerCommandHandler: WebSocket client disconnected ({client_id})")
+    
+    def _websocket_send_loop(self, conn, client_id: str):
+        """クライアントの未配信コマンドを届き次第 WebSocket で送信する"""
+        is_closed = lambda: conn.closed
+        try:
+            while not conn.closed and not self.command_log.shutting_down:
+                commands, through_seq = self.command_log.wait_for_commands(client_id, self.max_poll_wait, is_closed)
+                if conn.closed:
+                    # 未送信分はカーソルが進まないため、再接続時に届く
+                    break
+                if not commands:
+                    # 無通信の間も接続を維持する
+                    conn.ping()
+                    continue
+                conn.send_text(json.dumps(dict(self._command_batch(commands, through_seq), type="commands")))
+                self.command_log.mark_delivered(client_id, through_seq, len(commands))
+        except (websocket.WebSocketClosed, OSError):
+            pass
+        except Exception as e:
+            print(f"PlayerCommandHandler: WebSocket send error: {e}")
+        finally:
+            conn.close()
+    
+    def _handle_websocket_message(self, message: str, client_id: str, conn=None):
+        """WebSocket で受信したメッセージ（フィードバック・ハートビート・時計合わせ）を処理"""
+        received_ms = server_time_ms()
+        try:
+            data = json.loads(message)
+        except ValueError:
+            debug(f"Ignored invalid WebSocket message: {message[:100]}", "PlayerCommandHandler")
+            return
+        if not isinstance(data, dict):
+            return
+        if data.get('type') == 'ack':
+            self._apply_ack(client_id, data)
+        elif data.get('type') == 'time' and conn is not None:
+            reply = clock_reply(data.get('t0'), received_ms)
+            reply.update(type='time', id=data.get('id'))
+            conn.send_text(json.dumps(reply))
+        elif data.get('type') == 'feedback':
+            data.pop('type', None)
+            data.setdefault('clientId', client_id)
+            self._dispatch_feedback(data)
+    
     def handle_feedback(self):
         """プレイヤーからの状態フィードバック処理"""
         try:
-            print(f"PlayerCommandHandler: Starting feedback processing...")
-            
             content_length = int(self.headers['Content-Length'])
-            print(f"PlayerCommandHandler: Content-Length: {content_length}")
-            
             post_data = self.rfile.read(content_length)
-            print(f"PlayerCommandHandler: Raw post data: {post_data}")
-            
             feedback_data = json.loads(post_data.decode('utf-8'))
-            print(f"PlayerCommandHandler: Parsed feedback data: {feedback_data}")
-            
-            # 信号をエミット（スレッドセーフなGUI更新のため）
-            feedback_signals.feedback_received.emit(feedback_data)
+            self._dispatch_feedback(feedback_data)
             
-            # 互換性のためコールバックも維持（ただし、MainWindow側でこれを使わないように修正する）
-            if self.state_callback:
-                self.state_callback(feedback_data)
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            self.end_headers()
-            
-            response = {"status": "success", "message": "Feedback received"}
-            response_json = json.dumps(response)
-            self.wfile.write(response_json.encode('utf-8'))
-            
-            print(f"PlayerCommandHandler: Feedback response sent successfully")
+            self._send_json({"status": "success", "message": "Feedback received"})
             
         except Exception as e:
             print(f"PlayerCommandHandler: Error in feedback: {e}")
@@ -258,6 +654,44 @@ class PlayerCommandHandler(BaseHTTPRequestHandler):
             self.send_error(500, "Internal Server Error")
 
 
+def server_time_ms() -> float:
+    """サーバーの時計（Unix 時刻のミリ秒）。PLAY_AT の時刻はこの時計で指定する"""
+    return time.time() * 1000
+
+
+def clock_reply(t0, received_ms: float) -> dict:
+    """時計合わせの応答（t0: プレイヤーの送信時刻、t1: サーバーの受信時刻、t2: サーバーの送信時刻）"""
+    try:
+        t0 = float(t0)
+    except (TypeError, ValueError):
+        t0 = None
+    return {"t0": t0, "t1": received_ms, "t2": server_time_ms()}
+
+
+def dispatch_feedback(feedback_data: dict):
+    """フィードバックを記録してGUIへ通知（HTTP / WebSocket / アプリ内出力の共通経路）"""
+    client_id = feedback_data.get('clientId')
+    PlayerCommandHandler.command_log.record_feedback(client_id, feedback_data)
+    # 頻繁に届くためコンソール出力はせず DEBUG ログのみ
+    debug(f"Feedback: {feedback_data}", "PlayerCommandHandler")
+    
+    # ハートビートは生存確認（record_feedback で記録済み）だけなのでGUIには渡さない
+    if feedback_data.get('state') == 'HEARTBEAT':
+        return
+    # 再生位置の報告は同期にだけ使う（リーダーのものを SYNC として配信する）
+    if feedback_data.get('state') == 'position':
+        PlayerCommandHandler.position_sync.on_position(client_id, feedback_data)
+        return
+    
+    # 最新状態をバッファに入れ、空から埋まったときだけGUIへ通知する（スレッドセーフ）
+    if feedback_buffer.put(client_id, feedback_data):
+        feedback_signals.feedback_pending.emit()
+    
+    # 互換性のためコールバックも維持（ただし、MainWindow側でこれを使わないように修正する）
+    if PlayerCommandHandler.state_callback:
+        PlayerCommandHandler.state_callback(feedback_data)
+
+
 class PlayerHttpServer:
     """YouTubeプレイヤー用HTTPサーバー"""
     
@@ -288,7 +722,15 @@ class PlayerHttpServer:
             
             PlayerCommandHandler.web_root = str(web_dir)
 
-            self.server = HTTPServer((self.host, self.port), PlayerCommandHandler)
+            PlayerCommandHandler.request_stats.clear()
+            PlayerCommandHandler.command_log.start()
+            from app.services.config_service import ConfigService
+            PlayerCommandHandler.command_log.max_age = float(ConfigService().get("player_command_max_age_s", 5))
+            PlayerCommandHandler.position_sync.configure(
+                bool(ConfigService().get("position_sync_enabled", False)),
+                str(ConfigService().get("position_sync_leader", "")),
+            )
+            self.server = PlayerThreadingHTTPServer((self.host, self.port), PlayerCommandHandler)
             self.is_running = True
             
             # 別スレッドでサーバーを実行
@@ -314,6 +756,9 @@ class PlayerHttpServer:
             return
         
         try:
+            # 待機中のロングポーリング・WebSocket を解放する
+            PlayerCommandHandler.command_log.shutdown()
+            
             if self.server:
                 self.server.shutdown()
                 self.server.server_close()
@@ -332,17 +777,18 @@ class PlayerHttpServer:
         PlayerCommandHandler.state_callback = callback
         print("PlayerHttpServer: State callback set")
     
-    def send_command(self, cmd, video_id=""):
-        """コマンドをキューに追加"""
+    def send_command(self, cmd, video_id="", **fields):
+        """コマンドをキューに追加（fields はコマンドに追加する項目。例: PLAY_AT の at）"""
         try:
             command = {
                 "cmd": cmd,
                 "videoId": video_id,
                 "timestamp": time.time()
             }
+            command.update(fields)
             
-            with PlayerCommandHandler.queue_lock:
-                PlayerCommandHandler.command_queue.append(command)
+            # 接続中のすべてのクライアントへ即座に配信する
+            PlayerCommandHandler.command_log.append(command)
             
             print(f"PlayerHttpServer: Sent command: {cmd} - {video_id}")
             
@@ -352,8 +798,7 @@ class PlayerHttpServer:
     def clear_queue(self):
         """コマンドキューをクリア"""
         try:
-            with PlayerCommandHandler.queue_lock:
-                PlayerCommandHandler.command_queue.clear()
+            PlayerCommandHandler.command_log.clear()
             print("PlayerHttpServer: Command queue cleared")
             
         except Exception as e:
@@ -362,8 +807,7 @@ class PlayerHttpServer:
     def get_queue_size(self):
         """キューのサイズを取得"""
         try:
-            with PlayerCommandHandler.queue_lock:
-                return len(PlayerCommandHandler.command_queue)
+            return PlayerCommandHandler.command_log.pending_count()
         except Exception as e:
             print(f"PlayerHttpServer: Error getting queue size: {e}")
             return 0
@@ -0,0 +1,96 @@
+"""
+複数出力の再生位置の同期
+
+同じ動画を複数の画面（ブラウザ）で流すと、長いクリップでは再生位置が少しずつずれていく。
+1つの出力をリーダーとし、リーダーが報告した再生位置（position フィードバック）を
+SYNC コマンドとして全出力へ配信する。フォロワーは SYNC を基準に自分のずれを計算し、
+小さいずれは再生速度をわずかに変えて、大きいずれはシークして補正する。
+各出力が報告したずれの統計は /status の clients[].sync で確認できる。
+"""
+
+import threading
+import time
+
+
+class PositionSync:
+    """リーダーの再生位置を SYNC コマンドとして配信する（スレッドセーフ）
+
+    リーダーは leader_id で固定できる。空の場合は最初に位置を報告した出力をリーダーにし、
+    そのリーダーから LEADER_TIMEOUT_SECONDS 以上報告がなければ次に報告した出力へ引き継ぐ。
+    """
+
+    # リーダーからの報告がこの秒数途絶えたら引き継ぐ
+    LEADER_TIMEOUT_SECONDS = 5.0
+    # SYNC を配信する最小間隔（秒）
+    MIN_INTERVAL_SECONDS = 0.5
+
+    def __init__(self, command_log, enabled: bool = False, leader_id: str = ""):
+        self.command_log = command_log
+        self.enabled = enabled
+        self.leader_id = leader_id
+        self._current_leader = None
+        self._leader_seen_at = 0.0
+        self._last_sent_at = 0.0
+        self._lock = threading.Lock()
+        self.sent = 0
+
+    def configure(self, enabled: bool, leader_id: str = ""):
+        """設定を反映する（リーダーの自動選択はやり直す）"""
+        with self._lock:
+            self.enabled = enabled
+            self.leader_id = leader_id
+            self._current_leader = None
+            self._leader_seen_at = 0.0
+
+    @property
+    def leader(self):
+        """現在のリーダーの clientId（未決定なら None）"""
+        with self._lock:
+            return self.leader_id or self._current_leader
+
+    def on_position(self, client_id: str, feedback: dict) -> bool:
+        """position フィードバックを受け取り、リーダーのものなら SYNC を配信する。配信した場合は True"""
+        if not self.enabled:
+            return False
+        now = time.time()
+        with self._lock:
+            if self.leader_id:
+                is_leader = client_id == self.leader_id
+            else:
+                if self._current_leader is None or now - self._leader_seen_at > self.LEADER_TIMEOUT_SECONDS:
+                    if self._current_leader != client_id:
+                        print(f"PositionSync: Leader is now {client_id}")
+                    self._current_leader = client_id
+                is_leader = client_id == self._current_leader
+            if not is_leader:
+                return False
+            self._leader_seen_at = now
+            # 一時停止中・動画なしの位置は基準にしない
+            if not feedback.get('videoId') or feedback.get('playing') is False:
+                return False
+            if now - self._last_sent_at < self.MIN_INTERVAL_SECONDS:
+                return False
+            self._last_sent_at = now
+            self.sent += 1
+
+        try:
+            command = {
+                "cmd": "SYNC",
+                "videoId": feedback.get('videoId'),
+                "position": float(feedback.get('currentTime')),
+                "rate": float(feedback.get('playbackRate') or 1.0),
+                "at": float(feedback.get('sampledAt')),
+                "leader": client_id,
+            }
+        except (TypeError, ValueError):
+            return False
+        self.command_log.append(command)
+        return True
+
+    def to_dict(self) -> dict:
+        """/status 用の辞書を返す"""
+        return {
+            "enabled": self.enabled,
+            "leader": self.leader,
+            "sync_commands_sent": self.sent,
+        }
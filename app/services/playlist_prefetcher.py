@@ -0,0 +1,77 @@
+"""
+プレイリストの先読み（次に流れそうな曲の検索とサムネイルを事前に取得する）
+
+最後に再生された曲を含む rekordbox のプレイリストから次の数曲を取り出し、バックグラウンドで
+検索結果（SearchCache）とサムネイル（ThumbnailCache）を保存しておく。DJ が次の曲に進んだときには
+結果がローカルにあるので、検索もサムネイルも通信せずに表示できる。
+API の使用量は 1日あたりの予算（prefetch_quota_units）の範囲に抑える。
+"""
+
+import time
+from typing import List
+
+from PySide6.QtCore import QThread, Signal
+
+from app.services.search_cache import SearchCache
+from app.services.thumbnail_cache import ThumbnailCache
+from app.services.youtube_quota import YouTubeQuota
+from app.services.youtube_service import YouTubeSearchClient
+
+
+# YouTubeQuota の用途名
+PREFETCH_QUOTA_CATEGORY = "prefetch"
+
+
+class PlaylistPrefetcher(QThread):
+    """検索クエリのリストを順に先読みするスレッド（キャッシュ済みのクエリは API を呼ばない）"""
+    # クエリ、先読みできたか（キャッシュ済みを含む）
+    query_prefetched = Signal(str, bool)
+
+    # API を続けて呼ぶときの間隔（秒）
+    REQUEST_INTERVAL_S = 0.5
+
+    def __init__(self, queries: List[str], api_key: str, quota_budget: int, thumbnails_per_query: int = 5):
+        super().__init__()
+        self.queries = list(queries)
+        self.api_key = api_key
+        self.quota_budget = quota_budget
+        self.thumbnails_per_query = thumbnails_per_query
+        self._is_aborted = False
+
+    def abort(self):
+        """先読みを中断する（実行中の通信が終わった時点で止まる）"""
+        self._is_aborted = True
+
+    def run(self):
+        cache = SearchCache()
+        thumbnails = ThumbnailCache()
+        quota = YouTubeQuota()
+        cost = YouTubeSearchClient.SEARCH_COST + YouTubeSearchClient.DETAILS_COST
+
+        for query in self.queries:
+            if self._is_aborted:
+                return
+            videos = cache.get(query)
+            if videos is None:
+                if not quota.has_budget(PREFETCH_QUOTA_CATEGORY, cost, self.quota_budget):
+                    print(f"PlaylistPrefetcher: Quota budget reached ({quota.used(PREFETCH_QUOTA_CATEGORY)}"
+                          f"/{self.quota_budget} units today), stopping")
+                    return
+                try:
+                    videos = YouTubeSearchClient(self.api_key, PREFETCH_QUOTA_CATEGORY).search(query)
+                except Exception as e:
+                    print(f"PlaylistPrefetcher: Search failed for {query}: {e}")
+                    self.query_prefetched.emit(query, False)
+                    continue
+                cache.put(query, videos)
+                time.sleep(self.REQUEST_INTERVAL_S)
+
+            # 一覧で先に表示される上位のサムネイルだけ保存する
+            for video in videos[:self.thumbnails_per_query]:
+                if self._is_aborted:
+                    return
+                thumbnails.prefetch(video.thumbnail_preview_url)
+                thumbnails.prefetch(video.thumbnail_url)
+
+            print(f"PlaylistPrefetcher: Prefetched {len(videos)} results for: {query}")
+            self.query_prefetched.emit(query, True)
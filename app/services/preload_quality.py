@@ -0,0 +1,106 @@
+"""
+プリロード画質の自動調整
+
+プレイヤーが報告する ready までの時間（timeToReadyMs / timedOut）と再生中の再バッファ（rebuffer）から、
+回線が維持できる画質を選ぶ。期限内に ready にならなかった・再バッファが起きた場合はすぐに1段下げ、
+余裕をもって ready になることが続いたら1段上げる。選んだ画質は PRELOAD コマンドの quality として送る。
+
+YouTube の suggestedQuality はプレイヤーへのヒントで、必ずその画質になるとは限らない。
+"""
+
+from typing import Optional
+
+
+# YouTube IFrame API の画質（低い順）
+QUALITY_LADDER = ('small', 'medium', 'large', 'hd720', 'hd1080')
+DEFAULT_QUALITY = 'hd720'
+
+
+class PreloadQualityController:
+    """ready までの時間と再バッファから PRELOAD の画質を決める
+
+    mode が 'auto' 以外（QUALITY_LADDER のいずれか）の場合は、その画質に固定する。
+    """
+
+    # 期限のこの割合以内に ready になった回数が続いたら1段上げる
+    FAST_RATIO = 0.5
+    STEP_UP_AFTER = 3
+
+    def __init__(self, mode: str = 'auto', deadline_ms: int = 4000, max_quality: str = 'hd1080'):
+        self.deadline_ms = deadline_ms
+        self.max_index = self._index(max_quality, len(QUALITY_LADDER) - 1)
+        self.mode = mode if mode in QUALITY_LADDER else 'auto'
+        self._index_now = min(self._index(self.mode, self._index(DEFAULT_QUALITY, 0)), self.max_index)
+        self._fast_streak = 0
+        # 統計（ログ・デバッグ表示用）
+        self.ready_count = 0
+        self.missed_count = 0
+        self.rebuffer_count = 0
+        self.last_change = None
+
+    @staticmethod
+    def _index(quality: str, default: int) -> int:
+        try:
+            return QUALITY_LADDER.index(quality)
+        except ValueError:
+            return default
+
+    @property
+    def quality(self) -> str:
+        """PRELOAD に付ける画質"""
+        return QUALITY_LADDER[self._index_now]
+
+    def configure(self, mode: str, deadline_ms: int, max_quality: str):
+        """設定を反映する（現在の画質は上限を超える場合だけ下げる）"""
+        self.deadline_ms = deadline_ms
+        self.max_index = self._index(max_quality, len(QUALITY_LADDER) - 1)
+        self.mode = mode if mode in QUALITY_LADDER else 'auto'
+        if self.mode != 'auto':
+            self._index_now = self._index(self.mode, self._index_now)
+        self._index_now = min(self._index_now, self.max_index)
+
+    def record_ready(self, time_to_ready_ms, timed_out: bool = False) -> Optional[str]:
+        """ready フィードバックを記録する。画質を変えた場合は新しい画質を返す"""
+        if time_to_ready_ms is None:
+            return None
+        self.ready_count += 1
+        missed = timed_out or float(time_to_ready_ms) > self.deadline_ms
+        if missed:
+            self.missed_count += 1
+            return self._step(-1, f"ready in {float(time_to_ready_ms):.0f}ms (deadline {self.deadline_ms}ms)")
+        if float(time_to_ready_ms) <= self.deadline_ms * self.FAST_RATIO:
+            self._fast_streak += 1
+            if self._fast_streak >= self.STEP_UP_AFTER:
+                return self._step(1, f"{self._fast_streak} preloads ready within {self.deadline_ms * self.FAST_RATIO:.0f}ms")
+        else:
+            self._fast_streak = 0
+        return None
+
+    def record_rebuffer(self, stall_ms=None) -> Optional[str]:
+        """再生中の再バッファを記録する。画質を変えた場合は新しい画質を返す"""
+        self.rebuffer_count += 1
+        return self._step(-1, f"rebuffer ({stall_ms}ms stall)" if stall_ms is not None else "rebuffer")
+
+    def _step(self, direction: int, reason: str) -> Optional[str]:
+        self._fast_streak = 0
+        if self.mode != 'auto':
+            return None
+        new_index = max(0, min(self.max_index, self._index_now + direction))
+        if new_index == self._index_now:
+            return None
+        old_quality = self.quality
+        self._index_now = new_index
+        self.last_change = f"{old_quality} -> {self.quality}: {reason}"
+        print(f"PreloadQualityController: {self.last_change}")
+        return self.quality
+
+    def to_dict(self) -> dict:
+        return {
+            "mode": self.mode,
+            "quality": self.quality,
+            "deadline_ms": self.deadline_ms,
+            "ready": self.ready_count,
+            "missed": self.missed_count,
+            "rebuffers": self.rebuffer_count,
+            "last_change": self.last_change,
+        }
@@ -2,11 +2,27 @@ import os
 import shutil
 import tempfile
 import logging
-from pyrekordbox.db6 import Rekordbox6Database, DjmdContent, DjmdSongHistory, DjmdArtist
+from typing import List, NamedTuple, Optional
+from pyrekordbox.db6 import (Rekordbox6Database, DjmdContent, DjmdSongHistory, DjmdArtist,
+                             DjmdPlaylist, DjmdSongPlaylist)
 
 # pyrekordboxの警告出力を抑制
 logging.getLogger('pyrekordbox').setLevel(logging.ERROR)
 
+
+class HistoryEntry(NamedTuple):
+    """
+    再生履歴の1行。従来通り (Title, Artist, Comment) のタプルとしても扱える。
+    history_id は DjmdSongHistory の ID で、同じ曲の再生でも1回ごとに異なる。
+    content_id は DjmdContent の ID（曲そのものの識別子）で、同じ曲なら何度再生しても同じ。
+    """
+    title: str
+    artist: str
+    comment: str
+    history_id: Optional[str] = None
+    content_id: Optional[str] = None
+
+
 class RekordboxService:
     def __init__(self, db_path=None):
         from app.services.config_service import ConfigService
@@ -144,7 +160,8 @@ class RekordboxService:
             # DjmdContent: 曲の詳細
             # DjmdArtist: アーティスト名
             query = (
-                session.query(DjmdContent.Title, DjmdArtist.Name, DjmdContent.Commnt, DjmdSongHistory.created_at)
+                session.query(DjmdContent.Title, DjmdArtist.Name, DjmdContent.Commnt, DjmdSongHistory.created_at, DjmdSongHistory.ID,
+                              DjmdContent.ID)
                 .join(DjmdSongHistory, DjmdSongHistory.ContentID == DjmdContent.ID)
                 .join(DjmdArtist, DjmdContent.ArtistID == DjmdArtist.ID)
                 .order_by(DjmdSongHistory.created_at.desc())
@@ -152,11 +169,106 @@ class RekordboxService:
             )
             
             results = query.all()
-            # テーブルに渡しやすい形式 (Title, Artist, Comment) に変換
-            return [(r[0], r[1], r[2] if r[2] else "") for r in results]
+            # テーブルに渡しやすい形式 (Title, Artist, Comment) に変換（履歴IDで行を識別できるようにする）
+            return [
+                HistoryEntry(r[0], r[1], r[2] if r[2] else "",
+                             str(r[4]) if r[4] is not None else None,
+                             str(r[5]) if r[5] is not None else None)
+                for r in results
+            ]
             
         except Exception as e:
             print(f"Error fetching history: {e}")
             import traceback
             traceback.print_exc()
             return []
+
+    def get_playlist_lookahead(self, content_id, count=3, previous_content_id=None) -> List[HistoryEntry]:
+        """
+        最後に再生された曲を含むプレイリストから、その次に並んでいる曲を count 件返す。
+        get_latest_history で開いたローカルコピーをそのまま使う（ファイルの同期はしない）。
+
+        曲が複数のプレイリストに入っている場合は、直前に再生された曲（previous_content_id）が
+        すぐ前に並んでいるプレイリストを優先し、次に最近更新されたプレイリストを選ぶ。
+        """
+        if not content_id or count <= 0 or not self.db or not self.db.session:
+            return []
+        try:
+            session = self.db.session
+            # DjmdSongPlaylist: プレイリストの曲と並び順（TrackNo）
+            rows = (
+                session.query(DjmdSongPlaylist.PlaylistID, DjmdSongPlaylist.TrackNo, DjmdPlaylist.updated_at)
+                .join(DjmdPlaylist, DjmdPlaylist.ID == DjmdSongPlaylist.PlaylistID)
+                .filter(DjmdSongPlaylist.ContentID == content_id)
+                .all()
+            )
+            if not rows:
+                return []
+
+            def score(row):
+                playlist_id, track_no, updated_at = row
+                follows_previous = False
+                if previous_content_id:
+                    previous_no = (
+                        session.query(DjmdSongPlaylist.TrackNo)
+                        .filter(DjmdSongPlaylist.PlaylistID == playlist_id,
+                                DjmdSongPlaylist.ContentID == previous_content_id)
+                        .scalar()
+                    )
+                    follows_previous = previous_no is not None and previous_no == (track_no or 0) - 1
+                return (follows_previous, updated_at.timestamp() if updated_at else 0)
+
+            playlist_id, track_no, _ = max(rows, key=score)
+            return self.get_playlist_tracks(playlist_id, after_track_no=track_no or 0, limit=count)
+
+        except Exception as e:
+            print(f"RekordboxService: Error fetching playlist lookahead: {e}")
+            return []
+
+    def get_playlists(self) -> List[tuple]:
+        """通常のプレイリスト（フォルダ・インテリジェントプレイリストを除く）を (ID, フォルダを含む名前) で返す"""
+        if not self.db or not self.db.session:
+            return []
+        try:
+            rows = self.db.session.query(
+                DjmdPlaylist.ID, DjmdPlaylist.Name, DjmdPlaylist.ParentID, DjmdPlaylist.Attribute, DjmdPlaylist.Seq
+            ).all()
+            by_id = {str(r[0]): r for r in rows}
+
+            def full_name(row):
+                names = [row[1] or ""]
+                parent = by_id.get(str(row[2]))
+                while parent is not None and len(names) < 32:
+                    names.insert(0, parent[1] or "")
+                    parent = by_id.get(str(parent[2]))
+                return " / ".join(names)
+
+            # Attribute: 0 = プレイリスト, 1 = フォルダ, 4 = インテリジェントプレイリスト
+            playlists = [(str(r[0]), full_name(r)) for r in rows if r[3] == 0]
+            return sorted(playlists, key=lambda playlist: playlist[1].lower())
+        except Exception as e:
+            print(f"RekordboxService: Error fetching playlists: {e}")
+            return []
+
+    def get_playlist_tracks(self, playlist_id, after_track_no=0, limit=None) -> List[HistoryEntry]:
+        """プレイリストの曲を並び順に返す（after_track_no より後ろのみ、limit 件まで）"""
+        if not self.db or not self.db.session:
+            return []
+        try:
+            query = (
+                self.db.session.query(DjmdContent.Title, DjmdArtist.Name, DjmdContent.Commnt, DjmdContent.ID)
+                .join(DjmdSongPlaylist, DjmdSongPlaylist.ContentID == DjmdContent.ID)
+                .outerjoin(DjmdArtist, DjmdContent.ArtistID == DjmdArtist.ID)
+                .filter(DjmdSongPlaylist.PlaylistID == playlist_id, DjmdSongPlaylist.TrackNo > after_track_no)
+                .order_by(DjmdSongPlaylist.TrackNo)
+            )
+            if limit:
+                query = query.limit(limit)
+            return [
+                HistoryEntry(r[0] or "", r[1] or "", r[2] if r[2] else "", None,
+                             str(r[3]) if r[3] is not None else None)
+                for r in query.all()
+            ]
+        except Exception as e:
+            print(f"RekordboxService: Error fetching playlist tracks: {e}")
+            return []
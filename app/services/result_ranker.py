@@ -0,0 +1,148 @@
+"""
+検索結果のローカル再ランキング
+
+YouTube の検索順は曲との一致度だけで決まっていないため、曲のタイトル・アーティスト・コメントと
+各動画のタイトルを文字 n-gram の類似度で比べ直し、動画の長さからの補正をかけて最も曲らしい動画を選ぶ。
+選んだ動画は auto_preload_policy に応じて自動で PRELOAD される（投機的プリロード）。
+
+n-gram はハッシュで固定長のベクトルにし、NumPy がある場合は全候補をまとめて行列で計算する。
+NumPy がない環境では同じ計算を Python で行う（結果は同じ）。
+"""
+
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import List, NamedTuple, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+# 自動プリロードの方針（auto_preload_policy）
+AUTO_PRELOAD_OFF = "off"              # 自動プリロードしない（選択だけ行う）
+AUTO_PRELOAD_CONFIDENT = "confident"  # 一致度が auto_preload_min_score 以上のときだけ
+AUTO_PRELOAD_ALWAYS = "always"        # 常に最上位をプリロード
+AUTO_PRELOAD_POLICIES = (AUTO_PRELOAD_OFF, AUTO_PRELOAD_CONFIDENT, AUTO_PRELOAD_ALWAYS)
+
+
+class RankedVideo(NamedTuple):
+    """再ランキングの結果1件"""
+    video: object   # VideoItem
+    score: float    # 0〜1（テキストの一致度 × 長さの補正）
+    text_score: float
+    duration_factor: float
+    original_rank: int
+
+
+class ResultRanker:
+    """曲の情報と検索結果のタイトルを比べて並べ替える"""
+
+    NGRAM = 3
+    DIMENSIONS = 4096
+    # テキストの一致度の重み（コメントが空の場合は残りで正規化する）
+    WEIGHTS = {"title": 0.6, "artist": 0.3, "comment": 0.1}
+    # 一致度が同程度なら元の検索順を優先する（順位1つにつきこの割合だけ下げる）
+    RANK_DECAY = 0.01
+
+    def rank(self, videos, track_title: str, artist: str = "", comment: str = "") -> List[RankedVideo]:
+        """検索結果を一致度の高い順に並べた RankedVideo のリストを返す"""
+        videos = [video for video in videos if getattr(video, 'video_id', None)]
+        if not videos:
+            return []
+
+        fields = {"title": track_title, "artist": artist, "comment": comment}
+        queries = {name: self._ngrams(text) for name, text in fields.items()}
+        weights = {name: weight for name, weight in self.WEIGHTS.items() if queries[name]}
+        total_weight = sum(weights.values())
+
+        candidates = [self._ngrams(self._candidate_text(video)) for video in videos]
+        text_scores = [0.0] * len(videos)
+        if total_weight > 0:
+            for name, weight in weights.items():
+                similarities = self._similarities(queries[name], candidates)
+                for i, similarity in enumerate(similarities):
+                    text_scores[i] += similarity * weight / total_weight
+
+        ranked = []
+        for i, video in enumerate(videos):
+            factor = self.duration_factor(getattr(video, 'duration', ''))
+            score = text_scores[i] * factor * (1.0 - self.RANK_DECAY * min(i, 20))
+            ranked.append(RankedVideo(video, round(score, 4), round(text_scores[i], 4), factor, i))
+        ranked.sort(key=lambda entry: (-entry.score, entry.original_rank))
+        return ranked
+
+    def best(self, videos, track_title: str, artist: str = "", comment: str = "") -> Optional[RankedVideo]:
+        """最も一致度の高い動画（候補がなければ None）"""
+        ranked = self.rank(videos, track_title, artist, comment)
+        return ranked[0] if ranked else None
+
+    @staticmethod
+    def duration_factor(duration: str) -> float:
+        """動画の長さによる補正（1曲分の長さを優先し、ミックス・フル尺の長い動画を下げる）"""
+        seconds = parse_duration_text(duration)
+        if seconds is None:
+            return 0.9
+        if 120 <= seconds <= 600:
+            return 1.0
+        if 60 <= seconds < 120 or 600 < seconds <= 1200:
+            return 0.85
+        return 0.6
+
+    @staticmethod
+    def _candidate_text(video) -> str:
+        return getattr(video, 'title', '') or ''
+
+    def _ngrams(self, text: str) -> Counter:
+        """正規化した文字列の文字 n-gram をハッシュしたバケット番号の出現数"""
+        text = normalize_text(text)
+        if not text:
+            return Counter()
+        padded = f" {text} "
+        if len(padded) < self.NGRAM:
+            return Counter([zlib.crc32(padded.encode('utf-8')) % self.DIMENSIONS])
+        return Counter(
+            zlib.crc32(padded[i:i + self.NGRAM].encode('utf-8')) % self.DIMENSIONS
+            for i in range(len(padded) - self.NGRAM + 1)
+        )
+
+    def _similarities(self, query: Counter, candidates: List[Counter]) -> List[float]:
+        """query と各候補の類似度（query の n-gram のうち候補に含まれる割合、重み付き）"""
+        if NUMPY_AVAILABLE:
+            matrix = np.zeros((len(candidates), self.DIMENSIONS), dtype=np.float32)
+            for row, grams in enumerate(candidates):
+                if grams:
+                    matrix[row, list(grams.keys())] = list(grams.values())
+            vector = np.zeros(self.DIMENSIONS, dtype=np.float32)
+            vector[list(query.keys())] = list(query.values())
+            overlap = np.minimum(matrix, vector).sum(axis=1)
+            return (overlap / max(float(vector.sum()), 1.0)).tolist()
+
+        query_total = max(sum(query.values()), 1)
+        return [
+            sum(min(count, grams.get(bucket, 0)) for bucket, count in query.items()) / query_total
+            for grams in candidates
+        ]
+
+
+def normalize_text(text: str) -> str:
+    """比較用に正規化する（全角半角・大文字小文字をそろえ、括弧や記号を空白にする）"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = re.sub(r"[^\w]+", " ", text)
+    return " ".join(text.split())
+
+
+def parse_duration_text(duration: str) -> Optional[int]:
+    """VideoItem.duration（"M:SS" / "H:MM:SS"）を秒数にする。不明な場合は None"""
+    if not duration:
+        return None
+    try:
+        seconds = 0
+        for part in str(duration).split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
@@ -0,0 +1,108 @@
+"""
+YouTube 検索結果のローカルキャッシュ（search_cache.json）
+
+同じクエリの検索結果を保存しておき、期限（search_cache_ttl_h）内なら API を呼ばずに返す。
+プレイリストの先読みやセット準備で事前に検索した結果も、ここに入れておけば本番では通信せずに表示できる。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from app.models.video_item import VideoItem
+
+
+class SearchCache:
+    """クエリ -> 検索結果（VideoItem のリスト）のキャッシュ。シングルトン（スレッドセーフ）"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    FILE_NAME = "search_cache.json"
+    # 保存しておくクエリ数の上限（超えたら古いものから削除）
+    MAX_ENTRIES = 2000
+    # VideoItem のうち保存する属性（サムネイル画像は thumbnail_cache に別途保存する）
+    FIELDS = ('video_id', 'title', 'duration', 'url', 'thumbnail_url', 'thumbnail_preview_url', 'description')
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(SearchCache, cls).__new__(cls)
+                if getattr(sys, 'frozen', False):
+                    base_dir = os.path.dirname(sys.executable)
+                else:
+                    base_dir = Path(__file__).parent.parent.parent
+                instance._path = os.path.join(base_dir, cls.FILE_NAME)
+                instance._lock = threading.Lock()
+                # ファイルへの書き込みは1スレッドずつ（後から取った内容が必ず最後に書かれる）
+                instance._save_lock = threading.Lock()
+                instance._entries = {}
+                instance._load()
+                cls._instance = instance
+        return cls._instance
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return " ".join((query or "").lower().split())
+
+    def _ttl_seconds(self) -> float:
+        from app.services.config_service import ConfigService
+        return float(ConfigService().get("search_cache_ttl_h", 168)) * 3600
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = data.get("entries", {}) if isinstance(data, dict) else {}
+            print(f"SearchCache: Loaded {len(self._entries)} queries from {self._path}")
+        except Exception as e:
+            print(f"SearchCache: Error loading {self._path}: {e}")
+
+    def _save(self):
+        with self._save_lock:
+            with self._lock:
+                text = json.dumps({"version": 1, "entries": self._entries}, ensure_ascii=False)
+            temp_path = f"{self._path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(temp_path, self._path)
+            except Exception as e:
+                print(f"SearchCache: Error saving {self._path}: {e}")
+
+    def contains(self, query: str) -> bool:
+        """期限内の結果があるか"""
+        with self._lock:
+            entry = self._entries.get(self._key(query))
+            return bool(entry) and time.time() - entry.get("fetchedAt", 0) <= self._ttl_seconds()
+
+    def get(self, query: str) -> Optional[List[VideoItem]]:
+        """期限内の結果を新しい VideoItem のリストで返す（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(self._key(query))
+            if not entry or time.time() - entry.get("fetchedAt", 0) > self._ttl_seconds():
+                return None
+            videos = entry.get("videos", [])
+        return [VideoItem(**{name: video.get(name, '') for name in self.FIELDS}) for video in videos]
+
+    def put(self, query: str, videos: List[VideoItem]):
+        """検索結果を保存する。長さが取れていない（詳細の取得に失敗した）結果は保存しない"""
+        if not videos or not all(video.duration for video in videos):
+            return
+        entry = {
+            "query": query,
+            "fetchedAt": time.time(),
+            "videos": [{name: getattr(video, name) for name in self.FIELDS} for video in videos],
+        }
+        with self._lock:
+            self._entries[self._key(query)] = entry
+            if len(self._entries) > self.MAX_ENTRIES:
+                oldest = sorted(self._entries, key=lambda key: self._entries[key].get("fetchedAt", 0))
+                for key in oldest[:len(self._entries) - self.MAX_ENTRIES]:
+                    del self._entries[key]
+        self._save()
@@ -0,0 +1,194 @@
+"""
+セット準備（本番前の一括ウォームアップ）
+
+選んだ rekordbox のプレイリストの全曲について、検索・動画の詳細・埋め込み可否の確認・サムネイルを
+まとめて取得し、SearchCache / ThumbnailCache に保存する。本番中はこれらの曲の検索で通信しない。
+
+- 検索は set_prep_concurrency 本まで並列に行い、API の呼び出しは set_prep_requests_per_s に抑える。
+- API の使用量は 1日あたり set_prep_quota_units まで（超えたら残りは次回に回す）。
+- 進み具合は set_prep_state.json に保存し、中断しても次回は終わっていない曲から再開する。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
+
+from PySide6.QtCore import QThread, Signal
+
+from app.services.search_cache import SearchCache
+from app.services.thumbnail_cache import ThumbnailCache
+from app.services.youtube_quota import YouTubeQuota
+from app.services.youtube_service import YouTubeSearchClient
+
+
+# YouTubeQuota の用途名
+SET_PREP_QUOTA_CATEGORY = "set_prep"
+
+# 1曲ごとの状態
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"  # 予算切れ・中断で取得しなかった
+
+
+class RateLimiter:
+    """呼び出しの間隔を 1 / rate 秒以上あける（複数スレッドで共有する）"""
+
+    def __init__(self, rate_per_s: float):
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SetPrepState:
+    """クエリごとの準備の状態（set_prep_state.json）。スレッドセーフ"""
+
+    FILE_NAME = "set_prep_state.json"
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            if getattr(sys, 'frozen', False):
+                base_dir = os.path.dirname(sys.executable)
+            else:
+                base_dir = Path(__file__).parent.parent.parent
+            path = os.path.join(base_dir, self.FILE_NAME)
+        self.path = path
+        self._queries = {}
+        self._lock = threading.Lock()
+        # ファイルへの書き込みは1スレッドずつ（後から取った内容が必ず最後に書かれる）
+        self._save_lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._queries = json.load(f).get("queries", {})
+            except Exception as e:
+                print(f"SetPrepState: Error loading {self.path}: {e}")
+
+    def is_done(self, query: str) -> bool:
+        """準備済みで、検索結果がまだキャッシュに残っているか"""
+        with self._lock:
+            done = self._queries.get(query, {}).get("status") == STATUS_DONE
+        return done and SearchCache().contains(query)
+
+    def mark(self, query: str, status: str, **fields):
+        with self._lock:
+            self._queries[query] = dict(fields, status=status, updatedAt=time.time())
+        self._save()
+
+    def _save(self):
+        """ファイルに保存する（書きかけのファイルを残さないよう一時ファイルから置き換える）"""
+        with self._save_lock:
+            with self._lock:
+                text = json.dumps({"version": 1, "queries": self._queries}, indent=2, ensure_ascii=False)
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(temp_path, self.path)
+            except Exception as e:
+                print(f"SetPrepState: Error saving {self.path}: {e}")
+
+    def reset(self):
+        """すべての曲を未準備に戻す（キャッシュは消さない）"""
+        with self._save_lock:
+            with self._lock:
+                self._queries = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class SetPrepWorker(QThread):
+    """クエリのリストを並列に準備するスレッド"""
+    # 完了数、全体数、直近のクエリ
+    progress = Signal(int, int, str)
+    # クエリ、状態、詳細（結果の件数やエラー）
+    item_finished = Signal(str, str, str)
+
+    # 埋め込み可否の確認と詳細取得を含めた1曲あたりの API ユニット（検索の前にまとめて確保する）
+    QUERY_COST = YouTubeSearchClient.SEARCH_COST + 2 * YouTubeSearchClient.DETAILS_COST
+
+    def __init__(self, queries: List[str], api_key: str, state: SetPrepState, concurrency: int = 4,
+                 requests_per_s: float = 2.0, quota_budget: int = 8000, thumbnails_per_query: int = 5):
+        super().__init__()
+        # 同じ曲が複数のプレイリストに入っていても1回だけ準備する
+        self.queries = list(dict.fromkeys(query for query in queries if query))
+        self.api_key = api_key
+        self.state = state
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = RateLimiter(requests_per_s)
+        self.quota_budget = quota_budget
+        self.thumbnails_per_query = thumbnails_per_query
+        self._is_aborted = False
+        self._quota_exhausted = False
+        self.skipped = 0  # 予算切れ・中断で次回に回した曲の数
+
+    def abort(self):
+        """準備を中断する（実行中の曲が終わった時点で止まる。済んだ曲は保存済み）"""
+        self._is_aborted = True
+
+    def run(self):
+        total = len(self.queries)
+        pending = [query for query in self.queries if not self.state.is_done(query)]
+        finished = total - len(pending)
+        self.progress.emit(finished, total, "")
+        print(f"SetPrepWorker: {len(pending)} of {total} tracks to prepare ({finished} already done)")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._prepare, query): query for query in pending}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    status, detail = future.result()
+                except Exception as e:
+                    status, detail = STATUS_FAILED, str(e)
+                if status == STATUS_SKIPPED:
+                    self.skipped += 1
+                else:
+                    self.state.mark(query, status, detail=detail)
+                finished += 1
+                self.item_finished.emit(query, status, detail)
+                self.progress.emit(finished, total, query)
+
+    def _prepare(self, query: str):
+        """1曲分の準備。(状態, 詳細) を返す"""
+        if self._is_aborted:
+            return STATUS_SKIPPED, "aborted"
+
+        cache = SearchCache()
+        videos = cache.get(query)
+        if videos is None:
+            # 並列の他の曲と合わせて予算を超えないよう、確認と同時に使用量を確保する
+            if self._quota_exhausted or not YouTubeQuota().reserve(
+                    SET_PREP_QUOTA_CATEGORY, self.QUERY_COST, self.quota_budget):
+                self._quota_exhausted = True
+                return STATUS_SKIPPED, "quota budget reached"
+            # 使用量は確保済みなので記録しない。HTTP リクエストごとにレート制限をかける
+            client = YouTubeSearchClient(self.api_key, None, rate_limiter=self.rate_limiter)
+            videos = client.search(query)
+            if videos:
+                # 埋め込み再生できない動画はプレイヤーで流せないので候補から外す
+                embeddable = client.check_embeddable([video.video_id for video in videos])
+                videos = [video for video in videos if embeddable.get(video.video_id, False)]
+            cache.put(query, videos)
+            if not videos:
+                return STATUS_FAILED, "no embeddable results"
+
+        thumbnails = ThumbnailCache()
+        for video in videos[:self.thumbnails_per_query]:
+            if self._is_aborted:
+                return STATUS_SKIPPED, "aborted"
+            thumbnails.prefetch(video.thumbnail_preview_url)
+            thumbnails.prefetch(video.thumbnail_url)
+        return STATUS_DONE, f"{len(videos)} results"
@@ -0,0 +1,103 @@
+"""
+サムネイル画像のディスクキャッシュ（thumbnail_cache/）
+
+ThumbnailLoader はまずここを見て、なければダウンロードして保存する。
+プレイリストの先読みやセット準備では画像だけを先に保存しておき、本番では通信せずに表示できるようにする。
+"""
+
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+
+class ThumbnailCache:
+    """URL ごとに画像のバイト列を保存するシングルトン（スレッドセーフ）"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    DIR_NAME = "thumbnail_cache"
+    # 保存するファイル数の上限（超えたら古いものから削除。確認は PRUNE_EVERY 回の保存ごと）
+    MAX_FILES = 3000
+    PRUNE_EVERY = 100
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(ThumbnailCache, cls).__new__(cls)
+                if getattr(sys, 'frozen', False):
+                    base_dir = os.path.dirname(sys.executable)
+                else:
+                    base_dir = Path(__file__).parent.parent.parent
+                instance.directory = os.path.join(base_dir, cls.DIR_NAME)
+                instance._lock = threading.Lock()
+                instance._writes = 0
+                cls._instance = instance
+        return cls._instance
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + ".img")
+
+    def contains(self, url: str) -> bool:
+        return bool(url) and os.path.exists(self._path(url))
+
+    def read(self, url: str) -> Optional[bytes]:
+        """保存済みの画像（なければ None）"""
+        if not url:
+            return None
+        try:
+            with open(self._path(url), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write(self, url: str, data: bytes):
+        """画像を保存する（書きかけのファイルを残さないよう一時ファイルから置き換える）"""
+        if not url or not data:
+            return
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = self._path(url)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+                self._writes += 1
+                if self._writes % self.PRUNE_EVERY == 0:
+                    self._prune_locked()
+            except OSError as e:
+                print(f"ThumbnailCache: Error saving thumbnail: {e}")
+
+    def prefetch(self, url: str, timeout: float = 20) -> bool:
+        """画像をダウンロードして保存する（保存済みなら何もしない）。保存済みになれば True"""
+        if not url:
+            return False
+        if self.contains(url):
+            return True
+        try:
+            response = requests.get(url, timeout=timeout)
+            response.raise_for_status()
+            self.write(url, response.content)
+            return True
+        except Exception as e:
+            print(f"ThumbnailCache: Error prefetching {url}: {e}")
+            return False
+
+    def _prune_locked(self):
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".img")]
+        except OSError:
+            return
+        if len(names) <= self.MAX_FILES:
+            return
+        paths = sorted((os.path.join(self.directory, name) for name in names), key=os.path.getmtime)
+        for path in paths[:len(names) - self.MAX_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,128 @@
+"""
+曲と動画の対応の記憶（video_affinity.json）
+
+同じ曲には毎回同じ動画を選ぶことが多いため、実際に再生された動画を曲ごとに覚えておく。
+曲は rekordbox の ContentID で識別し、ContentID がない・別のデータベースの場合に備えて
+正規化したタイトルとアーティストの組でも引けるようにする。
+覚えている曲が検出されたら、その動画をリストの先頭に固定してすぐにプリロードする。
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from app.services.result_ranker import normalize_text
+
+
+class VideoAffinityStore:
+    """曲ごとに再生された動画を記録・検索する（スレッドセーフ、変更のたびにファイルへ保存）"""
+
+    FILE_NAME = "video_affinity.json"
+    # 1曲あたりに覚えておく動画の数（再生回数・最終再生の新しい順に残す）
+    MAX_VIDEOS_PER_TRACK = 5
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            # config.json と同じ場所（exeの場合は実行ファイルと同じ階層）
+            if getattr(sys, 'frozen', False):
+                base_dir = os.path.dirname(sys.executable)
+            else:
+                base_dir = Path(__file__).parent.parent.parent
+            path = os.path.join(base_dir, self.FILE_NAME)
+        self.path = path
+        self._tracks = {}  # キー -> {"title", "artist", "videos": {videoId: {...}}}
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def track_keys(title: str, artist: str, content_id: Optional[str] = None) -> List[str]:
+        """曲の検索キー（ContentID のキーを優先し、タイトル+アーティストのキーを続ける）"""
+        keys = []
+        if content_id:
+            keys.append(f"content:{content_id}")
+        normalized_title = normalize_text(title)
+        if normalized_title:
+            keys.append(f"track:{normalized_title}\t{normalize_text(artist)}")
+        return keys
+
+    def load(self):
+        """ファイルから読み込む（なければ空）"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self._tracks = data.get("tracks", {}) if isinstance(data, dict) else {}
+            print(f"VideoAffinityStore: Loaded {len(self._tracks)} entries from {self.path}")
+        except Exception as e:
+            print(f"VideoAffinityStore: Error loading {self.path}: {e}")
+
+    def save(self):
+        """ファイルに保存する（書きかけのファイルを残さないよう一時ファイルから置き換える）"""
+        with self._lock:
+            data = {"version": 1, "tracks": self._tracks}
+            text = json.dumps(data, indent=2, ensure_ascii=False)
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"VideoAffinityStore: Error saving {self.path}: {e}")
+
+    def lookup(self, title: str, artist: str, content_id: Optional[str] = None) -> List[dict]:
+        """覚えている動画を優先順に返す（各要素は videoId / title / duration / thumbnailUrl / thumbnailPreviewUrl / plays / lastPlayed）"""
+        with self._lock:
+            for key in self.track_keys(title, artist, content_id):
+                entry = self._tracks.get(key)
+                if entry and entry.get("videos"):
+                    videos = [dict(info, videoId=video_id) for video_id, info in entry["videos"].items()]
+                    videos.sort(key=lambda info: (-info.get("plays", 0), -info.get("lastPlayed", 0)))
+                    return videos
+        return []
+
+    def record_play(self, title: str, artist: str, content_id: Optional[str], video) -> bool:
+        """曲で動画が再生されたことを記録して保存する。video は VideoItem。記録した場合は True"""
+        keys = self.track_keys(title, artist, content_id)
+        if not keys or not getattr(video, 'video_id', None):
+            return False
+        now = time.time()
+        remembered = True
+        with self._lock:
+            for key in keys:
+                entry = self._tracks.setdefault(key, {"title": title, "artist": artist, "videos": {}})
+                info = entry["videos"].setdefault(video.video_id, {"plays": 0})
+                info.update({
+                    "title": video.title,
+                    "duration": video.duration,
+                    "thumbnailUrl": video.thumbnail_url,
+                    "thumbnailPreviewUrl": video.thumbnail_preview_url,
+                    "plays": info.get("plays", 0) + 1,
+                    "lastPlayed": now,
+                })
+                self._trim(entry["videos"], keep_video_id=video.video_id)
+                remembered = remembered and video.video_id in entry["videos"]
+        self.save()
+        if remembered:
+            print(f"VideoAffinityStore: Remembered {video.video_id} for {title} / {artist}")
+        else:
+            print(f"VideoAffinityStore: Could not keep {video.video_id} for {title} / {artist}")
+        return remembered
+
+    def _trim(self, videos: dict, keep_video_id: Optional[str] = None):
+        """上限を超えた分を再生回数の少ないものから削除する（keep_video_id は削除しない）
+
+        今回再生した動画まで削除すると、回数の多い動画で埋まった曲では新しい選択を覚えられないため残す。
+        """
+        if len(videos) <= self.MAX_VIDEOS_PER_TRACK:
+            return
+        others = [item for item in videos.items() if item[0] != keep_video_id]
+        ranked = sorted(others, key=lambda item: (-item[1].get("plays", 0), -item[1].get("lastPlayed", 0)))
+        limit = self.MAX_VIDEOS_PER_TRACK - (1 if keep_video_id in videos else 0)
+        for video_id, _ in ranked[limit:]:
+            del videos[video_id]
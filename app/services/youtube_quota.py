@@ -0,0 +1,99 @@
+"""
+YouTube Data API の使用量（ユニット）の記録
+
+API の割り当ては1日単位（太平洋時間の0時にリセット）なので、日ごと・用途ごとに使ったユニット数を
+youtube_quota.json に記録する。ライブの検索は制限せず、先読み（prefetch）やセット準備（set_prep）の
+バックグラウンド処理だけが、それぞれの予算に収まるか has_budget() で確かめて（並列に呼ぶ場合は reserve() で
+先に確保して）から API を呼ぶ。
+"""
+
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+
+class YouTubeQuota:
+    """日ごと・用途ごとの API ユニット使用量を管理するシングルトン（スレッドセーフ）"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    FILE_NAME = "youtube_quota.json"
+    # 割り当てのリセットは太平洋時間の0時（夏時間は無視して UTC-8 で扱う）
+    RESET_TZ = timezone(timedelta(hours=-8))
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(YouTubeQuota, cls).__new__(cls)
+                if getattr(sys, 'frozen', False):
+                    base_dir = os.path.dirname(sys.executable)
+                else:
+                    base_dir = Path(__file__).parent.parent.parent
+                instance._path = os.path.join(base_dir, cls.FILE_NAME)
+                instance._lock = threading.Lock()
+                instance._day = None
+                instance._used = {}
+                instance._load()
+                cls._instance = instance
+        return cls._instance
+
+    def _today(self) -> str:
+        return datetime.now(self.RESET_TZ).strftime("%Y-%m-%d")
+
+    def _load(self):
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._day = data.get("day")
+            self._used = {key: int(value) for key, value in data.get("used", {}).items()}
+        except Exception as e:
+            print(f"YouTubeQuota: Error loading {self._path}: {e}")
+
+    def _save_locked(self):
+        try:
+            with open(self._path, "w", encoding="utf-8") as f:
+                json.dump({"day": self._day, "used": self._used}, f, indent=2)
+        except Exception as e:
+            print(f"YouTubeQuota: Error saving {self._path}: {e}")
+
+    def _roll_over_locked(self):
+        today = self._today()
+        if self._day != today:
+            self._day = today
+            self._used = {}
+
+    def record(self, category: str, units: int):
+        """使ったユニットを記録する"""
+        with self._lock:
+            self._roll_over_locked()
+            self._used[category] = self._used.get(category, 0) + units
+            self._save_locked()
+
+    def has_budget(self, category: str, units: int, budget: int) -> bool:
+        """用途の今日の使用量に units を足しても予算（1日あたり）に収まるか"""
+        with self._lock:
+            self._roll_over_locked()
+            return self._used.get(category, 0) + units <= budget
+
+    def reserve(self, category: str, units: int, budget: int) -> bool:
+        """予算に収まれば units を使用量として先に記録して True を返す（確認と記録を同時に行う）"""
+        with self._lock:
+            self._roll_over_locked()
+            if self._used.get(category, 0) + units > budget:
+                return False
+            self._used[category] = self._used.get(category, 0) + units
+            self._save_locked()
+            return True
+
+    def used(self, category: str = None) -> int:
+        """今日使ったユニット数（category を省略すると合計）"""
+        with self._lock:
+            self._roll_over_locked()
+            if category is None:
+                return sum(self._used.values())
+            return self._used.get(category, 0)
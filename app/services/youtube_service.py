@@ -6,17 +6,25 @@ from PySide6.QtGui import QPixmap
 import json
 from urllib.parse import urlencode
 
+from app.models.video_item import VideoItem
+
 
 class ThumbnailLoader(QThread):
     """サムネイルを非同期で読み込むスレッド"""
-    thumbnail_loaded = Signal(str, object)  # video_id, thumbnail (QImage)
+    thumbnail_loaded = Signal(str, object, int)  # video_id, thumbnail (QImage), generation
     
-    def __init__(self, video_id: str, thumbnail_url: str):
+    def __init__(self, video_id: str, thumbnail_url: str, generation: int = 0):
         super().__init__()
         self.video_id = video_id
         self.thumbnail_url = thumbnail_url
+        # どの検索に属する読み込みかを示す世代番号
+        self.generation = generation
         self._is_aborted = False
     
+    def abort(self):
+        """読み込みを中断する（受信中のデータはチャンク単位で打ち切る）"""
+        self._is_aborted = True
+    
     def run(self):
         """サムネイルを読み込む"""
         if self._is_aborted:
@@ -24,36 +32,53 @@ class ThumbnailLoader(QThread):
             
         try:
             from PySide6.QtGui import QImage
-            response = requests.get(self.thumbnail_url, timeout=20)
-            response.raise_for_status()
+            from app.services.thumbnail_cache import ThumbnailCache
+            # 先読み・セット準備で保存済みなら通信しない
+            cache = ThumbnailCache()
+            data = cache.read(self.thumbnail_url)
+            if data is None:
+                # 中断要求に素早く応じられるよう、ストリーミングでチャンクごとに受信する
+                chunks = []
+                with requests.get(self.thumbnail_url, timeout=20, stream=True) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=16384):
+                        if self._is_aborted:
+                            return
+                        chunks.append(chunk)
+                data = b''.join(chunks)
+                cache.write(self.thumbnail_url, data)
             
             # QImageとして読み込み（スレッドセーフ）
             image = QImage()
-            image.loadFromData(response.content)
+            image.loadFromData(data)
             
             if self._is_aborted:
                 return
 
             if not image.isNull():
-                self.thumbnail_loaded.emit(self.video_id, image)
+                self.thumbnail_loaded.emit(self.video_id, image, self.generation)
             else:
                 print(f"ThumbnailLoader: Failed to load thumbnail for {self.video_id}")
-                self.thumbnail_loaded.emit(self.video_id, None)
+                self.thumbnail_loaded.emit(self.video_id, None, self.generation)
                 
         except Exception as e:
+            if self._is_aborted:
+                return
             print(f"ThumbnailLoader: Error loading thumbnail for {self.video_id}: {e}")
-            self.thumbnail_loaded.emit(self.video_id, None)
+            self.thumbnail_loaded.emit(self.video_id, None, self.generation)
 
 
 class YouTubeSearchThread(QThread):
     """YouTube検索をバックグラウンドで実行するスレッド"""
-    search_completed = Signal(list)
+    search_completed = Signal(list, int)  # videos, generation
     search_error = Signal(str)
     
-    def __init__(self, api_key: str, query: str):
+    def __init__(self, api_key: str, query: str, generation: int = 0):
         super().__init__()
         self.api_key = api_key
         self.query = query
+        # 検索ごとの世代番号（古い検索の結果を破棄するために使う）
+        self.generation = generation
         self._is_aborted = False
     
     def run(self):
@@ -65,7 +90,7 @@ class YouTubeSearchThread(QThread):
             videos = self._search_youtube()
             if self._is_aborted:
                 return
-            self.search_completed.emit(videos)
+            self.search_completed.emit(videos, self.generation)
         except Exception as e:
             if not self._is_aborted:
                 self.search_error.emit(str(e))
@@ -78,24 +103,62 @@ class YouTubeSearchThread(QThread):
             self.quit()
             self.wait(2000) # 最大2秒待機
     
-    def _search_youtube(self) -> List[Dict]:
+    def _search_youtube(self) -> List[VideoItem]:
+        """YouTube Data API v3で動画検索（同じクエリの結果がキャッシュにあれば通信しない）"""
+        from app.services.search_cache import SearchCache
+        cache = SearchCache()
+        cached = cache.get(self.query)
+        if cached is not None:
+            print(f"YouTubeSearchThread: Using cached results for: {self.query}")
+            return cached
+        
+        videos = YouTubeSearchClient(self.api_key).search(self.query)
+        cache.put(self.query, videos)
+        return videos
+
+
+class YouTubeSearchClient:
+    """YouTube Data API v3 の検索（呼び出したスレッドで同期的に実行する）
+    
+    検索スレッドのほか、先読みやセット準備のバックグラウンド処理からも使う。
+    API の使用量（ユニット）は YouTubeQuota に記録する（quota_category が None なら呼び出し側で記録済み）。
+    rate_limiter を渡すと、HTTP リクエストのたびに rate_limiter.acquire() で間隔をあける。
+    """
+    # search.list と videos.list のユニット数
+    SEARCH_COST = 100
+    DETAILS_COST = 1
+    
+    def __init__(self, api_key: str, quota_category: Optional[str] = "live", rate_limiter=None):
+        self.api_key = api_key
+        self.quota_category = quota_category
+        self.rate_limiter = rate_limiter
+    
+    def _get(self, base_url: str, params: dict, units: int):
+        """API を1回呼ぶ（レート制限と使用量の記録をここでまとめて行う）"""
+        from app.services.youtube_quota import YouTubeQuota
+        headers = {
+            'User-Agent': 'VJ_yattaro/1.0'
+        }
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.quota_category:
+            YouTubeQuota().record(self.quota_category, units)
+        return requests.get(f"{base_url}?{urlencode(params)}", headers=headers, timeout=10)
+    
+    def search(self, query: str) -> List[VideoItem]:
         """YouTube Data API v3で動画検索（ショート動画を除外）"""
         base_url = "https://www.googleapis.com/youtube/v3/search"
         
         params = {
             'part': 'snippet',
-            'q': self.query,
+            'q': query,
             'type': 'video',
             'maxResults': 20,  # より多く取得してフィルタリング
             'key': self.api_key
             # videoDurationパラメータを削除してすべての動画を取得
         }
         
-        headers = {
-            'User-Agent': 'VJ_yattaro/1.0'
-        }
-        
-        response = requests.get(f"{base_url}?{urlencode(params)}", headers=headers, timeout=10)
+        response = self._get(base_url, params, self.SEARCH_COST)
         response.raise_for_status()
         
         data = response.json()
@@ -114,16 +177,19 @@ class YouTubeSearchThread(QThread):
             snippet = item['snippet']
             
             # サムネイルURLを取得
+            # high: 本表示用 / default: 先行表示用の小サイズ（数KB）
             thumbnails = snippet.get('thumbnails', {})
-            thumbnail_url = thumbnails.get('high', {}).get('url') or thumbnails.get('default', {}).get('url', '')
+            preview_url = thumbnails.get('default', {}).get('url', '')
+            thumbnail_url = thumbnails.get('high', {}).get('url') or preview_url
             
-            videos.append({
-                'video_id': video_id,
-                'title': snippet['title'],
-                'thumbnail_url': thumbnail_url,
-                'description': snippet.get('description', ''),
-                'url': f"https://www.youtube.com/watch?v={video_id}"
-            })
+            videos.append(VideoItem(
+                video_id=video_id,
+                title=snippet['title'],
+                thumbnail_url=thumbnail_url,
+                thumbnail_preview_url=preview_url,
+                description=snippet.get('description', ''),
+                url=f"https://www.youtube.com/watch?v={video_id}"
+            ))
         
         # 動画の詳細情報を取得して長さを確認
         if video_ids:
@@ -131,7 +197,7 @@ class YouTubeSearchThread(QThread):
         
         return videos[:20]  # 上位20件を返す
     
-    def _filter_shorts(self, videos: List[Dict], video_ids: List[str]) -> List[Dict]:
+    def _filter_shorts(self, videos: List[VideoItem], video_ids: List[str]) -> List[VideoItem]:
         """ショート動画をフィルタリング"""
         base_url = "https://www.googleapis.com/youtube/v3/videos"
         
@@ -141,12 +207,8 @@ class YouTubeSearchThread(QThread):
             'key': self.api_key
         }
         
-        headers = {
-            'User-Agent': 'VJ_yattaro/1.0'
-        }
-        
         try:
-            response = requests.get(f"{base_url}?{urlencode(params)}", headers=headers, timeout=10)
+            response = self._get(base_url, params, self.DETAILS_COST)
             response.raise_for_status()
             
             data = response.json()
@@ -154,14 +216,14 @@ class YouTubeSearchThread(QThread):
             if 'items' not in data:
                 # エラー時はすべての動画に空のdurationを設定して返す
                 for video in videos:
-                    video['duration'] = ''
+                    video.duration = ''
                 return videos
             
         except Exception as e:
             print(f"Error filtering shorts: {e}")
             # エラー時はすべての動画に空のdurationを設定して返す
             for video in videos:
-                video['duration'] = ''
+                video.duration = ''
             return videos
         
         # 動画IDから長さ情報を作成
@@ -175,16 +237,31 @@ class YouTubeSearchThread(QThread):
         # ショート動画（60秒未満）を除外
         filtered_videos = []
         for video in videos:
-            video_id = video['video_id']
-            duration = duration_map.get(video_id, 0)
+            duration = duration_map.get(video.video_id, 0)
             
             # 60秒以上の動画のみを含める
             if duration >= 60:
-                video['duration'] = self._format_duration(duration)
+                video.duration = self._format_duration(duration)
                 filtered_videos.append(video)
         
         return filtered_videos
     
+    def check_embeddable(self, video_ids: List[str]) -> Dict[str, bool]:
+        """埋め込み再生できるか（videos.list の status.embeddable）を動画IDごとに返す（50件ずつ取得）"""
+        base_url = "https://www.googleapis.com/youtube/v3/videos"
+        result = {}
+        for start in range(0, len(video_ids), 50):
+            params = {
+                'part': 'status',
+                'id': ','.join(video_ids[start:start + 50]),
+                'key': self.api_key
+            }
+            response = self._get(base_url, params, self.DETAILS_COST)
+            response.raise_for_status()
+            for item in response.json().get('items', []):
+                result[item['id']] = bool(item.get('status', {}).get('embeddable', True))
+        return result
+    
     def _parse_duration(self, duration_str: str) -> int:
         """ISO 8601期間フォーマットを秒数に変換"""
         import re
@@ -208,27 +285,81 @@ class YouTubeSearchThread(QThread):
 
 
 class AsyncThumbnailManager(QObject):
-    """非同期サムネイル読み込みを管理するクラス（シーケンシャル版）"""
+    """非同期サムネイル読み込みを管理するクラス
+    
+    2段階で読み込む:
+      1. 小サイズ(default)のプレビューを全件並列で取得し、thumbnail_preview_ready で通知
+      2. 本サイズを1件ずつ順番に取得し、thumbnail_ready で通知（プレビューを置き換える）
+    """
     thumbnail_ready = Signal(str, object)  # video_id, thumbnail (QImage)
+    thumbnail_preview_ready = Signal(str, object)  # video_id, 小サイズのthumbnail (QImage)
     
     def __init__(self):
         super().__init__()
+        self.generation = 0  # 現在の検索の世代番号（これより古いジョブの結果は破棄する）
+        self._retired_loaders = set()  # 中断済みで終了待ちのスレッド
         self.current_loader = None
         self.pending_videos = []
         self.loaded_video_ids = set()  # 読み込み済み動画IDを追跡
+        self.completed_video_ids = set()  # 本サイズの読み込みが完了した動画ID
+        self.preview_loaders = []  # 並列実行中のプレビュー読み込みスレッド
+        self.previewed_video_ids = set()  # プレビュー読み込みを開始済みの動画ID
         self.is_loading = False
     
-    def reset(self):
-        """新しい検索開始時に呼ぶ。キューと読み込み済みIDをリセットする"""
+    def reset(self, generation: Optional[int] = None):
+        """新しい検索開始時に呼ぶ。キューと読み込み済みIDをリセットし、
+        古い世代の読み込み中スレッドは中断する"""
+        if generation is not None:
+            self.generation = generation
+        
+        # 読み込み中のスレッドは中断し、結果が新しいリストに入らないようにする
+        if self.current_loader:
+            self._retire_loader(self.current_loader)
+            self.current_loader = None
+        for loader in self.preview_loaders:
+            self._retire_loader(loader)
+        self.preview_loaders = []
+        
         self.pending_videos.clear()
         self.loaded_video_ids.clear()
+        self.completed_video_ids.clear()
+        self.previewed_video_ids.clear()
+        self.is_loading = False
+    
+    def _retire_loader(self, loader):
+        """スレッドを中断し、終了後に破棄されるようにする"""
+        loader.abort()
+        try:
+            loader.thumbnail_loaded.disconnect()
+            loader.finished.disconnect()
+        except:
+            pass
+        if loader.isRunning():
+            # 実行中のQThreadを破棄するとクラッシュするため、終了を待ってから破棄する
+            self._retired_loaders.add(loader)
+            loader.finished.connect(lambda l=loader: self._on_retired_finished(l))
+        else:
+            loader.deleteLater()
+    
+    def _on_retired_finished(self, loader):
+        """中断したスレッドの終了時のクリーンアップ"""
+        self._retired_loaders.discard(loader)
+        loader.deleteLater()
     
-    def load_thumbnails_async(self, videos: List[Dict]):
-        """複数のサムネイルを順番に非同期で読み込む"""
+    def load_thumbnails_async(self, videos: List[VideoItem], generation: Optional[int] = None):
+        """複数のサムネイルを非同期で読み込む（プレビューは並列、本サイズは順番）"""
+        # 古い検索の動画は読み込まない
+        if generation is not None and generation != self.generation:
+            print(f"AsyncThumbnailManager: Dropped stale thumbnail jobs (generation {generation} != {self.generation})")
+            return
+        
+        # 先に小サイズのプレビューを全件並列で取得する
+        self._load_previews(videos)
+        
         # 新しい動画のみをペンディングリストに追加（同一検索の2回目呼び出しを考慮してclearしない）
         for video in videos:
-            video_id = video.get('video_id')
-            if video_id and video_id not in self.loaded_video_ids and 'thumbnail_url' in video:
+            video_id = video.video_id
+            if video_id and video_id not in self.loaded_video_ids and video.thumbnail_url:
                 self.pending_videos.append(video)
         
         # 現在読み込み中でなければ開始
@@ -236,6 +367,39 @@ class AsyncThumbnailManager(QObject):
         if not self.is_loading and self.pending_videos:
             self._load_next_thumbnail()
     
+    def _load_previews(self, videos: List[VideoItem]):
+        """小サイズ(default)のサムネイルを全件並列で読み込む"""
+        for video in videos:
+            video_id = video.video_id
+            preview_url = video.thumbnail_preview_url
+            # 本サイズと同じURLしかない場合はプレビューの意味がないのでスキップ
+            if not video_id or not preview_url or preview_url == video.thumbnail_url:
+                continue
+            if video_id in self.previewed_video_ids or video_id in self.completed_video_ids:
+                continue
+            
+            self.previewed_video_ids.add(video_id)
+            loader = ThumbnailLoader(video_id, preview_url, generation=self.generation)
+            loader.thumbnail_loaded.connect(self._on_preview_loaded)
+            loader.finished.connect(lambda l=loader: self._on_preview_finished(l))
+            self.preview_loaders.append(loader)
+            loader.start()
+    
+    def _on_preview_loaded(self, video_id: str, thumbnail, generation: int):
+        """プレビュー読み込み完了時のコールバック"""
+        # 古い検索の結果、本サイズが先に届いている場合、取得失敗の場合は何もしない
+        if generation != self.generation:
+            return
+        if thumbnail is None or video_id in self.completed_video_ids:
+            return
+        self.thumbnail_preview_ready.emit(video_id, thumbnail)
+    
+    def _on_preview_finished(self, loader):
+        """プレビュー読み込みスレッド終了時のクリーンアップ"""
+        if loader in self.preview_loaders:
+            self.preview_loaders.remove(loader)
+        loader.deleteLater()
+    
     def _load_next_thumbnail(self):
         """次のサムネイルを読み込む"""
         if not self.pending_videos:
@@ -244,16 +408,22 @@ class AsyncThumbnailManager(QObject):
         
         self.is_loading = True
         video = self.pending_videos.pop(0)  # 先頭から取得（1位から順番）
-        video_id = video['video_id']
-        thumbnail_url = video['thumbnail_url']
+        video_id = video.video_id
+        thumbnail_url = video.thumbnail_url
         
         self.loaded_video_ids.add(video_id)
-        self.current_loader = ThumbnailLoader(video_id, thumbnail_url)
+        self.current_loader = ThumbnailLoader(video_id, thumbnail_url, generation=self.generation)
         self.current_loader.thumbnail_loaded.connect(self._on_thumbnail_loaded)
         self.current_loader.start()
     
-    def _on_thumbnail_loaded(self, video_id: str, thumbnail: QPixmap):
+    def _on_thumbnail_loaded(self, video_id: str, thumbnail: QPixmap, generation: int):
         """サムネイル読み込み完了時のコールバック"""
+        if generation != self.generation:
+            # 古い検索の結果はモデルに触れずに破棄する（reset で中断済みのはず）
+            print(f"AsyncThumbnailManager: Dropped stale thumbnail for {video_id} (generation {generation})")
+            return
+        if thumbnail is not None:
+            self.completed_video_ids.add(video_id)
         self.thumbnail_ready.emit(video_id, thumbnail)
         
         # 現在のローダーをクリーンアップ
@@ -268,7 +438,7 @@ class AsyncThumbnailManager(QObject):
         """すべてのサムネイル読み込みスレッドを停止"""
         if self.current_loader and self.current_loader.isRunning():
             try:
-                self.current_loader._is_aborted = True
+                self.current_loader.abort()
                 self.current_loader.thumbnail_loaded.disconnect()
             except:
                 pass
@@ -276,9 +446,25 @@ class AsyncThumbnailManager(QObject):
             self.current_loader.wait(1000)
             self.current_loader.deleteLater()
         
+        for loader in self.preview_loaders + list(self._retired_loaders):
+            try:
+                loader.abort()
+                loader.thumbnail_loaded.disconnect()
+                loader.finished.disconnect()
+            except:
+                pass
+            if loader.isRunning():
+                loader.quit()
+                loader.wait(1000)
+            loader.deleteLater()
+        
+        self._retired_loaders.clear()
         self.current_loader = None
+        self.preview_loaders = []
         self.pending_videos.clear()
         self.loaded_video_ids.clear()
+        self.completed_video_ids.clear()
+        self.previewed_video_ids.clear()
         self.is_loading = False
 
 
@@ -385,13 +571,16 @@ class YouTubeService(QObject):
         except Exception as e:
             return False, f"テンプレートの処理中にエラーが発生しました: {str(e)}"
     
-    def search_videos(self, query: str, callback=None):
-        """YouTubeで動画を検索"""
+    def search_videos(self, query: str, callback=None, generation: int = 0):
+        """YouTubeで動画を検索
+        
+        callback は (videos, generation) で呼ばれる。
+        """
         if not self.is_configured():
             raise Exception("YouTube API key not configured")
         
         # 検索スレッドを作成
-        self.search_thread = YouTubeSearchThread(self.get_api_key(), query)
+        self.search_thread = YouTubeSearchThread(self.get_api_key(), query, generation)
         
         # コールバックを接続
         if callback:
@@ -0,0 +1,148 @@
+"""
+標準ライブラリのみで実装した最小限の WebSocket（RFC 6455）サーバー側ヘルパー
+
+http.server のハンドラからアップグレードした接続で、テキストメッセージの送受信・
+ping/pong・close を扱う。拡張（permessage-deflate 等）には対応しない。
+"""
+
+import base64
+import hashlib
+import struct
+import threading
+from typing import Optional
+
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+# 受信メッセージの上限（プレイヤーのフィードバックは数百バイト程度）
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+
+class WebSocketClosed(Exception):
+    """接続が閉じられた"""
+    pass
+
+
+def is_upgrade_request(headers) -> bool:
+    """HTTPヘッダーが WebSocket へのアップグレード要求か判定"""
+    upgrade = (headers.get('Upgrade') or '').lower()
+    connection = (headers.get('Connection') or '').lower()
+    return upgrade == 'websocket' and 'upgrade' in connection and bool(headers.get('Sec-WebSocket-Key'))
+
+
+def accept_key(client_key: str) -> str:
+    """Sec-WebSocket-Key から Sec-WebSocket-Accept を計算"""
+    digest = hashlib.sha1((client_key.strip() + _WEBSOCKET_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+class WebSocketConnection:
+    """アップグレード済みソケット上の WebSocket 接続（送信はスレッドセーフ）"""
+
+    def __init__(self, rfile, wfile):
+        self._rfile = rfile
+        self._wfile = wfile
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+    def _read_exact(self, size: int) -> bytes:
+        data = self._rfile.read(size) if size else b''
+        if len(data) < size:
+            raise WebSocketClosed("connection closed while reading frame")
+        return data
+
+    def _read_frame(self):
+        """1フレームを読み取り (fin, opcode, payload) を返す"""
+        first, second = self._read_exact(2)
+        fin = bool(first & 0x80)
+        opcode = first & 0x0F
+        masked = bool(second & 0x80)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self._read_exact(8))[0]
+        if length > MAX_MESSAGE_SIZE:
+            raise WebSocketClosed(f"frame too large: {length}")
+
+        mask = self._read_exact(4) if masked else None
+        payload = self._read_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return fin, opcode, payload
+
+    def receive(self) -> Optional[str]:
+        """テキストメッセージを1件受信する。close を受け取った場合は None を返す
+
+        ping には自動で pong を返し、分割されたメッセージは結合して返す。
+        """
+        fragments = []
+        message_opcode = None
+        while True:
+            fin, opcode, payload = self._read_frame()
+
+            if opcode == OPCODE_PING:
+                self._send_frame(OPCODE_PONG, payload)
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode == OPCODE_CLOSE:
+                self.close()
+                return None
+
+            if opcode != OPCODE_CONTINUATION:
+                message_opcode = opcode
+                fragments = []
+            fragments.append(payload)
+            if sum(len(f) for f in fragments) > MAX_MESSAGE_SIZE:
+                raise WebSocketClosed("message too large")
+            if fin:
+                data = b''.join(fragments)
+                if message_opcode == OPCODE_TEXT:
+                    return data.decode('utf-8', errors='replace')
+                # バイナリメッセージは使わないので読み捨てる
+                fragments = []
+
+    def _send_frame(self, opcode: int, payload: bytes = b''):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(length)
+        elif length < 0x10000:
+            header.append(126)
+            header += struct.pack('!H', length)
+        else:
+            header.append(127)
+            header += struct.pack('!Q', length)
+
+        with self._send_lock:
+            if self.closed and opcode != OPCODE_CLOSE:
+                raise WebSocketClosed("connection already closed")
+            # ヘッダーと本文は1回の書き込みで送る
+            self._wfile.write(bytes(header) + payload)
+            self._wfile.flush()
+
+    def send_text(self, text: str):
+        """テキストメッセージを送信"""
+        self._send_frame(OPCODE_TEXT, text.encode('utf-8'))
+
+    def ping(self):
+        """ping を送信（接続の生存確認用）"""
+        self._send_frame(OPCODE_PING)
+
+    def close(self, code: int = 1000):
+        """close フレームを送信して接続を閉じた状態にする"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send_frame(OPCODE_CLOSE, struct.pack('!H', code))
+        except Exception:
+            pass
@@ -0,0 +1,206 @@
+"""
+コントロール入力からプレイヤー到達までのレイテンシ計測スクリプト
+
+OSC (UDP) で /vj/play を送ってから、プレイヤー（ロングポーリングのクライアント）に
+PLAY コマンドが届くまでの時間を計測し、ホットキー経由の場合と比較する。
+
+計測する経路:
+    direct : send_command() を直接呼ぶ（サーバー配信のみの下限値）
+    osc    : UDP送信 -> OscControlServer -> GUIスレッドのスロット -> send_command()
+    hotkey : キー入力の注入 -> WM_HOTKEY -> HotkeyService -> スロット -> send_command()（Windowsのみ）
+
+使い方:
+    python benchmarks/control_latency.py --count 50
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer
+
+# 計測用ホットキー（Ctrl+Alt+Shift+P）
+BENCH_HOTKEY = "ctrl+alt+shift+p"
+BENCH_HOTKEY_VKS = (0x11, 0x12, 0x10, 0x50)
+KEYEVENTF_KEYUP = 0x0002
+
+
+def _percentile(samples, ratio):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[int((len(ordered) - 1) * ratio)]
+
+
+def _osc_message(address):
+    """引数なしの OSC メッセージを組み立てる"""
+    def pad(data):
+        data += b'\0'
+        return data + b'\0' * (-len(data) % 4)
+    return pad(address.encode('ascii')) + pad(b',')
+
+
+class PlayerProbe:
+    """ロングポーリングでコマンドを受信し、videoId ごとの到着時刻を記録する"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def expect(self, video_id):
+        event = threading.Event()
+        with self._lock:
+            self._waiters[video_id] = [event, None]
+        return event
+
+    def arrival(self, video_id):
+        with self._lock:
+            return self._waiters.pop(video_id)[1]
+
+    def _run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        ack = ""
+        while not self._stop:
+            conn.request('GET', f'/poll?wait=5&clientId=latency-bench{ack}')
+            batch = json.loads(conn.getresponse().read().decode('utf-8'))
+            received_at = time.perf_counter()
+            for command in batch.get('commands', []):
+                with self._lock:
+                    waiter = self._waiters.get(command.get('videoId'))
+                    if waiter and waiter[1] is None:
+                        waiter[1] = received_at
+                        waiter[0].set()
+            if batch.get('commands'):
+                ack = f"&ack={batch['through']}&epoch={batch['epoch']}"
+        conn.close()
+
+    def stop(self):
+        self._stop = True
+
+
+class BenchController(QObject):
+    """MainWindow の play_current_video に相当するスロットを持つ受け側"""
+
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+        self.next_video_id = ""
+
+    def on_play(self):
+        self.server.send_command('PLAY', self.next_video_id)
+
+
+def _measure(name, count, probe, controller, trigger, results):
+    samples = []
+    lost = 0
+    for i in range(count):
+        video_id = f"bench-{name}-{i}"
+        controller.next_video_id = video_id
+        event = probe.expect(video_id)
+        started = time.perf_counter()
+        trigger(video_id)
+        if event.wait(2.0):
+            samples.append(probe.arrival(video_id) - started)
+        else:
+            probe.arrival(video_id)
+            lost += 1
+        time.sleep(0.05)
+    results[name] = (samples, lost)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OSC / hotkey to player latency benchmark")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--osc-port', type=int, default=19000)
+    parser.add_argument('--count', type=int, default=50)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+
+    from app.services.player_http_server import PlayerHttpServer
+    from app.services.osc_control_server import OscControlServer
+
+    server = PlayerHttpServer(host=args.host, port=args.port)
+    server.start()
+    osc = OscControlServer(host='127.0.0.1', port=args.osc_port)
+    osc.start()
+
+    controller = BenchController(server)
+    osc.play_triggered.connect(controller.on_play)
+
+    probe = PlayerProbe(args.host, args.port)
+    probe.start()
+
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    play_packet = _osc_message('/vj/play')
+
+    paths = [
+        ('direct', lambda video_id: server.send_command('PLAY', video_id)),
+        ('osc', lambda video_id: udp.sendto(play_packet, ('127.0.0.1', args.osc_port))),
+    ]
+    if sys.platform == 'win32':
+        import ctypes
+        from app.services.hotkey_service import HotkeyService
+        hotkeys = HotkeyService()
+        hotkeys.register_hotkeys(None, None, hotkey_play=BENCH_HOTKEY)
+        hotkeys.play_triggered.connect(controller.on_play)
+        user32 = ctypes.windll.user32
+
+        def hotkey_trigger(video_id):
+            for vk in BENCH_HOTKEY_VKS:
+                user32.keybd_event(vk, 0, 0, 0)
+            for vk in reversed(BENCH_HOTKEY_VKS):
+                user32.keybd_event(vk, 0, KEYEVENTF_KEYUP, 0)
+
+        paths.append(('hotkey', hotkey_trigger))
+
+    results = {}
+
+    def run_all():
+        time.sleep(0.3)
+        for name, trigger in paths:
+            _measure(name, args.count, probe, controller, trigger, results)
+
+    # 送信側は別スレッド、スロットは GUI スレッド（イベントループ）で処理する
+    sender = threading.Thread(target=run_all, daemon=True)
+    sender.start()
+
+    watchdog = QTimer()
+    watchdog.timeout.connect(lambda: None if sender.is_alive() else app.quit())
+    watchdog.start(50)
+    app.exec()
+
+    print(f"count={args.count}")
+    for name, _ in paths:
+        samples, lost = results.get(name, ([], args.count))
+        print(
+            f"  {name:7s} n={len(samples):4d} lost={lost:3d} "
+            f"p50={_percentile(samples, 0.50) * 1000:7.2f}ms "
+            f"p95={_percentile(samples, 0.95) * 1000:7.2f}ms "
+            f"max={max(samples, default=0) * 1000:7.2f}ms"
+        )
+    if sys.platform != 'win32':
+        print("  hotkey  (Windows のみ計測可能)")
+
+    probe.stop()
+    osc.stop()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+プレイヤーHTTPサーバーの負荷計測スクリプト
+
+複数のプレイヤータブを模擬して /poll（10Hz）と /feedback を keep-alive 接続で送り続け、
+クライアント側のレイテンシ（p50/p95/max）とサーバーの /status 統計を表示する。
+
+使い方:
+    python benchmarks/player_server_load.py --tabs 4 --seconds 10
+    python benchmarks/player_server_load.py --port 8080 --no-server  # 起動中のアプリに対して計測
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _percentile(samples, ratio):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[int((len(ordered) - 1) * ratio)]
+
+
+def _run_tab(host, port, seconds, interval, results, index):
+    """1タブ分のポーリングとフィードバックを送信し、レイテンシを記録する"""
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    poll_samples = []
+    feedback_samples = []
+    deadline = time.perf_counter() + seconds
+    tick = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        conn.request('GET', '/poll')
+        conn.getresponse().read()
+        poll_samples.append(time.perf_counter() - started)
+
+        # 1秒に1回フィードバックを送る（プレイヤーのハートビート相当）
+        if tick % 10 == 0:
+            body = json.dumps({"state": "heartbeat", "tab": index}).encode('utf-8')
+            started = time.perf_counter()
+            conn.request('POST', '/feedback', body=body, headers={'Content-Type': 'application/json'})
+            conn.getresponse().read()
+            feedback_samples.append(time.perf_counter() - started)
+
+        tick += 1
+        time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+    conn.close()
+    results[index] = (poll_samples, feedback_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Player HTTP server load test")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--tabs', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--interval', type=float, default=0.1)
+    parser.add_argument('--no-server', action='store_true', help="既に起動しているサーバーに対して計測する")
+    args = parser.parse_args()
+
+    server = None
+    if not args.no_server:
+        from app.services.player_http_server import PlayerHttpServer
+        server = PlayerHttpServer(host=args.host, port=args.port)
+        server.start()
+        time.sleep(0.2)
+
+    results = {}
+    threads = [
+        threading.Thread(target=_run_tab, args=(args.host, args.port, args.seconds, args.interval, results, i))
+        for i in range(args.tabs)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    polls = [s for poll, _ in results.values() for s in poll]
+    feedbacks = [s for _, feedback in results.values() for s in feedback]
+    print(f"tabs={args.tabs} seconds={args.seconds} interval={args.interval}")
+    for name, samples in (('poll', polls), ('feedback', feedbacks)):
+        print(
+            f"  {name:8s} n={len(samples):5d} "
+            f"p50={_percentile(samples, 0.50) * 1000:7.2f}ms "
+            f"p95={_percentile(samples, 0.95) * 1000:7.2f}ms "
+            f"max={max(samples, default=0) * 1000:7.2f}ms"
+        )
+
+    conn = http.client.HTTPConnection(args.host, args.port, timeout=5)
+    conn.request('GET', '/status')
+    status = json.loads(conn.getresponse().read().decode('utf-8'))
+    conn.close()
+    print("server:", json.dumps(status.get('request_stats', {}), indent=2))
+
+    if server:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
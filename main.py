@@ -144,6 +144,23 @@ class MainWindow(QMainWindow):
         # プレイヤー接続状態
         import time
         self._last_player_feedback_time = 0
+        # フィードバックの取り込み（1フレームに最大1回まとめて処理する）
+        self._feedback_drain_scheduled = False
+        self._last_feedback_drain = 0.0
+        self._last_feedback_state = {}  # (clientId, 種類) -> (state, videoId)
+        self._player_resource_warnings = set()  # (clientId, 種類) 警告済みのもの
+        # プレイヤーの候補スロットで先読み済みの動画（PRELOAD_MANY）
+        self._player_pools = {}  # clientId -> ready の videoId の集合
+        self._warm_video_ids = set()  # すべての出力で先読み済みの videoId
+        # プリロード画質（ready までの時間と再バッファから自動で上げ下げする）
+        from app.services.config_service import ConfigService
+        from app.services.preload_quality import PreloadQualityController
+        config = ConfigService()
+        self.preload_quality = PreloadQualityController(
+            str(config.get("preload_quality", "auto")),
+            int(config.get("preload_deadline_ms", 4000)),
+            str(config.get("preload_max_quality", "hd1080")),
+        )
         
         # メモリ管理
         self._memory_check_timer = QTimer(self)
@@ -294,8 +311,22 @@ class MainWindow(QMainWindow):
         
         # YouTube検索スレッドの管理
         self.youtube_search_thread = None
+        # 検索の世代番号（検索開始ごとに増加。古い世代のサムネイル・遅延追加・選択復元は破棄する）
+        self._search_generation = 0
         # 検索中に追加された「最新の保留検索」（1件のみ保持、古いものは上書き）
         self._pending_search_args = None
+        # リストに表示中の曲情報 (title, artist, comment, content_id)（再ランキング・再生した動画の記憶に使う）
+        self._search_track = None
+        # 曲ごとに再生した動画の記憶と、リストの先頭に固定している動画
+        from app.services.video_affinity import VideoAffinityStore
+        self.video_affinity = VideoAffinityStore()
+        self._pinned_videos = []
+        self._affinity_recorded = None  # (曲情報, videoId) 記録済みのもの
+        # プレイリストの先読み（次の曲の検索・サムネイル）
+        self._playlist_prefetcher = None
+        self._retired_prefetchers = set()  # 中断済みで終了待ちのスレッド
+        # 検索結果から自動でプリロードした動画（新しい検索で取り消す）
+        self._speculative_video_id = None
         # 保留検索の実行タイマー
         self._pending_search_timer = QTimer(self)
         self._pending_search_timer.setSingleShot(True)
@@ -309,9 +340,14 @@ class MainWindow(QMainWindow):
         
         # 状態フィードバック用の信号を接続（スレッドセーフ）
         from app.services.player_http_server import feedback_signals
-        feedback_signals.feedback_received.connect(self._handle_player_feedback)
+        feedback_signals.feedback_pending.connect(self._on_player_feedback_pending)
         print("UI: Player HTTP server started")
 
+        # OSCコントロール受信（設定で有効な場合のみ。ホットキーと同じ操作に接続する）
+        self.osc_server = None
+        self._osc_settings = None
+        self._start_osc_server_if_enabled()
+
         # イベントフィルターをインストール（フォーカス管理やタイマー制御用）
         # すべての操作可能な領域に対してフィルターを設定し、クリックを確実に捕捉する
         self.installEventFilter(self)
@@ -339,11 +375,19 @@ class MainWindow(QMainWindow):
         self._reset_youtube_state()
 
     def _open_player_in_browser(self):
-        """起動時にYouTubeプレイヤーを既定ブラウザで開く（既に開いている場合はスキップ）"""
+        """起動時にYouTubeプレイヤーを既定ブラウザで開く（既に開いている場合はスキップ）
+        
+        player_output_mode が "embedded" の場合はブラウザの代わりにアプリ内出力ウィンドウを開く。
+        """
         from app.utils.logger import info, error
         import time
         
         try:
+            if self.config_service.get("player_output_mode", "browser") == "embedded":
+                if self._open_player_output_window():
+                    self._player_browser_opened = True
+                    return
+            
             if self._player_browser_opened:
                 return
 
@@ -357,9 +401,9 @@ class MainWindow(QMainWindow):
                 try:
                     from app.services.player_http_server import PlayerCommandHandler
                     import time
-                    # 前回のポーリング時刻を取得（PlayerCommandHandlerに持たせるか、サーバー内部の状態を見る）
+                    # いずれかのプレイヤーが最後にアクセスした時刻（待機中の接続を含む）
                     # ここではシンプルに前回フィードバック時刻も併用
-                    last_access = getattr(PlayerCommandHandler, '_last_poll_time', 0)
+                    last_access = PlayerCommandHandler.command_log.last_activity
                 except:
                     pass
                 
@@ -376,7 +420,7 @@ class MainWindow(QMainWindow):
                 # サーバー配下の player.html を開き、デフォルト再生動画IDをクエリで渡す
                 port = int(self.config_service.get("player_port", 8080))
                 default_video_id = "eyUUHfVm8Ik"
-                url = f"http://localhost:{port}/player.html?defaultVideoId={default_video_id}"
+                url = f"http://localhost:{port}/player.html?defaultVideoId={default_video_id}{self._player_url_options()}"
                 webbrowser.open(url, new=1, autoraise=True)
                 self._player_browser_opened = True
                 info(f"Opened player in browser: {url}", "UI")
@@ -387,6 +431,83 @@ class MainWindow(QMainWindow):
         except Exception as e:
             error(f"Failed to open player in browser: {e}", "UI")
 
+    def _player_url_options(self):
+        """player.html に渡す設定のクエリ（先頭の & を含む）"""
+        options = f"&poolSize={int(self.config_service.get('player_pool_size', 4))}"
+        options += f"&recycleAfter={int(self.config_service.get('player_recycle_after', 50))}"
+        if self.config_service.get("position_sync_enabled", False):
+            # 再生位置を報告させる（リーダーの位置に合わせるため）
+            options += "&sync=1"
+        options += f"&quality={self.preload_quality.quality}"
+        return options
+    
+    def _open_player_output_window(self):
+        """アプリ内出力ウィンドウ（QtWebEngine + QWebChannel）を開く。使えない場合は False を返す"""
+        from app.utils.logger import info, error
+        from ui.widgets.player_output_window import WEBENGINE_AVAILABLE, EMBEDDED_CLIENT_ID
+        
+        if not WEBENGINE_AVAILABLE:
+            error("QtWebEngine is not available. Falling back to external browser.", "UI")
+            return False
+        
+        from PySide6.QtCore import QUrl
+        from app.services.player_http_server import PlayerCommandHandler
+        from ui.widgets.player_output_window import PlayerOutputWindow
+        
+        # ページ（静的ファイル）はプレイヤーサーバーから読み込み、コマンドとフィードバックはブリッジで送る
+        port = int(self.config_service.get("player_port", 8080))
+        url = (f"http://localhost:{port}/player.html?defaultVideoId=eyUUHfVm8Ik"
+               f"&clientId={EMBEDDED_CLIENT_ID}&transport=qwebchannel{self._player_url_options()}")
+        
+        window = getattr(self, 'player_output_window', None)
+        if window is not None:
+            # ポート変更時などはページを読み直す
+            window.view.setUrl(QUrl(url))
+            window.show()
+            return True
+        
+        self.player_output_window = PlayerOutputWindow(url, PlayerCommandHandler.command_log)
+        self.player_output_window.closed.connect(self._on_player_output_window_closed)
+        self.player_output_window.show()
+        info(f"Opened in-app player output: {url}", "UI")
+        return True
+    
+    def _on_player_output_window_closed(self):
+        """アプリ内出力ウィンドウが閉じられた"""
+        from ui.widgets.player_output_window import EMBEDDED_CLIENT_ID
+        window = getattr(self, 'player_output_window', None)
+        self.player_output_window = None
+        if window is not None:
+            window.deleteLater()
+        # 閉じたウィンドウの候補は即再生の判定に使わない
+        if self._player_pools.pop(EMBEDDED_CLIENT_ID, None) is not None:
+            self._refresh_warm_video_ids()
+    
+    def _apply_player_output_mode(self):
+        """player_output_mode の変更を反映（アプリ内出力ウィンドウの開閉）"""
+        embedded = self.config_service.get("player_output_mode", "browser") == "embedded"
+        window = getattr(self, 'player_output_window', None)
+        if embedded and window is None:
+            self._open_player_output_window()
+        elif not embedded and window is not None:
+            window.close()
+    
+    def _apply_position_sync(self):
+        """再生位置の同期設定をプレイヤーサーバーに反映（開いている出力には開き直すまで反映されない）"""
+        from app.services.player_http_server import PlayerCommandHandler
+        PlayerCommandHandler.position_sync.configure(
+            bool(self.config_service.get("position_sync_enabled", False)),
+            str(self.config_service.get("position_sync_leader", "")),
+        )
+    
+    def _apply_preload_quality(self):
+        """プリロード画質の設定を反映（次の PRELOAD から使われる）"""
+        self.preload_quality.configure(
+            str(self.config_service.get("preload_quality", "auto")),
+            int(self.config_service.get("preload_deadline_ms", 4000)),
+            str(self.config_service.get("preload_max_quality", "hd1080")),
+        )
+    
     def _reset_youtube_state(self):
         """YouTube動画の状態をリセット"""
         from app.utils.logger import info
@@ -396,6 +517,11 @@ class MainWindow(QMainWindow):
         self.last_clicked_video_id = None
         self.current_playing_video_id = None
         self.pending_play_video_id = None
+        self._speculative_video_id = None
+        # 同じ状態の再通知も反映されるよう、重複判定をリセット
+        self._last_feedback_state = {}
+        self._player_pools = {}
+        self._set_warm_video_ids(set())
         self._update_youtube_border_color_safe('#a52a2a')  # デフォルトの枠線色
         info("YouTube state reset to default", "UI")
     
@@ -415,6 +541,10 @@ class MainWindow(QMainWindow):
             self.reload_hotkeys()  # ホットキーを再登録
             self.apply_window_placement_mode()  # ウィンドウ配置モードを反映
             self._restart_player_server_if_needed()  # プレイヤーサーバー設定を反映
+            self._restart_osc_server_if_needed()  # OSC受信設定を反映
+            self._apply_player_output_mode()  # プレイヤー出力方式を反映
+            self._apply_position_sync()  # 再生位置の同期設定を反映
+            self._apply_preload_quality()  # プリロード画質の設定を反映
         else:
             print("UI: Settings dialog cancelled.")
 
@@ -439,6 +569,50 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"UI: Failed to restart player server: {e}")
 
+    def _get_osc_settings(self):
+        """OSC受信の設定 (enabled, host, port) を取得"""
+        return (
+            bool(self.config_service.get("osc_enabled", False)),
+            str(self.config_service.get("osc_host", "127.0.0.1")),
+            int(self.config_service.get("osc_port", 9000)),
+        )
+
+    def _start_osc_server_if_enabled(self):
+        """osc_enabled が有効なら OSC 受信を開始し、ホットキーと同じスロットに接続する"""
+        enabled, host, port = self._get_osc_settings()
+        self._osc_settings = (enabled, host, port)
+        if not enabled:
+            return
+
+        from app.services.osc_control_server import start_osc_server
+        self.osc_server = start_osc_server(host=host, port=port)
+        self.osc_server.move_up_triggered.connect(self.move_selection_up)
+        self.osc_server.move_down_triggered.connect(self.move_selection_down)
+        self.osc_server.move_left_triggered.connect(self.move_youtube_selection_left)
+        self.osc_server.move_right_triggered.connect(self.move_youtube_selection_right)
+        self.osc_server.preload_triggered.connect(self.preload_current_video)
+        self.osc_server.play_triggered.connect(self.play_current_video)
+        self.osc_server.play_at_triggered.connect(self.play_current_video_at)
+        self.osc_server.search_triggered.connect(self.search_selected_track)
+        self.osc_server.rewind_triggered.connect(self.rewind_video)
+        self.osc_server.forward_triggered.connect(self.forward_video)
+        print(f"UI: OSC control enabled on udp://{host}:{port}")
+
+    def _restart_osc_server_if_needed(self):
+        """OSC受信の設定が変更されていたら受信を再起動する"""
+        try:
+            if self._get_osc_settings() == self._osc_settings:
+                return
+
+            from app.services.osc_control_server import stop_osc_server
+
+            print(f"UI: Restarting OSC control due to settings change: {self._osc_settings} -> {self._get_osc_settings()}")
+            stop_osc_server()
+            self.osc_server = None
+            self._start_osc_server_if_enabled()
+        except Exception as e:
+            print(f"UI: Failed to restart OSC control: {e}")
+
     def apply_window_placement_mode(self):
         """設定に基づいてウィンドウ配置モードを反映する"""
         always_on_top = bool(self.config_service.get("always_on_top", False))
@@ -457,20 +631,23 @@ class MainWindow(QMainWindow):
 
     def on_history_updated(self, new_history):
         """Watcherから新しい履歴データを受け取った時の処理"""
-        # 現在の選択行（インデックス）を退避
+        # 現在の選択行を行番号ではなく履歴の識別キーで退避
         selection_model = self.right_table.selectionModel()
         if not selection_model:
             return
 
         current_indexes = selection_model.selectedRows()
-        current_row = current_indexes[0].row() if current_indexes else -1
+        selected_key = self.table_model.row_key(current_indexes[0].row()) if current_indexes else None
 
-        # モデルのデータを更新
-        self.table_model.update_data(new_history)
+        # モデルのデータを差分更新（変化がなければ何もしない）
+        changed = self.table_model.update_data(new_history)
 
-        # 選択状態を再適用
-        if current_row != -1:
-            self.right_table.selectRow(current_row)
+        # 行挿入・削除では選択が同じ行に追従するため、外れた場合（リセット時など）のみ再適用
+        if changed and selected_key is not None:
+            row = self.table_model.row_of_key(selected_key)
+            current_indexes = selection_model.selectedRows()
+            if row != -1 and (not current_indexes or current_indexes[0].row() != row):
+                self.right_table.selectRow(row)
         
         # 元々の表から更新されていた場合、一番上の項目で自動で検索を実行
         if len(new_history) > 0:
@@ -490,7 +667,10 @@ class MainWindow(QMainWindow):
                     comment = new_top_track[2] or ""
                     
                     print(f"UI: Auto-searching YouTube for updated top track: {track_title} by {artist}")
-                    self.search_youtube(track_title, artist, comment)
+                    self.search_youtube(track_title, artist, comment, getattr(new_top_track, 'content_id', None))
+                
+                # プレイリストで次に並んでいる曲を先に検索しておく
+                self._start_playlist_lookahead(new_history)
             elif not hasattr(self, '_last_top_track'):
                 # 初回設定
                 self._last_top_track = new_top_track
@@ -768,13 +948,13 @@ class MainWindow(QMainWindow):
             return
         
         # 選択された動画データを取得
-        video_data = current_index.data(Qt.DisplayRole)
-        if not video_data:
+        video_item = self.left_pane.model.get_video_at(current_index.row())
+        if not video_item:
             print("UI: No video data available for selected item")
             return
         
-        video_id = video_data.get('video_id', '')
-        title = video_data.get('title', '')
+        video_id = video_item.video_id
+        title = video_item.title
         
         if not video_id:
             print("UI: No video ID found for selected YouTube video")
@@ -797,9 +977,10 @@ class MainWindow(QMainWindow):
             return
 
         if hasattr(self, 'player_server') and self.player_server:
+            self._speculative_video_id = None  # 手動でプリロードしたものは取り消さない
             self.preloaded_video_id = video_id
             self.pending_play_video_id = None
-            self.player_server.send_command('PRELOAD', video_id)
+            self.player_server.send_command('PRELOAD', video_id, quality=self.preload_quality.quality)
             self._update_youtube_video_state('preloading', video_id)
             print(f"UI: Sent PRELOAD command via hotkey for video: {video_id}")
         else:
@@ -832,13 +1013,13 @@ class MainWindow(QMainWindow):
             return
         
         # 選択された動画データを取得
-        video_data = current_index.data(Qt.DisplayRole)
-        if not video_data:
+        video_item = self.left_pane.model.get_video_at(current_index.row())
+        if not video_item:
             print("UI: No video data available for selected item")
             return
         
-        video_id = video_data.get('video_id', '')
-        title = video_data.get('title', '')
+        video_id = video_item.video_id
+        title = video_item.title
         
         if not video_id:
             print("UI: No video ID found for selected YouTube video")
@@ -847,9 +1028,13 @@ class MainWindow(QMainWindow):
         print(f"UI: Playing YouTube video via hotkey: {title} ({video_id})")
         
         # Shift+Enter 仕様:
-        # - ready のサムネイルなら即再生
+        # - ready のサムネイル（候補として先読み済みのものを含む）なら即再生
         # - それ以外はプリロード開始→ready 到達次第自動再生
-        is_selected_ready = (self.youtube_video_state == 'ready' and self.preloaded_video_id == video_id)
+        self._refresh_warm_video_ids()
+        is_selected_ready = (
+            (self.youtube_video_state == 'ready' and self.preloaded_video_id == video_id)
+            or video_id in self._warm_video_ids
+        )
         print(f"UI: Current state: {self.youtube_video_state}, preloaded_video_id: {self.preloaded_video_id}, selected video: {video_id}")
         
         if is_selected_ready:
@@ -863,14 +1048,44 @@ class MainWindow(QMainWindow):
             return
 
         if hasattr(self, 'player_server') and self.player_server:
+            self._speculative_video_id = None  # 手動でプリロードしたものは取り消さない
             self.preloaded_video_id = video_id
             self.pending_play_video_id = video_id
-            self.player_server.send_command('PRELOAD', video_id)
+            self.player_server.send_command('PRELOAD', video_id, quality=self.preload_quality.quality)
             self._update_youtube_video_state('preloading', video_id)
             print(f"UI: Sent PRELOAD command, will auto-play when ready (play hotkey): {video_id}")
         else:
             print("UI: Player server not available for play")
     
+    def play_current_video_at(self, at_ms=0.0):
+        """現在選択中のYouTube動画を指定時刻（サーバー時計の Unix ミリ秒）に切り替える（PLAY_AT）
+        
+        at_ms が 0 の場合は play_at_lead_ms 後。プレイヤーは時計合わせの結果を使って
+        その時刻にクロスフェードを始め、予定とのずれを playing フィードバックで返す。
+        """
+        import time
+        current_index = self.left_pane.currentIndex()
+        if not current_index.isValid():
+            print("UI: No YouTube video selected for scheduled play")
+            return
+        
+        video_item = self.left_pane.model.get_video_at(current_index.row())
+        if not video_item or not video_item.video_id:
+            print("UI: No video data available for selected item")
+            return
+        
+        video_id = video_item.video_id
+        if not at_ms:
+            at_ms = time.time() * 1000 + int(self.config_service.get("play_at_lead_ms", 500))
+        
+        if hasattr(self, 'player_server') and self.player_server:
+            # 先読みされていなければプレイヤーが今から読み込む。切り替えは playing フィードバックで反映する
+            self.pending_play_video_id = None
+            self.player_server.send_command('PLAY_AT', video_id, at=at_ms, quality=self.preload_quality.quality)
+            print(f"UI: Sent PLAY_AT command for {video_id} in {at_ms - time.time() * 1000:.0f}ms")
+        else:
+            print("UI: Player server not available for scheduled play")
+    
     def rewind_video(self):
         """現在再生中の動画を指定秒数巻き戻す"""
         rewind_seconds = self.config_service.get("rewind_seconds", 2)
@@ -913,7 +1128,7 @@ class MainWindow(QMainWindow):
             print(f"UI: Double clicked on track: {track_title} by {artist}")
             
             # YouTube検索を実行
-            self.search_youtube(track_title, artist, comment)
+            self.search_youtube(track_title, artist, comment, getattr(track_info, 'content_id', None))
     
     def search_selected_track(self):
         """右ペインで選択中の楽曲でYouTube検索する（Ctrl+Shift+Enter）"""
@@ -950,13 +1165,14 @@ class MainWindow(QMainWindow):
             print(f"UI: Searching YouTube for selected track: {track_title} by {artist}")
             
             # YouTube検索を実行
-            self.search_youtube(track_title, artist, comment)
+            self.search_youtube(track_title, artist, comment, getattr(track_info, 'content_id', None))
         else:
             print("UI: Invalid track data for search")
     
-    def search_youtube(self, track_title, artist, comment):
+    def search_youtube(self, track_title, artist, comment, content_id=None):
         """YouTubeで動画を検索。
         
+        - 以前この曲で再生した動画があれば、検索を待たずにリストの先頭に表示してプリロードする。
         - 検索中でなければ即座に実行する。
         - 既に検索中の場合は「保留キュー」に登録する（最新1件のみ）。
           既にキューに入っていた曲は破棄し、最後に追加されたものだけを保持する。
@@ -965,10 +1181,16 @@ class MainWindow(QMainWindow):
         from app.utils.logger import info, error
         from app.services.youtube_service import YouTubeService
         
+        # 別の曲の検索なら前の曲の自動プリロードを取り消し、覚えている動画を先に表示する
+        track = (track_title, artist, comment, content_id)
+        if track != self._search_track:
+            self._cancel_speculative_preload()
+            self._pin_remembered_videos(track)
+        
         # 検索中なら保留キューに登録して終了
         if self.youtube_search_thread and self.youtube_search_thread.isRunning():
             # 古い保留は破棄して最新の1件だけ保持
-            self._pending_search_args = (track_title, artist, comment)
+            self._pending_search_args = track
             info(f"Search queued (previous search running): {track_title}", "UI")
             return
         
@@ -989,11 +1211,19 @@ class MainWindow(QMainWindow):
         # 検索中のUI状態を設定（検索ボックスのみ無効化）
         self._set_searching_state(True)
         
+        # 新しい世代を開始し、前の検索のサムネイル読み込み（通信中のものを含む）を中断する
+        self._search_generation += 1
+        generation = self._search_generation
+        self._search_track = track
+        if hasattr(self, '_thumbnail_manager') and self._thumbnail_manager:
+            self._thumbnail_manager.reset(generation)
+        
         try:
             # YouTube検索を実行
             self.youtube_search_thread = youtube_service.search_videos(
                 search_query, 
-                self.on_youtube_search_completed
+                self.on_youtube_search_completed,
+                generation
             )
             
             # エラーシグナルも接続
@@ -1010,6 +1240,53 @@ class MainWindow(QMainWindow):
             self._set_searching_state(False)
             self._show_dummy_youtube_results()
     
+    def _start_playlist_lookahead(self, history):
+        """最後に再生された曲のプレイリストから次の lookahead_tracks 曲を先読みする（前の先読みは中断）"""
+        from app.services.playlist_prefetcher import PlaylistPrefetcher
+        from app.services.youtube_service import YouTubeService
+        
+        count = int(self.config_service.get("lookahead_tracks", 3))
+        content_id = getattr(history[0], 'content_id', None) if history else None
+        if count <= 0 or not content_id:
+            return
+        youtube_service = YouTubeService()
+        if not youtube_service.is_configured():
+            return
+        
+        previous_content_id = getattr(history[1], 'content_id', None) if len(history) > 1 else None
+        tracks = self.watcher.service.get_playlist_lookahead(content_id, count, previous_content_id)
+        queries = [youtube_service.create_search_query_from_track(t.title, t.artist, t.comment) for t in tracks]
+        queries = [query for query in queries if query]
+        if not queries:
+            return
+        
+        self._stop_playlist_lookahead()
+        prefetcher = PlaylistPrefetcher(
+            queries,
+            youtube_service.get_api_key(),
+            int(self.config_service.get("prefetch_quota_units", 1010)),
+            int(self.config_service.get("prefetch_thumbnails_per_track", 5)),
+        )
+        prefetcher.finished.connect(lambda p=prefetcher: self._on_playlist_prefetcher_finished(p))
+        self._playlist_prefetcher = prefetcher
+        prefetcher.start()
+        print(f"UI: Prefetching next {len(queries)} playlist tracks: {queries}")
+    
+    def _stop_playlist_lookahead(self):
+        """実行中の先読みを中断する（終了するまで参照を保持する）"""
+        prefetcher = self._playlist_prefetcher
+        self._playlist_prefetcher = None
+        if prefetcher is not None and prefetcher.isRunning():
+            prefetcher.abort()
+            self._retired_prefetchers.add(prefetcher)
+    
+    def _on_playlist_prefetcher_finished(self, prefetcher):
+        """先読みスレッド終了時のクリーンアップ"""
+        self._retired_prefetchers.discard(prefetcher)
+        if self._playlist_prefetcher is prefetcher:
+            self._playlist_prefetcher = None
+        prefetcher.deleteLater()
+    
     def _set_searching_state(self, is_searching):
         """検索中のUI状態を設定（検索ボックスのみ無効化）"""
         if is_searching:
@@ -1047,16 +1324,27 @@ class MainWindow(QMainWindow):
         if self._pending_search_args is None:
             return
         
-        track_title, artist, comment = self._pending_search_args
+        track_title, artist, comment, content_id = self._pending_search_args
         self._pending_search_args = None  # キューをクリア
         
         info(f"Executing pending search: {track_title}", "UI")
-        self.search_youtube(track_title, artist, comment)
+        self.search_youtube(track_title, artist, comment, content_id)
 
-    def on_youtube_search_completed(self, videos):
+    def on_youtube_search_completed(self, videos, generation):
         """YouTube検索完了時のコールバック"""
         from app.utils.logger import info, debug
         
+        # 新しい検索が始まった後に届いた古い結果はモデルに触れずに破棄する
+        if generation != self._search_generation:
+            info(f"Dropped stale search results (generation {generation}, current {self._search_generation})", "UI")
+            return
+        
+        # 覚えている動画は先頭に固定し、検索結果はその後ろの候補として並べる
+        pinned = self._pinned_videos
+        if pinned:
+            pinned_ids = {video.video_id for video in pinned}
+            videos = pinned + [video for video in videos if video.video_id not in pinned_ids]
+        
         if not videos:
             info("No YouTube videos found", "UI")
             self.left_pane.clear_results()
@@ -1070,114 +1358,250 @@ class MainWindow(QMainWindow):
         # 検索完了を通知
         self._on_search_finished()
         
+        # 曲の情報で再ランキングし、最も曲らしい動画を選ぶ（最初の5件に入っていなければ先頭に移す）
+        # 覚えている動画がある場合は、それを選択・プリロード済みなので再ランキングしない
+        best = None if pinned else self._rank_search_results(videos)
+        if best is not None and best.original_rank >= 5:
+            videos = [best.video] + [video for video in videos if video is not best.video]
+        
         # 段階的表示：まず5件だけ即時表示
         initial_display_count = min(5, len(videos))
         initial_videos = videos[:initial_display_count]
         remaining_videos = videos[initial_display_count:]
         
-        # 最初の5件を即時表示（サムネイルなし）
-        processed_videos = []
-        for video in initial_videos:
-            processed_videos.append({
-                'video_id': video.get('video_id', ''),
-                'title': video.get('title', ''),
-                'thumbnail': None,  # 後で非同期読み込み
-                'duration': video.get('duration', ''),
-                'url': video.get('url', '')
-            })
-        
-        # 左ペインに即時表示
-        self.left_pane.set_search_results(processed_videos)
+        # 最初の5件を即時表示（サムネイルは後で非同期読み込み）
+        self.left_pane.set_search_results(initial_videos)
         info(f"Found {len(videos)} YouTube videos (showing {initial_display_count} immediately)", "UI")
         
-        # 最初の動画を選択状態にする（遅延実行で確実に設定）
-        if processed_videos:
-            QTimer.singleShot(200, self._select_first_video)  # 50msから200msに延長
+        # 最も曲らしい動画（なければ最初の動画）を選択状態にする（遅延実行で確実に設定）
+        if initial_videos:
+            best_video_id = best.video.video_id if best is not None else None
+            QTimer.singleShot(200, lambda: self._select_first_video(generation, best_video_id))  # 50msから200msに延長
+        
+        # 最も曲らしい動画は方針に応じて自動でプリロードする（次の再生先になるので候補の先読みからは外す）
+        warm_videos = videos
+        if pinned:
+            warm_videos = videos[1:]
+        elif best is not None and self._speculative_preload(best):
+            warm_videos = [video for video in videos if video is not best.video]
+        
+        # 上位の候補をプレイヤーの空きスロットで先読みしておく
+        self._warm_top_results(warm_videos)
         
         # 非同期でサムネイルを読み込む（最初の5件）
         # 新しい検索開始なのでキューをリセットしてから追加
         if hasattr(self, '_thumbnail_manager') and self._thumbnail_manager:
-            self._thumbnail_manager.reset()
-        self._load_thumbnails_async(initial_videos)
+            self._thumbnail_manager.reset(generation)
+        self._load_thumbnails_async([video for video in initial_videos if not video.has_thumbnail()], generation)
         
         # 残りの動画をバックグラウンドで追加
         if remaining_videos:
-            self._schedule_remaining_videos(remaining_videos)
+            self._schedule_remaining_videos(remaining_videos, generation)
         
         # ホットキー設定が有効な場合、指定時間後に最背面に移動
         if self.config_service.get("bring_to_front_on_hotkey", True):
             delay_seconds = int(self.config_service.get("bring_to_back_delay_s", 3))
             self._schedule_bring_to_back(delay_seconds)
     
-    def _schedule_remaining_videos(self, remaining_videos):
+    def _rank_search_results(self, videos):
+        """検索結果を曲の情報で再ランキングし、最上位の RankedVideo を返す（曲の情報がなければ None）"""
+        from app.services.result_ranker import ResultRanker
+        if not self._search_track or not any(self._search_track):
+            return None
+        track_title, artist, comment, _ = self._search_track
+        ranked = ResultRanker().rank(videos, track_title, artist, comment)
+        if not ranked:
+            return None
+        best = ranked[0]
+        print(f"UI: Best match: {best.video.title} ({best.video.video_id}) score {best.score} "
+              f"(text {best.text_score}, duration x{best.duration_factor}, search rank {best.original_rank + 1})")
+        return best
+    
+    def _speculative_preload(self, best):
+        """再ランキングの最上位を auto_preload_policy に応じて自動でプリロードする。送った場合は True"""
+        from app.services.result_ranker import AUTO_PRELOAD_ALWAYS, AUTO_PRELOAD_CONFIDENT
+        policy = self.config_service.get("auto_preload_policy", AUTO_PRELOAD_CONFIDENT)
+        if policy == AUTO_PRELOAD_CONFIDENT:
+            min_score = float(self.config_service.get("auto_preload_min_score", 0.5))
+            if best.score < min_score:
+                print(f"UI: Skipped auto-preload (score {best.score} < {min_score})")
+                return False
+        elif policy != AUTO_PRELOAD_ALWAYS:
+            return False
+        if self._send_speculative_preload(best.video.video_id):
+            print(f"UI: Auto-preloaded best match: {best.video.video_id}")
+            return True
+        return False
+    
+    def _send_speculative_preload(self, video_id):
+        """自動プリロードを送る（新しい検索で取り消せるよう記録する）。送った場合は True"""
+        if not (hasattr(self, 'player_server') and self.player_server):
+            return False
+        # ready 到達次第再生する動画を待っている間は、次の再生先を置き換えない
+        if self.pending_play_video_id:
+            print(f"UI: Skipped auto-preload (waiting to play {self.pending_play_video_id})")
+            return False
+        if video_id == self.current_playing_video_id or video_id == self.preloaded_video_id:
+            return False
+        self._speculative_video_id = video_id
+        self._preload_video(video_id)
+        return True
+    
+    def _pin_remembered_videos(self, track):
+        """以前この曲で再生した動画をリストの先頭に表示し、最もよく使う動画をすぐにプリロードする
+        
+        検索結果が届いたら、その後ろに残りの候補として並べる。
+        """
+        from app.models.video_item import VideoItem
+        from app.services.result_ranker import AUTO_PRELOAD_OFF
+        track_title, artist, _, content_id = track
+        remembered = self.video_affinity.lookup(track_title, artist, content_id)
+        self._pinned_videos = [
+            VideoItem(
+                info['videoId'],
+                title=info.get('title', ''),
+                duration=info.get('duration', ''),
+                thumbnail_url=info.get('thumbnailUrl', ''),
+                thumbnail_preview_url=info.get('thumbnailPreviewUrl', ''),
+            )
+            for info in remembered
+        ]
+        if not self._pinned_videos:
+            return
+        
+        # 検索中の前の曲の結果で上書きされないよう、新しい世代として表示する
+        self._search_generation += 1
+        generation = self._search_generation
+        self._search_track = track
+        if hasattr(self, '_thumbnail_manager') and self._thumbnail_manager:
+            self._thumbnail_manager.reset(generation)
+        self.left_pane.set_search_results(self._pinned_videos)
+        self._select_first_video(generation)
+        self._load_thumbnails_async(self._pinned_videos, generation)
+        
+        video_id = self._pinned_videos[0].video_id
+        print(f"UI: Pinned {len(self._pinned_videos)} remembered videos for {track_title} ({video_id} first)")
+        if self.config_service.get("auto_preload_policy", "confident") != AUTO_PRELOAD_OFF:
+            if self._send_speculative_preload(video_id):
+                print(f"UI: Preloaded remembered video: {video_id}")
+    
+    def _remember_played_video(self, video_id):
+        """表示中の曲のリストから再生された動画を、その曲の動画として記憶する"""
+        if not self._search_track or not video_id:
+            return
+        track_title, artist, _, content_id = self._search_track
+        # 検索ボックスからの検索（曲ではない）は記憶しない
+        if not (content_id or artist):
+            return
+        if self._affinity_recorded == (self._search_track, video_id):
+            return
+        row = self.left_pane.model.row_of(video_id)
+        if row == -1:
+            return
+        video = self.left_pane.model.get_video_at(row)
+        if video is not None and self.video_affinity.record_play(track_title, artist, content_id, video):
+            self._affinity_recorded = (self._search_track, video_id)
+    
+    def _cancel_speculative_preload(self):
+        """自動プリロードを取り消す（プレイヤーには読み込んだまま残るが、次の再生先としては扱わない）"""
+        video_id = self._speculative_video_id
+        self._speculative_video_id = None
+        if not video_id or self.preloaded_video_id != video_id:
+            return
+        self.preloaded_video_id = None
+        if self.youtube_video_state in ('preloading', 'ready'):
+            self.youtube_video_state = None
+        print(f"UI: Cancelled auto-preload: {video_id}")
+    
+    def _warm_top_results(self, videos):
+        """検索結果の上位 warm_top_k 件を PRELOAD_MANY でプレイヤーの候補スロットに先読みさせる"""
+        top_k = int(self.config_service.get("warm_top_k", 2))
+        if top_k <= 0 or not (hasattr(self, 'player_server') and self.player_server):
+            return
+        # 再生中・次の再生先で2スロット使うので、候補に使えるのは残りのスロットだけ
+        pool_size = int(self.config_service.get("player_pool_size", 4))
+        top_k = min(top_k, max(0, pool_size - 2))
+        video_ids = [video.video_id for video in videos[:top_k] if video.video_id]
+        if not video_ids:
+            return
+        self.player_server.send_command('PRELOAD_MANY', ','.join(video_ids), quality=self.preload_quality.quality)
+        print(f"UI: Sent PRELOAD_MANY for top {len(video_ids)} results: {video_ids}")
+    
+    def _schedule_remaining_videos(self, remaining_videos, generation):
         """残りの動画をバックグラウンドで追加表示"""
         from PySide6.QtCore import QTimer
         
         # 500ms後に残りの動画を追加
-        QTimer.singleShot(500, lambda: self._add_remaining_videos(remaining_videos))
+        QTimer.singleShot(500, lambda: self._add_remaining_videos(remaining_videos, generation))
     
-    def _add_remaining_videos(self, remaining_videos):
+    def _add_remaining_videos(self, remaining_videos, generation):
         """残りの動画をリストに追加"""
         if not remaining_videos:
             return
-        # 追加前の選択動画IDを保存しておく
-        previous_selected_id = None
-        try:
-            sel = self.left_pane.get_selected_video()
-            if sel:
-                previous_selected_id = sel.get('video_id')
-        except Exception:
-            previous_selected_id = None
-
-        # 現在のリストを取得
-        current_videos = []
-        for i in range(self.left_pane.model.rowCount()):
-            video = self.left_pane.model.get_video_at(i)
-            if video:
-                current_videos.append(video)
-
-        # 残りの動画を追加
-        for video in remaining_videos:
-            current_videos.append({
-                'video_id': video.get('video_id', ''),
-                'title': video.get('title', ''),
-                'thumbnail': None,  # 後で非同期読み込み
-                'duration': video.get('duration', ''),
-                'url': video.get('url', '')
-            })
-
-        # リストを更新
-        self.left_pane.model.set_videos(current_videos)
-        print(f"UI: Added {len(remaining_videos)} remaining videos to list")
-
-        # 更新後、リセットで選択が外れるため、以前の選択を復元する
-        try:
-            restored = False
-            if previous_selected_id:
-                for i in range(self.left_pane.model.rowCount()):
-                    v = self.left_pane.model.get_video_at(i)
-                    if v and v.get('video_id') == previous_selected_id:
-                        idx = self.left_pane.model.index(i, 0)
-                        if idx.isValid():
-                            self.left_pane.setCurrentIndex(idx)
-                            restored = True
-                            print(f"UI: Restored selection to video {previous_selected_id} at index {i}")
-                            break
-
-            # 以前の選択がない／見つからない場合は先頭を選択しておく
-            if not restored and self.left_pane.model.rowCount() > 0:
-                first_index = self.left_pane.model.index(0, 0)
-                if first_index.isValid():
-                    self.left_pane.setCurrentIndex(first_index)
-                    print("UI: Selected first video after adding remaining videos")
-        except Exception as e:
-            print(f"UI: Error restoring selection after adding videos: {e}")
+        # 500ms の間に新しい検索が始まっていたら、古い結果は追加しない
+        if generation != self._search_generation:
+            print(f"UI: Dropped {len(remaining_videos)} remaining videos from stale search (generation {generation})")
+            return
+        # 残りの動画を末尾に追加（行挿入のみなので選択状態・既存行はそのまま）
+        added = self.left_pane.model.append_videos(remaining_videos)
+        print(f"UI: Appended {added} remaining videos to list")
+
+        # 選択がない場合のみ先頭を選択しておく
+        if not self.left_pane.currentIndex().isValid() and self.left_pane.model.rowCount() > 0:
+            self.left_pane.setCurrentIndex(self.left_pane.model.index(0, 0))
+            print("UI: Selected first video after adding remaining videos")
 
         # 残りの動画のサムネイルも非同期読み込み
-        self._load_thumbnails_async(remaining_videos)
+        self._load_thumbnails_async(remaining_videos, generation)
+    
+    # プレイヤー（出力画面）のリソース警告のしきい値
+    PLAYER_HEAP_WARN_RATIO = 0.8   # JSヒープ使用量 / 上限
+    PLAYER_DOM_NODES_WARN = 3000   # DOM ノード数（通常は数百）
+    
+    def _check_player_resources(self):
+        """ハートビートで報告されたプレイヤーのメモリ・DOM ノード数を確認し、カクつく前に警告する"""
+        from app.utils.logger import warning, info
+        from app.services.player_http_server import PlayerCommandHandler
+        # iframe は候補スロット分と、フォールバック1つ分までは正常
+        iframes_warn = int(self.config_service.get("player_pool_size", 4)) + 1
+        for client in PlayerCommandHandler.command_log.clients():
+            resources = client.get("resources")
+            if not client.get("connected") or not resources:
+                continue
+            client_id = client.get("client_id")
+            checks = {
+                "heap": (
+                    resources.get("heapLimitMb")
+                    and resources.get("heapUsedMb", 0) / resources["heapLimitMb"] >= self.PLAYER_HEAP_WARN_RATIO,
+                    f"JS heap {resources.get('heapUsedMb')}MB / {resources.get('heapLimitMb')}MB",
+                ),
+                "dom": (
+                    resources.get("domNodes", 0) >= self.PLAYER_DOM_NODES_WARN,
+                    f"{resources.get('domNodes')} DOM nodes",
+                ),
+                "iframes": (
+                    resources.get("iframes", 0) > iframes_warn,
+                    f"{resources.get('iframes')} iframes",
+                ),
+            }
+            for kind, (exceeded, detail) in checks.items():
+                key = (client_id, kind)
+                if exceeded and key not in self._player_resource_warnings:
+                    self._player_resource_warnings.add(key)
+                    warning(f"Player {client_id} is running low on resources ({detail}, up {resources.get('uptimeS')}s). "
+                            f"Reload the output before it stutters.", "UI")
+                elif not exceeded and key in self._player_resource_warnings:
+                    self._player_resource_warnings.discard(key)
+                    info(f"Player {client_id} resources back to normal ({detail})", "UI")
     
     def _check_memory_usage(self):
         """メモリ使用量を監視し、必要に応じてクリーンアップ"""
+        try:
+            self._check_player_resources()
+            self._refresh_warm_video_ids()
+        except Exception as e:
+            print(f"UI: Error checking player resources: {e}")
+        
         try:
             import psutil
             process = psutil.Process()
@@ -1252,13 +1676,17 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"UI: Error during force memory cleanup: {e}")
 
-    def _select_first_video(self):
-        """最初の動画を選択状態にする"""
+    def _select_first_video(self, generation=None, video_id=None):
+        """最初の動画（video_id があればその動画）を選択状態にする"""
+        # 遅延実行の間に新しい検索が始まっていたら何もしない
+        if generation is not None and generation != self._search_generation:
+            return
         try:
             if hasattr(self, 'left_pane') and self.left_pane.model.rowCount() > 0:
                 # 選択をクリアしてから最初のアイテムを選択
                 self.left_pane.clearSelection()
-                first_index = self.left_pane.model.index(0, 0)
+                row = self.left_pane.model.row_of(video_id) if video_id else -1
+                first_index = self.left_pane.model.index(max(row, 0), 0)
                 self.left_pane.setCurrentIndex(first_index)
                 # フォーカスも設定
                 self.left_pane.setFocus()
@@ -1268,17 +1696,19 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"UI: Error selecting first video: {e}")
     
-    def _load_thumbnails_async(self, videos):
+    def _load_thumbnails_async(self, videos, generation):
         """サムネイルを非同期で読み込む"""
         from app.services.youtube_service import AsyncThumbnailManager
         
         # 既存のサムネイル読み込みを停止しない（複数の読み込みを許容）
         if not hasattr(self, '_thumbnail_manager') or not self._thumbnail_manager:
             self._thumbnail_manager = AsyncThumbnailManager()
+            self._thumbnail_manager.reset(generation)
             self._thumbnail_manager.thumbnail_ready.connect(self._on_thumbnail_ready)
+            self._thumbnail_manager.thumbnail_preview_ready.connect(self._on_thumbnail_preview_ready)
         
         # 非同期読み込みを開始
-        self._thumbnail_manager.load_thumbnails_async(videos)
+        self._thumbnail_manager.load_thumbnails_async(videos, generation)
     
     def _on_thumbnail_ready(self, video_id: str, thumbnail):
         """サムネイル読み込み完了時の処理"""
@@ -1287,6 +1717,11 @@ class MainWindow(QMainWindow):
             self.left_pane.model.update_thumbnail(video_id, thumbnail)
             print(f"UI: Thumbnail loaded for video {video_id}")
     
+    def _on_thumbnail_preview_ready(self, video_id: str, thumbnail):
+        """小サイズのプレビューサムネイル読み込み完了時の処理（本サイズ到着まで拡大表示）"""
+        if hasattr(self, 'left_pane') and self.left_pane.model:
+            self.left_pane.model.update_thumbnail(video_id, thumbnail, is_preview=True)
+    
     def _cleanup_thumbnail_loaders(self):
         """サムネイル読み込みスレッドをクリーンアップ"""
         if hasattr(self, '_thumbnail_manager') and self._thumbnail_manager:
@@ -1304,16 +1739,16 @@ class MainWindow(QMainWindow):
     def _show_dummy_youtube_results(self):
         """ダミーのYouTube検索結果を表示（テスト用）"""
         import random
+        from app.models.video_item import VideoItem
         
         dummy_videos = []
         for i in range(5):
-            dummy_videos.append({
-                'video_id': f'dummy_{i}',
-                'title': f'取得失敗しました。APIキーを確認してください。',
-                'thumbnail': None,  # 後でサムネイルを設定
-                'duration': f'{random.randint(2,10)}:{random.randint(10,59):02d}',
-                'url': f'https://youtube.com/watch?v=dummy_{i}'
-            })
+            dummy_videos.append(VideoItem(
+                video_id=f'dummy_{i}',
+                title=f'取得失敗しました。APIキーを確認してください。',
+                duration=f'{random.randint(2,10)}:{random.randint(10,59):02d}',
+                url=f'https://youtube.com/watch?v=dummy_{i}'
+            ))
         
         self.left_pane.set_search_results(dummy_videos)
         print("UI: Displaying dummy YouTube results")
@@ -1329,8 +1764,8 @@ class MainWindow(QMainWindow):
                 print("UI: No video data found for selected index")
                 return
             
-            video_id = video_data.get('video_id', '')
-            title = video_data.get('title', '')
+            video_id = video_data.video_id
+            title = video_data.title
             
             print(f"UI: Video data extracted - ID: {video_id}, Title: {title}")
             
@@ -1356,7 +1791,7 @@ class MainWindow(QMainWindow):
                 print(f"UI: First click detected - sending PRELOAD for {video_id}")
                 self.last_clicked_video_id = video_id
                 if hasattr(self, 'player_server') and self.player_server:
-                    self.player_server.send_command('PRELOAD', video_id)
+                    self.player_server.send_command('PRELOAD', video_id, quality=self.preload_quality.quality)
                     self._update_youtube_video_state('preloading', video_id)
                     print(f"UI: Sent PRELOAD command for video: {video_id}")
                 else:
@@ -1369,6 +1804,109 @@ class MainWindow(QMainWindow):
             import traceback
             print(f"UI: Traceback: {traceback.format_exc()}")
     
+    # フィードバックを取り込む最小間隔（約1フレーム）
+    FEEDBACK_DRAIN_INTERVAL_MS = 16
+
+    def _on_player_feedback_pending(self):
+        """フィードバックが届いたら、前回の取り込みから1フレーム以上空けて取り込む"""
+        if self._feedback_drain_scheduled:
+            return
+        import time
+        self._feedback_drain_scheduled = True
+        elapsed_ms = (time.monotonic() - self._last_feedback_drain) * 1000
+        QTimer.singleShot(max(0, int(self.FEEDBACK_DRAIN_INTERVAL_MS - elapsed_ms)), self._drain_player_feedback)
+
+    def _drain_player_feedback(self):
+        """バッファのフィードバックをまとめて処理（状態が変わったものだけ）"""
+        import time
+        from app.services.player_http_server import FeedbackBuffer, feedback_buffer
+        self._feedback_drain_scheduled = False
+        self._last_feedback_drain = time.monotonic()
+
+        for feedback_data in feedback_buffer.drain():
+            if feedback_data.get('state') == 'snapshot':
+                self._restore_player_snapshot(feedback_data)
+                continue
+            if feedback_data.get('state') == 'pool':
+                self._last_player_feedback_time = time.time()
+                self._update_player_pool(feedback_data.get('clientId'), feedback_data.get('pool'))
+                continue
+            if feedback_data.get('state') == 'rebuffer':
+                # 同じ動画で何度起きても数える（重複判定しない）
+                self._last_player_feedback_time = time.time()
+                self._handle_player_rebuffer(feedback_data)
+                continue
+            # 再生中と次のスロットは別々に重複判定する（片方の通知でもう片方を再通知扱いにしない）
+            key = (feedback_data.get('state'), feedback_data.get('videoId'))
+            slot = (feedback_data.get('clientId'), FeedbackBuffer.category(feedback_data.get('state')))
+            if self._last_feedback_state.get(slot) == key:
+                self._last_player_feedback_time = time.time()
+                continue
+            self._last_feedback_state[slot] = key
+            self._handle_player_feedback(feedback_data)
+
+    def _restore_player_snapshot(self, snapshot):
+        """プレイヤーの状態スナップショット（接続時の hello への応答）から再生中・プリロード済みの状態を復元"""
+        import time
+        self._last_player_feedback_time = time.time()
+        current_video_id = snapshot.get('currentVideoId')
+        next_video_id = snapshot.get('nextVideoId')
+        print(f"UI: Player snapshot received - playing: {current_video_id}, next: {next_video_id} (ready: {snapshot.get('nextReady')})")
+
+        # 以降の同じ状態の通知は重複として扱う
+        client_id = snapshot.get('clientId')
+        if 'pool' in snapshot:
+            self._update_player_pool(client_id, snapshot.get('pool'))
+        if current_video_id and snapshot.get('playing', True):
+            self._last_feedback_state[(client_id, 'current')] = ('playing', current_video_id)
+            if self.current_playing_video_id != current_video_id:
+                self._update_youtube_video_state('playing', current_video_id)
+
+        if next_video_id:
+            state = 'ready' if snapshot.get('nextReady') else 'preloading'
+            self._last_feedback_state[(client_id, 'next')] = (state, next_video_id)
+            if (self.preloaded_video_id, self.youtube_video_state) != (next_video_id, state):
+                self._update_youtube_video_state(state, next_video_id)
+
+    def _update_player_pool(self, client_id, pool):
+        """プレイヤーの候補スロットの一覧を反映する
+        
+        複数の出力があるときは、すべての出力で先読み済みの動画だけを即再生できるものとして扱う。
+        """
+        self._player_pools[client_id] = {
+            entry.get('videoId') for entry in (pool or [])
+            if isinstance(entry, dict) and entry.get('ready') and entry.get('videoId')
+        }
+        self._refresh_warm_video_ids()
+    
+    def _refresh_warm_video_ids(self):
+        """接続中の出力の候補だけから、すべての出力で先読み済みの動画を求め直す
+        
+        閉じたタブ・ウィンドウや外した出力の候補が残ると即再生できる動画が減ってしまうため、
+        コマンドログで接続中でないクライアントの候補は捨てる。
+        """
+        from app.services.player_http_server import PlayerCommandHandler
+        connected = {
+            client.get("client_id") for client in PlayerCommandHandler.command_log.clients()
+            if client.get("connected")
+        }
+        for client_id in [client_id for client_id in self._player_pools if client_id not in connected]:
+            print(f"UI: Dropping pool of disconnected player {client_id}")
+            del self._player_pools[client_id]
+        pools = list(self._player_pools.values())
+        self._set_warm_video_ids(set.intersection(*pools) if pools else set())
+    
+    def _set_warm_video_ids(self, video_ids):
+        """先読み済みの候補を更新し、タイルの WARM 表示に反映する"""
+        if video_ids == self._warm_video_ids:
+            return
+        self._warm_video_ids = video_ids
+        print(f"UI: Warm videos: {sorted(video_ids)}")
+        try:
+            self.left_pane.model.set_warm_videos(video_ids)
+        except Exception as e:
+            print(f"UI: Error updating warm videos: {e}")
+    
     def _handle_player_feedback(self, feedback_data):
         """プレイヤーからのフィードバックを処理"""
         try:
@@ -1385,6 +1923,7 @@ class MainWindow(QMainWindow):
             # 状態に応じて枠の色を更新
             if state == 'ready':
                 self._update_youtube_video_state('ready', video_id)
+                self._update_video_readiness(video_id, feedback_data)
 
                 # Shift+Enterで「ready到達次第PLAY」待ちの場合のみ自動再生
                 print(f"UI: Checking auto-play - pending_play_video_id: {self.pending_play_video_id}, video_id: {video_id}")
@@ -1402,6 +1941,10 @@ class MainWindow(QMainWindow):
                         
             elif state == 'playing':
                 self._update_youtube_video_state('playing', video_id)
+                self._remember_played_video(video_id)
+                if feedback_data.get('scheduledAt') is not None:
+                    print(f"UI: Scheduled switch landed {feedback_data.get('offsetMs')}ms from target "
+                          f"(clock offset {feedback_data.get('clockOffsetMs')}ms)")
                 # 再生開始したらlast_clicked_video_idをリセット
                 print(f"UI: Checking reset condition - last_clicked_video_id: {getattr(self, 'last_clicked_video_id', 'None')}, video_id: {video_id}")
                 if hasattr(self, 'last_clicked_video_id') and self.last_clicked_video_id == video_id:
@@ -1421,6 +1964,30 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"UI: Error handling player feedback: {e}")
     
+    def _update_video_readiness(self, video_id, feedback_data):
+        """ready フィードバックの先読み量をタイルの READY 表示に添える"""
+        buffered_seconds = feedback_data.get('bufferedSeconds')
+        if buffered_seconds is None:
+            # 先読み量を報告しない旧プレイヤー・iframe フォールバック
+            return
+        print(f"UI: Video ready - {video_id}: buffered {buffered_seconds}s "
+              f"({feedback_data.get('bufferedFraction')}) in {feedback_data.get('timeToReadyMs')}ms"
+              f"{' (timed out)' if feedback_data.get('timedOut') else ''}")
+        if feedback_data.get('timeToReadyMs') is not None and not feedback_data.get('reused'):
+            self.preload_quality.record_ready(feedback_data.get('timeToReadyMs'), bool(feedback_data.get('timedOut')))
+        label = "LOW" if feedback_data.get('timedOut') else f"{float(buffered_seconds):.0f}s"
+        try:
+            self.left_pane.model.set_video_readiness(video_id, label)
+        except Exception as e:
+            print(f"UI: Error updating video readiness: {e}")
+
+    def _handle_player_rebuffer(self, feedback_data):
+        """再生中の再バッファ（回線が追いついていない）をプリロード画質に反映"""
+        print(f"UI: Player rebuffered - {feedback_data.get('videoId')}: {feedback_data.get('stallMs')}ms "
+              f"at {feedback_data.get('playbackQuality') or feedback_data.get('quality')} "
+              f"({feedback_data.get('rebufferCount')} total on {feedback_data.get('clientId')})")
+        self.preload_quality.record_rebuffer(feedback_data.get('stallMs'))
+
     def _update_youtube_video_state(self, state, video_id):
         """YouTube動画の状態を更新し、枠の色を変更"""
         self.youtube_video_state = state
@@ -1429,6 +1996,8 @@ class MainWindow(QMainWindow):
         # 2本柱のID管理
         if state == 'playing':
             self.current_playing_video_id = video_id
+            if video_id == self._speculative_video_id:
+                self._speculative_video_id = None  # 再生されたら取り消す対象ではない
             print(f"UI: Set current_playing_video_id to: {video_id}")
         elif state in ['preloading', 'ready']:
             self.preloaded_video_id = video_id
@@ -1508,7 +2077,7 @@ class MainWindow(QMainWindow):
             return
         
         if hasattr(self, 'player_server') and self.player_server:
-            self.player_server.send_command('PRELOAD', video_id)
+            self.player_server.send_command('PRELOAD', video_id, quality=self.preload_quality.quality)
             self._update_youtube_video_state('preloading', video_id)
             print(f"UI: Sent PRELOAD command for video: {video_id}")
         else:
@@ -1529,6 +2098,11 @@ class MainWindow(QMainWindow):
             # サムネイル読み込みスレッドの停止
             self._cleanup_thumbnail_loaders()
             
+            # プレイリスト先読みスレッドの停止
+            self._stop_playlist_lookahead()
+            for prefetcher in list(self._retired_prefetchers):
+                prefetcher.wait(2000)
+            
             # ホットキーサービスの停止
             if hasattr(self, 'hotkey_service'):
                 self.hotkey_service.stop()
@@ -1539,6 +2113,16 @@ class MainWindow(QMainWindow):
                 self.watcher.stop()
                 print("UI: History watcher stopped")
             
+            # アプリ内出力ウィンドウを閉じる
+            if getattr(self, 'player_output_window', None):
+                self.player_output_window.close()
+            
+            # OSC受信の停止
+            if getattr(self, 'osc_server', None):
+                from app.services.osc_control_server import stop_osc_server
+                stop_osc_server()
+                print("UI: OSC control stopped")
+            
             # プレイヤーサーバーの停止
             if hasattr(self, 'player_server'):
                 from app.services.player_http_server import stop_player_server
@@ -1603,6 +2187,8 @@ def main():
         configure_logging(enabled=enable_logging, redirect=True)
         
         print("UI: Starting application...")
+        # アプリ内出力（QtWebEngine）は QApplication 生成前にこの属性が必要
+        QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
         app = QApplication(sys.argv)
         
         # アプリケーション全体でホバー色をデフォルトに設定
@@ -0,0 +1,52 @@
+"""
+セット準備（本番前の一括ウォームアップ）の起動スクリプト
+
+ライブ用のウィンドウ（main.py）とは別に起動し、選んだ rekordbox のプレイリストの全曲について
+検索結果・サムネイルを事前に保存する。保存先はライブ用と共通なので、本番中はこれらの曲の検索で通信しない。
+
+    python set_prep.py
+"""
+
+import sys
+from PySide6.QtWidgets import QApplication
+
+
+def main():
+    try:
+        # ログ初期設定（ライブ用と同じ設定・ログファイルを使う）
+        from app.services.config_service import ConfigService
+        from app.utils.logger import configure_logging
+        config = ConfigService()
+        configure_logging(enabled=config.get("enable_logging", True), redirect=True)
+
+        print("SetPrep: Starting...")
+        app = QApplication(sys.argv)
+
+        # 日本語文字化け対策: フォントの設定
+        from PySide6.QtGui import QFont
+        font = QFont("Meiryo UI", 10)
+        if not QFont("Meiryo UI").exactMatch():
+            font = QFont("MS Gothic", 10)
+            if not QFont("MS Gothic").exactMatch():
+                font = QFont("sans-serif", 10)
+        app.setFont(font)
+
+        from ui.dialogs.set_prep_dialog import SetPrepDialog
+        dialog = SetPrepDialog()
+        dialog.show()
+        sys.exit(app.exec())
+
+    except Exception as e:
+        import traceback
+        error_msg = f"SetPrep: FATAL ERROR in main: {e}\n{traceback.format_exc()}"
+        print(error_msg)
+        try:
+            from app.utils.logger import error
+            error(error_msg, "FATAL")
+        except:
+            pass
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                               QListWidget, QListWidgetItem, QProgressBar, QPlainTextEdit)
+from PySide6.QtCore import Qt
+
+
+class SetPrepDialog(QDialog):
+    """
+    セット準備（本番前の一括ウォームアップ）の画面
+    rekordbox のプレイリストを選び、全曲の検索結果とサムネイルを事前に保存する
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        from app.services.config_service import ConfigService
+        from app.services.rekordbox_service import RekordboxService
+        from app.services.set_prep_service import SetPrepState
+        self.config_service = ConfigService()
+        self.rekordbox_service = RekordboxService()
+        self.state = SetPrepState()
+        self.worker = None
+
+        self.setWindowTitle("セット準備")
+        self.resize(560, 520)
+
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("準備するプレイリスト:"))
+        self.playlist_list = QListWidget()
+        layout.addWidget(self.playlist_list)
+        self._load_playlists()
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #666; font-size: 10px;")
+        layout.addWidget(self.status_label)
+
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(1000)
+        layout.addWidget(self.log_view)
+
+        button_layout = QHBoxLayout()
+        self.reset_button = QPushButton("最初からやり直す")
+        self.reset_button.clicked.connect(self.reset_progress)
+        button_layout.addWidget(self.reset_button)
+        button_layout.addStretch()
+        self.start_button = QPushButton("準備開始")
+        self.start_button.clicked.connect(self.start)
+        button_layout.addWidget(self.start_button)
+        self.stop_button = QPushButton("中止")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop)
+        button_layout.addWidget(self.stop_button)
+        self.close_button = QPushButton("閉じる")
+        self.close_button.clicked.connect(self.close)
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+        self._update_quota_label()
+
+    def _load_playlists(self):
+        """rekordbox のプレイリストを一覧に表示する（前回選んだものにチェックを付ける）"""
+        selected = set(self.config_service.get("set_prep_playlists", []))
+        playlists = self.rekordbox_service.get_playlists()
+        for playlist_id, name in playlists:
+            item = QListWidgetItem(name)
+            item.setData(Qt.UserRole, playlist_id)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if playlist_id in selected else Qt.Unchecked)
+            self.playlist_list.addItem(item)
+        if not playlists:
+            self.playlist_list.addItem("プレイリストが見つかりません（詳細設定の rekordbox データベースパスを確認してください）")
+        print(f"SetPrepDialog: Loaded {len(playlists)} playlists")
+
+    def _checked_playlist_ids(self):
+        ids = []
+        for row in range(self.playlist_list.count()):
+            item = self.playlist_list.item(row)
+            if item.data(Qt.UserRole) and item.checkState() == Qt.Checked:
+                ids.append(item.data(Qt.UserRole))
+        return ids
+
+    def _update_quota_label(self, message=""):
+        from app.services.youtube_quota import YouTubeQuota
+        from app.services.set_prep_service import SET_PREP_QUOTA_CATEGORY
+        quota = YouTubeQuota()
+        budget = int(self.config_service.get("set_prep_quota_units", 8000))
+        text = f"本日の API 使用量: セット準備 {quota.used(SET_PREP_QUOTA_CATEGORY)} / {budget}（全体 {quota.used()}）"
+        self.status_label.setText(f"{message}  {text}" if message else text)
+
+    def _log(self, message):
+        self.log_view.appendPlainText(message)
+
+    def start(self):
+        """選んだプレイリストの全曲の準備を始める"""
+        from app.services.youtube_service import YouTubeService
+        from app.services.set_prep_service import SetPrepWorker
+
+        playlist_ids = self._checked_playlist_ids()
+        if not playlist_ids:
+            self._log("プレイリストを選んでください")
+            return
+        youtube_service = YouTubeService()
+        if not youtube_service.is_configured():
+            self._log("YouTube APIキーが設定されていません（詳細設定の YouTube タブ）")
+            return
+        self.config_service.save_config({"set_prep_playlists": playlist_ids})
+
+        queries = []
+        for playlist_id in playlist_ids:
+            for track in self.rekordbox_service.get_playlist_tracks(playlist_id):
+                queries.append(youtube_service.create_search_query_from_track(track.title, track.artist, track.comment))
+
+        self.worker = SetPrepWorker(
+            queries,
+            youtube_service.get_api_key(),
+            self.state,
+            concurrency=int(self.config_service.get("set_prep_concurrency", 4)),
+            requests_per_s=float(self.config_service.get("set_prep_requests_per_s", 2.0)),
+            quota_budget=int(self.config_service.get("set_prep_quota_units", 8000)),
+            thumbnails_per_query=int(self.config_service.get("prefetch_thumbnails_per_track", 5)),
+        )
+        self.worker.progress.connect(self._on_progress)
+        self.worker.item_finished.connect(self._on_item_finished)
+        self.worker.finished.connect(self._on_finished)
+
+        self.start_button.setEnabled(False)
+        self.reset_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self._log(f"{len(playlist_ids)} 個のプレイリストの準備を開始します")
+        self.worker.start()
+
+    def stop(self):
+        """準備を中断する（済んだ曲は次回に引き継がれる）"""
+        if self.worker is not None:
+            self.worker.abort()
+            self.stop_button.setEnabled(False)
+            self._log("中止しています...")
+
+    def reset_progress(self):
+        """進み具合を消して、次回はすべての曲を確認し直す（保存済みの検索結果はそのまま使う）"""
+        self.state.reset()
+        self.progress_bar.setValue(0)
+        self._log("進み具合をリセットしました")
+
+    def _on_progress(self, done, total, query):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+        self._update_quota_label(f"{done} / {total} 曲")
+
+    def _on_item_finished(self, query, status, detail):
+        self._log(f"[{status}] {query} - {detail}")
+
+    def _on_finished(self):
+        if self.worker.skipped:
+            self._log(f"{self.worker.skipped} 曲は取得していません（中止または予算切れ。次回は続きから再開します）")
+        else:
+            self._log("準備が終わりました")
+        self.start_button.setEnabled(True)
+        self.reset_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.worker.deleteLater()
+        self.worker = None
+        self._update_quota_label()
+
+    def closeEvent(self, event):
+        # 実行中の通信が終わるのを待ってから閉じる
+        if self.worker is not None:
+            self.worker.abort()
+            self.worker.wait()
+        super().closeEvent(event)
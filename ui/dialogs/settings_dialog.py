@@ -1,6 +1,7 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, 
                                QLabel, QLineEdit, QPushButton, QTabWidget, 
-                               QCheckBox, QSpinBox, QGroupBox, QWidget, QApplication, QFileDialog)
+                               QCheckBox, QSpinBox, QGroupBox, QWidget, QApplication, QFileDialog,
+                               QComboBox)
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QClipboard, QKeyEvent
 
@@ -164,12 +165,16 @@ class SettingsDialog(QDialog):
         self.db_path_edit.setText(self.config_service.get("db_path", ""))
         self.interval_edit.setText(str(self.config_service.get("interval_s", 10)))
         self.player_port_spin.setValue(int(self.config_service.get("player_port", 8080)))
+        self.embedded_player_checkbox.setChecked(self.config_service.get("player_output_mode", "browser") == "embedded")
+        self.position_sync_checkbox.setChecked(bool(self.config_service.get("position_sync_enabled", False)))
         self.always_on_top_checkbox.setChecked(bool(self.config_service.get("always_on_top", False)))
         self.bring_to_front_on_hotkey_checkbox.setChecked(bool(self.config_service.get("bring_to_front_on_hotkey", True)))
         self.bring_to_front_on_search_checkbox.setChecked(bool(self.config_service.get("bring_to_front_on_search", False)))
         self.bring_to_back_delay_spin.setValue(int(self.config_service.get("bring_to_back_delay_s", 3)))
         self.rewind_seconds_spin.setValue(int(self.config_service.get("rewind_seconds", 2)))
         self.forward_seconds_spin.setValue(int(self.config_service.get("forward_seconds", 2)))
+        self.osc_enabled_checkbox.setChecked(bool(self.config_service.get("osc_enabled", False)))
+        self.osc_port_spin.setValue(int(self.config_service.get("osc_port", 9000)))
         self._sync_window_placement_mode_ui()
         self.enable_logging_checkbox.setChecked(bool(self.config_service.get("enable_logging", True)))
         self.hotkey_up_edit.setText(self.config_service.get("hotkey_move_up", "ctrl+shift+up"))
@@ -183,6 +188,8 @@ class SettingsDialog(QDialog):
         self.hotkey_forward_edit.setText(self.config_service.get("hotkey_forward", "ctrl+:"))
         self.youtube_api_key_edit.setText(self.config_service.get("youtube_api_key", ""))
         self.youtube_search_template_edit.setText(self.config_service.get("youtube_search_template", "%tracktitle% %comment%"))
+        policy_index = self.auto_preload_combo.findData(self.config_service.get("auto_preload_policy", "confident"))
+        self.auto_preload_combo.setCurrentIndex(max(policy_index, 0))
 
     def _init_general_tab(self):
         """「全般」タブの構築"""
@@ -222,6 +229,12 @@ class SettingsDialog(QDialog):
         # 初期URLを設定
         self._update_player_url()
 
+        # プレイヤー出力方式
+        self.embedded_player_checkbox = QCheckBox("プレイヤーをアプリ内ウィンドウで表示する（QtWebEngine、ブラウザ不要）")
+        layout.addRow(self.embedded_player_checkbox)
+        self.position_sync_checkbox = QCheckBox("複数の出力で再生位置を同期する（出力を開き直すと反映）")
+        layout.addRow(self.position_sync_checkbox)
+
         # 巻き戻し・早送り設定
         seek_group = QGroupBox("巻き戻し・早送り")
         seek_layout = QVBoxLayout(seek_group)
@@ -251,6 +264,30 @@ class SettingsDialog(QDialog):
 
         layout.addRow(seek_group)
 
+        # OSC受信（照明卓・コントローラーからの操作）
+        osc_group = QGroupBox("OSC受信")
+        osc_layout = QVBoxLayout(osc_group)
+
+        self.osc_enabled_checkbox = QCheckBox("OSC (UDP) による操作を受け付ける")
+        osc_port_row = QHBoxLayout()
+        osc_port_row.addWidget(QLabel("UDPポート番号:"))
+        self.osc_port_spin = QSpinBox()
+        self.osc_port_spin.setRange(1, 65535)
+        self.osc_port_spin.setValue(9000)
+        osc_port_row.addWidget(self.osc_port_spin)
+        osc_port_row.addStretch()
+
+        osc_help_label = QLabel("アドレス: /vj/move/up, /vj/move/down, /vj/move/left, /vj/move/right, "
+                                "/vj/preload, /vj/play, /vj/search, /vj/rewind, /vj/forward")
+        osc_help_label.setWordWrap(True)
+        osc_help_label.setStyleSheet("color: #666; font-size: 10px;")
+
+        osc_layout.addWidget(self.osc_enabled_checkbox)
+        osc_layout.addLayout(osc_port_row)
+        osc_layout.addWidget(osc_help_label)
+
+        layout.addRow(osc_group)
+
         # ウィンドウ配置モード
         window_group = QGroupBox("ウィンドウ配置モード")
         window_layout = QVBoxLayout(window_group)
@@ -520,6 +557,13 @@ class SettingsDialog(QDialog):
         examples_label = QLabel("例：\n• %artist% %tracktitle%\n• %tracktitle% official video\n• %artist% - %tracktitle% live")
         examples_label.setStyleSheet("color: #666; font-size: 9px; margin-top: 5px;")
         layout.addRow("", examples_label)
+
+        # 検索結果の自動プリロード（曲の情報で並べ替えた最上位）
+        self.auto_preload_combo = QComboBox()
+        self.auto_preload_combo.addItem("一致度が高いときだけ", "confident")
+        self.auto_preload_combo.addItem("常に最上位", "always")
+        self.auto_preload_combo.addItem("しない", "off")
+        layout.addRow("自動プリロード:", self.auto_preload_combo)
         
         self.tabs.addTab(tab, "YouTube")
     
@@ -572,6 +616,8 @@ class SettingsDialog(QDialog):
             interval = 10
 
         player_port = int(self.player_port_spin.value())
+        player_output_mode = "embedded" if self.embedded_player_checkbox.isChecked() else "browser"
+        position_sync_enabled = self.position_sync_checkbox.isChecked()
 
         always_on_top = self.always_on_top_checkbox.isChecked()
         bring_to_front_on_hotkey = self.bring_to_front_on_hotkey_checkbox.isChecked()
@@ -579,6 +625,8 @@ class SettingsDialog(QDialog):
         bring_to_back_delay_s = int(self.bring_to_back_delay_spin.value())
         rewind_seconds = int(self.rewind_seconds_spin.value())
         forward_seconds = int(self.forward_seconds_spin.value())
+        osc_enabled = self.osc_enabled_checkbox.isChecked()
+        osc_port = int(self.osc_port_spin.value())
         
         hotkey_up = self.hotkey_up_edit.text()
         hotkey_down = self.hotkey_down_edit.text()
@@ -591,6 +639,7 @@ class SettingsDialog(QDialog):
         hotkey_forward = self.hotkey_forward_edit.text()
         youtube_api_key = self.youtube_api_key_edit.text()
         youtube_search_template = self.youtube_search_template_edit.text()
+        auto_preload_policy = self.auto_preload_combo.currentData()
         enable_logging = self.enable_logging_checkbox.isChecked()
             
         print(f"Settings: Saving DB Path: {db_path}, Interval: {interval}")
@@ -598,19 +647,25 @@ class SettingsDialog(QDialog):
         print(f"Settings: Saving YouTube Hotkeys - Preload: {hotkey_preload}, Play: {hotkey_play}, Search: {hotkey_search}, Rewind: {hotkey_rewind}, Forward: {hotkey_forward}")
         print(f"Settings: Saving Window Placement - AlwaysOnTop: {always_on_top}, HotkeyFront: {bring_to_front_on_hotkey}, SearchFront: {bring_to_front_on_search}, DelayS: {bring_to_back_delay_s}")
         print(f"Settings: Saving Seek Settings - Rewind: {rewind_seconds}s, Forward: {forward_seconds}s")
+        print(f"Settings: Saving OSC Settings - Enabled: {osc_enabled}, Port: {osc_port}")
         print(f"Settings: Saving YouTube API Key: {'*' * len(youtube_api_key) if youtube_api_key else '(empty)'}")
         print(f"Settings: Saving YouTube Search Template: {youtube_search_template}")
+        print(f"Settings: Saving Auto Preload Policy: {auto_preload_policy}")
         
         self.config_service.save_config({
             "db_path": db_path,
             "interval_s": interval,
             "player_port": player_port,
+            "player_output_mode": player_output_mode,
+            "position_sync_enabled": position_sync_enabled,
             "always_on_top": always_on_top,
             "bring_to_front_on_hotkey": bring_to_front_on_hotkey,
             "bring_to_front_on_search": bring_to_front_on_search,
             "bring_to_back_delay_s": bring_to_back_delay_s,
             "rewind_seconds": rewind_seconds,
             "forward_seconds": forward_seconds,
+            "osc_enabled": osc_enabled,
+            "osc_port": osc_port,
             "hotkey_move_up": hotkey_up,
             "hotkey_move_down": hotkey_down,
             "hotkey_move_left": hotkey_left,
@@ -622,6 +677,7 @@ class SettingsDialog(QDialog):
             "hotkey_forward": hotkey_forward,
             "youtube_api_key": youtube_api_key,
             "youtube_search_template": youtube_search_template,
+            "auto_preload_policy": auto_preload_policy,
             "enable_logging": enable_logging
         })
         
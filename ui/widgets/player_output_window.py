@@ -0,0 +1,167 @@
+"""
+アプリ内プレイヤー出力ウィンドウ（QtWebEngine）
+
+web/player.html を QWebEngineView で表示し、コマンドとフィードバックを QWebChannel で直接やり取りする。
+HTTP はページ（静的ファイル）の読み込みにだけ使い、コマンドのポーリングやフィードバックの POST は行わない。
+外部ブラウザ（HTTP / WebSocket）の出力はこれまでどおり併用できる。
+"""
+
+import json
+from PySide6.QtCore import QObject, Signal, Slot, Qt, QUrl, QFile, QIODevice
+from PySide6.QtWidgets import QWidget, QVBoxLayout
+
+try:
+    from PySide6.QtWebEngineWidgets import QWebEngineView
+    from PySide6.QtWebEngineCore import QWebEngineScript, QWebEngineSettings
+    from PySide6.QtWebChannel import QWebChannel
+    WEBENGINE_AVAILABLE = True
+except ImportError:
+    WEBENGINE_AVAILABLE = False
+
+from app.utils.logger import debug
+
+
+# アプリ内出力のクライアントID（/status やフィードバックの識別に使う）
+EMBEDDED_CLIENT_ID = "embedded"
+
+
+class PlayerBridge(QObject):
+    """QWebChannel で player.js に公開するオブジェクト
+
+    コマンドは commands シグナル（バッチのJSON文字列）で送り、フィードバックは feedback() で受け取る。
+    時計合わせ（PLAY_AT 用）は clock() の戻り値で返す。
+    ページの読み込み中（player.js が commands に接続する前）のコマンドはコマンドログに残しておき、
+    接続時のスナップショット（WebSocket の hello にあたる）を受け取ってから、
+    WebSocket のクライアントと同じく古いものを除いて統合したバッチで送る。
+    """
+
+    # player.js の handleCommandBatch() にそのまま渡すバッチ（JSON文字列）
+    commands = Signal(str)
+    # 別スレッドから send_command された場合に GUI スレッドへ移すための内部シグナル
+    _command_appended = Signal()
+
+    def __init__(self, command_log, client_id=EMBEDDED_CLIENT_ID, parent=None):
+        super().__init__(parent)
+        self.command_log = command_log
+        self.client_id = client_id
+        # player.js が commands に接続済みか（読み込み・再読み込みの間は False）
+        self._page_ready = False
+        self.command_log.register(client_id, 'qwebchannel', 'local')
+        self._command_appended.connect(self.flush)
+
+    def push(self, entry: dict):
+        """コマンドログに追加されたことを GUI スレッドへ知らせる（送信は flush() でまとめて行う）"""
+        self._command_appended.emit()
+
+    def page_loading(self):
+        """ページの読み込み開始（接続し直すまでコマンドはログに溜めておく）"""
+        self._page_ready = False
+
+    @Slot()
+    def flush(self):
+        """未配信のコマンドを統合して送る（ページの接続前は何もしない）"""
+        if not self._page_ready:
+            return
+        commands, through_seq = self.command_log.wait_for_commands(self.client_id, 0)
+        if not commands:
+            return
+        batch = {"epoch": self.command_log.epoch, "through": through_seq, "commands": commands}
+        self.commands.emit(json.dumps(batch))
+        self.command_log.mark_delivered(self.client_id, through_seq, len(commands))
+
+    @Slot(str, result=str)
+    def clock(self, t0: str) -> str:
+        """時計合わせ（/time と同じ応答のJSON文字列）"""
+        from app.services.player_http_server import clock_reply, server_time_ms
+        return json.dumps(clock_reply(t0, server_time_ms()))
+
+    @Slot(str)
+    def feedback(self, message: str):
+        """player.js からのフィードバック・ハートビート（JSON文字列）"""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            debug(f"Ignored invalid bridge message: {message[:100]}", "PlayerBridge")
+            return
+        if not isinstance(data, dict):
+            return
+        data.setdefault('clientId', self.client_id)
+        # 接続中として扱う（HTTP のクライアントと同じ一覧に載せる）
+        self.command_log.register(self.client_id, 'qwebchannel', 'local')
+        from app.services.player_http_server import dispatch_feedback
+        dispatch_feedback(data)
+        if data.get('state') == 'snapshot':
+            # player.js が commands に接続した後に送る最初の通知。読み込み中に溜まった分を送る
+            self._page_ready = True
+            self.flush()
+
+
+class PlayerOutputWindow(QWidget):
+    """player.html を表示するアプリ内出力ウィンドウ（F11 で全画面切り替え、Esc で解除）"""
+
+    closed = Signal()
+
+    def __init__(self, url: str, command_log, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("VJ Player")
+        self.resize(1280, 720)
+        self.setStyleSheet("background-color: #000000;")
+        self.command_log = command_log
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.view = QWebEngineView(self)
+        settings = self.view.settings()
+        # ユーザー操作なしで自動再生させる（動画は常にミュート）
+        settings.setAttribute(QWebEngineSettings.PlaybackRequiresUserGesture, False)
+        layout.addWidget(self.view)
+
+        # QWebChannel のブリッジ
+        self.bridge = PlayerBridge(command_log, parent=self)
+        self.channel = QWebChannel(self)
+        self.channel.registerObject("vjBridge", self.bridge)
+        page = self.view.page()
+        page.setWebChannel(self.channel)
+        self._inject_webchannel_script(page)
+
+        # コマンドログに追加されたコマンドを直接受け取る（再読み込み中は接続し直すまで溜めておく）
+        self.command_log.add_listener(self.bridge.push)
+        self.view.loadStarted.connect(self.bridge.page_loading)
+
+        self.view.setUrl(QUrl(url))
+        print(f"PlayerOutputWindow: Loading {url}")
+
+    def _inject_webchannel_script(self, page):
+        """qwebchannel.js をページ生成時に注入する（http のページからは qrc を直接読めないため）"""
+        source = QFile(":/qtwebchannel/qwebchannel.js")
+        if not source.open(QIODevice.ReadOnly):
+            print("PlayerOutputWindow: qwebchannel.js not found")
+            return
+        script = QWebEngineScript()
+        script.setName("qwebchannel")
+        script.setSourceCode(bytes(source.readAll()).decode('utf-8'))
+        script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+        script.setWorldId(QWebEngineScript.MainWorld)
+        script.setRunsOnSubFrames(False)
+        page.scripts().insert(script)
+        source.close()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_F11:
+            if self.isFullScreen():
+                self.showNormal()
+            else:
+                self.showFullScreen()
+        elif event.key() == Qt.Key_Escape and self.isFullScreen():
+            self.showNormal()
+        else:
+            super().keyPressEvent(event)
+
+    def closeEvent(self, event):
+        self.command_log.remove_listener(self.bridge.push)
+        # 再生中の動画を止めてから閉じる
+        self.view.setUrl(QUrl("about:blank"))
+        print("PlayerOutputWindow: Closed")
+        self.closed.emit()
+        super().closeEvent(event)
@@ -39,12 +39,78 @@ class RightTableModel(QAbstractTableModel):
                 return self._headers[section]
         return None
 
+    @staticmethod
+    def _row_key(item):
+        """行の識別キー（履歴IDがあればそれを、なければ行の内容を使う）"""
+        history_id = getattr(item, 'history_id', None)
+        return history_id if history_id is not None else tuple(item)
+
+    def row_key(self, row):
+        """指定行の識別キーを返す"""
+        if 0 <= row < len(self._data):
+            return self._row_key(self._data[row])
+        return None
+
+    def row_of_key(self, key):
+        """識別キーに対応する行番号を返す（存在しない場合は -1）"""
+        for row, item in enumerate(self._data):
+            if self._row_key(item) == key:
+                return row
+        return -1
+
     def update_data(self, new_data):
         """
         データを更新し、最大10件に制限する
+
+        旧データとの差分を履歴IDで計算し、新しい再生は行挿入、消えた行は行削除として通知する。
+        内容が同じ場合は何もしない。差分で表せない並び替えの場合のみモデルをリセットする。
+
+        Returns:
+            データに変化があった場合は True
         """
+        new_data = list(new_data[:10])
+        if new_data == self._data:
+            return False
+
+        old_keys = [self._row_key(item) for item in self._data]
+        new_keys = [self._row_key(item) for item in new_data]
+        if len(set(old_keys)) != len(old_keys) or len(set(new_keys)) != len(new_keys):
+            # キーが重複している場合は差分を取れないのでリセット
+            self._reset_data(new_data)
+            return True
+
+        # 1. 新データに存在しない行を下から削除
+        new_key_set = set(new_keys)
+        for row in reversed(range(len(self._data))):
+            if old_keys[row] not in new_key_set:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._data[row]
+                del old_keys[row]
+                self.endRemoveRows()
+
+        # 2. 残った行の並び順が新データと一致しない場合はリセット
+        old_key_set = set(old_keys)
+        if [key for key in new_keys if key in old_key_set] != old_keys:
+            self._reset_data(new_data)
+            return True
+
+        # 3. 新しい行を挿入し、内容が変わった行は dataChanged を通知
+        for row, key in enumerate(new_keys):
+            if row < len(old_keys) and old_keys[row] == key:
+                if self._data[row] != new_data[row]:
+                    self._data[row] = new_data[row]
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+                continue
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._data.insert(row, new_data[row])
+            old_keys.insert(row, key)
+            self.endInsertRows()
+        return True
+
+    def _reset_data(self, new_data):
+        """モデル全体をリセットしてデータを置き換える"""
         self.beginResetModel()
-        self._data = new_data[:10]
+        self._data = new_data
         self.endResetModel()
 
 
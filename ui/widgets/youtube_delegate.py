@@ -1,11 +1,23 @@
+from collections import OrderedDict
 from PySide6.QtWidgets import QStyledItemDelegate, QStyle, QStyleOption
 from PySide6.QtCore import Qt, QSize, QRect
 from PySide6.QtGui import QPainter, QPixmap, QFont, QBrush, QColor, QPen
 
+from .youtube_list_view import (
+    VideoIdRole, TitleRole, ThumbnailRole, DurationRole, StateRole, ReadinessRole,
+    VIDEO_STATE_NONE, VIDEO_STATE_PRELOADING, VIDEO_STATE_READY, VIDEO_STATE_PLAYING, VIDEO_STATE_WARM
+)
+
 class YouTubeItemDelegate(QStyledItemDelegate):
     """
     YouTube動画のサムネイルと情報を表示するカスタムデリゲート
+
+    タイル（サムネイル・タイトル・時間・状態表示）は一度だけ QPixmap に描画してキャッシュし、
+    再描画時はキャッシュを貼り付けるだけにする。
     """
+    # キャッシュするタイルの最大数（選択・ホバー・状態の組み合わせを含む）
+    TILE_CACHE_SIZE = 128
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.thumbnail_size = QSize(320, 180)  # 16:9比
@@ -15,6 +27,21 @@ class YouTubeItemDelegate(QStyledItemDelegate):
         self.preloaded_state = None  # preloading/ready
         self.preloaded_video_id = None
         self.playing_video_id = None
+
+        # 描画に使うフォントは一度だけ作成する
+        self._placeholder_font = QFont()
+        self._placeholder_font.setPointSize(8)
+        self._duration_font = QFont()
+        self._duration_font.setPointSize(9)  # 小さめのサイズ
+        self._duration_font.setBold(True)
+        self._title_font = QFont()
+        self._title_font.setPointSize(12)  # 大きくして読みやすく
+        self._status_font = QFont()
+        self._status_font.setPointSize(10)
+        self._status_font.setBold(True)
+
+        # 描画済みタイルのキャッシュ（LRU）
+        self._tile_cache = OrderedDict()
     
     def set_video_state(self, state, video_id=None):
         """現在の動画状態を設定"""
@@ -30,50 +57,99 @@ class YouTubeItemDelegate(QStyledItemDelegate):
             self.preloaded_video_id = None
             self.playing_video_id = None
         
-        # 親ウィジェット（QListView）を取得して全アイテムを再描画
+        # 状態はモデルの StateRole で保持し、変わった行だけ dataChanged で再描画させる
         parent_widget = self.parent()
-        if parent_widget:
+        model = getattr(parent_widget, 'model', None) if parent_widget else None
+        if model is not None and hasattr(model, 'set_video_state'):
             try:
-                # 全アイテムを再描画して現在の動画の枠線を維持
-                parent_widget.viewport().update()
-                print(f"Delegate: Updated all items to maintain current video border")
+                changed_ids = model.set_video_state(state, video_id)
+                print(f"Delegate: Updated rows for videos {sorted(changed_ids)}")
             except Exception as e:
-                print(f"Delegate: Error updating viewport: {e}")
+                print(f"Delegate: Error updating video state: {e}")
         else:
             print(f"Delegate: No parent widget available")
+
+    def clear_tile_cache(self):
+        """描画済みタイルのキャッシュを破棄する"""
+        self._tile_cache.clear()
     
     def sizeHint(self, option, index):
         """アイテムのサイズを返す"""
         return QSize(self.item_width, self.item_height)
-    
+
     def paint(self, painter, option, index):
-        """アイテムを描画する"""
-        # データを取得
-        data = index.data(Qt.DisplayRole)
-        if not data:
+        """アイテムを描画する（キャッシュ済みタイルを貼り付ける）"""
+        # 専用ロールで値を取得（描画ごとに辞書を組み立てない）
+        video_id = index.data(VideoIdRole)
+        if not video_id:
             return
+
+        title = index.data(TitleRole) or ''
+        duration = index.data(DurationRole) or ''
+        thumbnail = index.data(ThumbnailRole)
+        has_thumbnail = thumbnail is not None and not thumbnail.isNull()
+        state_flags = index.data(StateRole) or VIDEO_STATE_NONE
+        readiness = index.data(ReadinessRole)
+        selected = bool(option.state & QStyle.State_Selected)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        device = painter.device()
+        dpr = device.devicePixelRatioF() if device else 1.0
+
+        key = (
+            video_id,
+            thumbnail.cacheKey() if has_thumbnail else 0,
+            title,
+            duration,
+            state_flags,
+            readiness,
+            selected,
+            hovered,
+            dpr,
+        )
+        tile = self._tile_cache.get(key)
+        if tile is None:
+            tile = self._render_tile(title, duration, thumbnail if has_thumbnail else None, state_flags, readiness, selected, hovered, dpr)
+            self._tile_cache[key] = tile
+            while len(self._tile_cache) > self.TILE_CACHE_SIZE:
+                self._tile_cache.popitem(last=False)
+        else:
+            self._tile_cache.move_to_end(key)
+
+        painter.drawPixmap(option.rect.topLeft(), tile)
+
+    def _render_tile(self, title, duration, thumbnail, state_flags, readiness, selected, hovered, dpr):
+        """1アイテム分のタイルを QPixmap に描画する"""
+        tile = QPixmap(int(self.item_width * dpr), int(self.item_height * dpr))
+        tile.setDevicePixelRatio(dpr)
+        tile.fill(Qt.transparent)
+
+        painter = QPainter(tile)
+        try:
+            self._draw_tile(painter, title, duration, thumbnail, state_flags, readiness, selected, hovered)
+        finally:
+            painter.end()
+        return tile
+
+    def _draw_tile(self, painter, title, duration, thumbnail, state_flags, readiness, selected, hovered):
+        """タイルの内容を (0, 0) 起点で描画する"""
+        rect = QRect(0, 0, self.item_width, self.item_height)
         
         # 背景を描画
-        if option.state & QStyle.State_Selected:
+        if selected:
             # 選択状態：白背景
-            painter.fillRect(option.rect, QBrush(Qt.white))
-        elif option.state & QStyle.State_MouseOver:
-            painter.fillRect(option.rect, QColor(240, 240, 240))
+            painter.fillRect(rect, QBrush(Qt.white))
+        elif hovered:
+            painter.fillRect(rect, QColor(240, 240, 240))
         else:
-            painter.fillRect(option.rect, QBrush(Qt.white))
+            painter.fillRect(rect, QBrush(Qt.white))
         
         # サムネイル領域（アイテム全体を使用）
-        thumbnail_rect = QRect(
-            option.rect.left(),
-            option.rect.top(),
-            self.item_width,
-            self.item_height
-        )
+        thumbnail_rect = QRect(rect)
         
         # サムネイルを描画
-        thumbnail = data.get('thumbnail', None)
-        if thumbnail and not thumbnail.isNull():
+        if thumbnail is not None:
             # サムネイルが存在する場合 - アイテム全体にフィット
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
             scaled_pixmap = thumbnail.scaled(
                 thumbnail_rect.size(),
                 Qt.KeepAspectRatio,  # アスペクト比を維持
@@ -84,23 +160,17 @@ class YouTubeItemDelegate(QStyledItemDelegate):
             # サムネイルがない場合のプレースホルダー
             painter.fillRect(thumbnail_rect, QColor(230, 230, 230))
             painter.setPen(QColor(150, 150, 150))
-            font = QFont()
-            font.setPointSize(8)
-            painter.setFont(font)
+            painter.setFont(self._placeholder_font)
             painter.drawText(thumbnail_rect, Qt.AlignCenter, "No Image")
         
         # 動画時間を右下に表示
-        duration = data.get('duration', '')
         if duration:
-            font = QFont()
-            font.setPointSize(9)  # 小さめのサイズ
-            font.setBold(True)
-            painter.setFont(font)
+            painter.setFont(self._duration_font)
             
             # 時間表示の背景
             time_rect = QRect(
-                option.rect.right() - 45,  # 右端から45px
-                option.rect.bottom() - 23,  # 下端から23px
+                rect.right() - 45,  # 右端から45px
+                rect.bottom() - 23,  # 下端から23px
                 40,  # 幅
                 18   # 高さ
             )
@@ -114,8 +184,8 @@ class YouTubeItemDelegate(QStyledItemDelegate):
         
         # タイトル領域（上側に重ねて表示）
         title_rect = QRect(
-            option.rect.left(),
-            option.rect.top() + 5,  # 上端から5px
+            rect.left(),
+            rect.top() + 5,  # 上端から5px
             self.item_width,
             25  # 高さ
         )
@@ -125,11 +195,8 @@ class YouTubeItemDelegate(QStyledItemDelegate):
         painter.fillRect(title_rect, overlay_color)
         
         # タイトルを描画
-        title = data.get('title', '')
         if title:
-            font = QFont()
-            font.setPointSize(12)  # 大きくして読みやすく
-            painter.setFont(font)
+            painter.setFont(self._title_font)
             painter.setPen(QColor(255, 255, 255))  # 白色文字
             
             # 長いタイトルは省略
@@ -143,84 +210,50 @@ class YouTubeItemDelegate(QStyledItemDelegate):
             )
         
         # 選択状態の枠線を描画
-        if option.state & QStyle.State_Selected:
+        if selected:
             pen = QPen(QColor(165, 42, 42))  # 茶 #a52a2a
             pen.setWidth(4)
             painter.setPen(pen)
-            painter.drawRect(option.rect.adjusted(2, 2, -2, -2))
+            painter.drawRect(rect.adjusted(2, 2, -2, -2))
         
         # 状態を持つ動画の枠線と状態テキストを描画（選択状態に関わらず）- 最前面に表示
-        data = index.data(Qt.DisplayRole)
-        video_id = data.get('video_id', '') if data else ''
-
-        if self.preloaded_video_id == video_id and self.preloaded_state:
-            if self.preloaded_state == 'preloading':
-                border_color = QColor(250, 190, 1)  # #fabe01
-                status_text = "LOADING..."
-            else:
-                border_color = QColor(1, 154, 68)  # #019a44
-                status_text = "READY"
-            
-            # 枠線を描画
-            painter.setPen(QPen(border_color, 4))
-            painter.drawRect(option.rect.adjusted(2, 2, -2, -2))
-            
-            # 状態テキスト用の背景枠（左下）
-            font = QFont()
-            font.setPointSize(10)
-            font.setBold(True)
-            painter.setFont(font)
-            
-            # テキストサイズを計算
-            text_width = painter.fontMetrics().horizontalAdvance(status_text)
-            text_height = painter.fontMetrics().height()
-            
-            # 背景枠（左下に配置）
-            padding = 4
-            status_rect = QRect(
-                option.rect.left() + 8,  # 左端から8px
-                option.rect.bottom() - text_height - padding * 2 - 8,  # 下端から余白を引いて配置
-                text_width + padding * 2,  # テキスト幅 + 左右のパディング
-                text_height + padding * 2  # テキスト高さ + 上下のパディング
-            )
-            
-            # 背景を描画（枠の色と同じ）
-            painter.fillRect(status_rect, border_color)
-            
-            # 白抜き文字でテキストを描画
-            painter.setPen(QColor(255, 255, 255))  # 白色
-            painter.drawText(status_rect, Qt.AlignCenter, status_text)
+        if state_flags & VIDEO_STATE_PRELOADING:
+            self._draw_status(painter, rect, QColor(250, 190, 1), "LOADING...")  # #fabe01
+        elif state_flags & VIDEO_STATE_READY:
+            # 先読み量が付いていれば併記する（例: "READY 6s"）
+            self._draw_status(painter, rect, QColor(1, 154, 68), f"READY {readiness}" if readiness else "READY")  # #019a44
+        elif state_flags & VIDEO_STATE_WARM and not state_flags & VIDEO_STATE_PLAYING:
+            # 候補として先読み済み（PLAY で即座に切り替わる）
+            self._draw_status(painter, rect, QColor(0, 96, 48), "WARM")  # #006030
 
-        if self.playing_video_id == video_id:
-            border_color = QColor(0, 123, 255)  # 青色
-            status_text = "NOW PLAYING"
-            
-            # 枠線を描画
-            painter.setPen(QPen(border_color, 4))
-            painter.drawRect(option.rect.adjusted(2, 2, -2, -2))
-            
-            # 状態テキスト用の背景枠（左下）
-            font = QFont()
-            font.setPointSize(10)
-            font.setBold(True)
-            painter.setFont(font)
-            
-            # テキストサイズを計算
-            text_width = painter.fontMetrics().horizontalAdvance(status_text)
-            text_height = painter.fontMetrics().height()
-            
-            # 背景枠（左下に配置）
-            padding = 4
-            status_rect = QRect(
-                option.rect.left() + 8,  # 左端から8px
-                option.rect.bottom() - text_height - padding * 2 - 8,  # 下端から余白を引いて配置
-                text_width + padding * 2,  # テキスト幅 + 左右のパディング
-                text_height + padding * 2  # テキスト高さ + 上下のパディング
-            )
-            
-            # 背景を描画（枠の色と同じ）
-            painter.fillRect(status_rect, border_color)
-            
-            # 白抜き文字でテキストを描画
-            painter.setPen(QColor(255, 255, 255))  # 白色
-            painter.drawText(status_rect, Qt.AlignCenter, status_text)
+        if state_flags & VIDEO_STATE_PLAYING:
+            self._draw_status(painter, rect, QColor(0, 123, 255), "NOW PLAYING")  # 青色
+
+    def _draw_status(self, painter, rect, border_color, status_text):
+        """状態の枠線と左下の状態ラベルを描画する"""
+        # 枠線を描画
+        painter.setPen(QPen(border_color, 4))
+        painter.drawRect(rect.adjusted(2, 2, -2, -2))
+        
+        # 状態テキスト用の背景枠（左下）
+        painter.setFont(self._status_font)
+        
+        # テキストサイズを計算
+        text_width = painter.fontMetrics().horizontalAdvance(status_text)
+        text_height = painter.fontMetrics().height()
+        
+        # 背景枠（左下に配置）
+        padding = 4
+        status_rect = QRect(
+            rect.left() + 8,  # 左端から8px
+            rect.bottom() - text_height - padding * 2 - 8,  # 下端から余白を引いて配置
+            text_width + padding * 2,  # テキスト幅 + 左右のパディング
+            text_height + padding * 2  # テキスト高さ + 上下のパディング
+        )
+        
+        # 背景を描画（枠の色と同じ）
+        painter.fillRect(status_rect, border_color)
+        
+        # 白抜き文字でテキストを描画
+        painter.setPen(QColor(255, 255, 255))  # 白色
+        painter.drawText(status_rect, Qt.AlignCenter, status_text)
@@ -2,13 +2,42 @@ from PySide6.QtWidgets import QListView, QAbstractItemView
 from PySide6.QtCore import Qt, QSize, QAbstractListModel, QModelIndex
 from PySide6.QtGui import QPixmap
 
+# 動画項目のデータロール
+VideoItemRole = Qt.UserRole + 1   # VideoItem そのもの
+VideoIdRole = Qt.UserRole + 2
+TitleRole = Qt.UserRole + 3
+ThumbnailRole = Qt.UserRole + 4   # QPixmap（未取得なら None）
+DurationRole = Qt.UserRole + 5
+StateRole = Qt.UserRole + 6       # VIDEO_STATE_* のビットフラグ
+ReadinessRole = Qt.UserRole + 7   # プリロードの準備状況（READY に添える短いラベル。例: "6s"）
+
+# StateRole の値（プリロード状態と再生中は同時に立ちうる）
+VIDEO_STATE_NONE = 0
+VIDEO_STATE_PRELOADING = 1
+VIDEO_STATE_READY = 2
+VIDEO_STATE_PLAYING = 4
+VIDEO_STATE_WARM = 8      # プレイヤーの候補スロットで先読み済み（PLAY で即座に切り替わる）
+
+
 class YouTubeListModel(QAbstractListModel):
     """
     YouTube検索結果を管理するモデル
+    
+    video_id → 行番号 の索引を持ち、行の挿入・削除・更新を差分で通知する。
+    リセット（beginResetModel）は新しい検索結果を設定するときだけ行う。
+    各行は VideoItem で、デリゲートは専用ロールで値をそのまま受け取る。
     """
     def __init__(self, parent=None):
         super().__init__(parent)
         self._videos = []
+        self._row_by_id = {}  # video_id -> row
+        # 動画の状態表示（プリロード/再生中）
+        self._preloaded_state = None
+        self._preloaded_video_id = None
+        self._playing_video_id = None
+        self._state_by_id = {}  # video_id -> VIDEO_STATE_* フラグ
+        self._readiness_by_id = {}  # video_id -> 準備状況のラベル
+        self._warm_video_ids = set()  # 候補として先読み済みの video_id
     
     def rowCount(self, parent=QModelIndex()):
         return len(self._videos)
@@ -19,47 +48,184 @@ class YouTubeListModel(QAbstractListModel):
         
         video = self._videos[index.row()]
         
-        if role == Qt.DisplayRole:
-            return {
-                'video_id': video.get('video_id', ''),
-                'title': video.get('title', ''),
-                'thumbnail': video.get('thumbnail', QPixmap()),
-                'duration': video.get('duration', ''),
-                'url': video.get('url', '')
-            }
+        if role == TitleRole or role == Qt.DisplayRole:
+            return video.title
+        if role == ThumbnailRole:
+            return video.thumbnail
+        if role == DurationRole:
+            return video.duration
+        if role == VideoIdRole:
+            return video.video_id
+        if role == StateRole:
+            state = self._state_by_id.get(video.video_id, VIDEO_STATE_NONE)
+            if video.video_id in self._warm_video_ids:
+                state |= VIDEO_STATE_WARM
+            return state
+        if role == ReadinessRole:
+            if self._state_by_id.get(video.video_id, VIDEO_STATE_NONE) & VIDEO_STATE_READY:
+                return self._readiness_by_id.get(video.video_id)
+            return None
+        if role == VideoItemRole:
+            return video
         
         return None
     
+    def _reindex(self, start_row=0):
+        """start_row 以降の行番号索引を作り直す"""
+        for row in range(start_row, len(self._videos)):
+            self._row_by_id[self._videos[row].video_id] = row
+    
     def set_videos(self, videos):
-        """動画リストを設定"""
+        """動画リストを設定（新しい検索結果用。モデル全体をリセットする）"""
         self.beginResetModel()
-        self._videos = videos
+        self._videos = list(videos)
+        self._row_by_id = {}
+        self._reindex()
         self.endResetModel()
     
-    def update_thumbnail(self, video_id: str, thumbnail_image):
-        """指定された動画IDのサムネイルを更新"""
-        for i, video in enumerate(self._videos):
-            if video.get('video_id') == video_id:
-                # GUIスレッドでQImageからQPixmapに変換
-                from PySide6.QtGui import QPixmap
-                self._videos[i]['thumbnail'] = QPixmap.fromImage(thumbnail_image) if thumbnail_image else QPixmap()
-                # 該当インデックスのデータ変更を通知
-                index = self.index(i, 0)
-                self.dataChanged.emit(index, index)
-                print(f"YouTubeListModel: Updated thumbnail for video {video_id} at index {i}")
-                
-                # 選択状態を維持（親ビューから選択状態を取得）
-                parent_view = self.parent()
-                if parent_view and hasattr(parent_view, 'currentIndex'):
-                    current_index = parent_view.currentIndex()
-                    if current_index.isValid() and current_index.row() == i:
-                        # 選択を維持するために再設定
-                        parent_view.setCurrentIndex(current_index)
-                        print(f"YouTubeListModel: Maintained selection for video {video_id} at index {i}")
-                break
+    def append_videos(self, videos):
+        """動画を末尾に追加（既存の行・選択状態には触れない）"""
+        return self.insert_videos(len(self._videos), videos)
+    
+    def insert_videos(self, row, videos):
+        """指定行の位置に動画を挿入する。既に存在する video_id は無視する"""
+        new_videos = []
+        seen = set()
+        for video in videos:
+            video_id = video.video_id
+            if video_id in self._row_by_id or video_id in seen:
+                continue
+            seen.add(video_id)
+            new_videos.append(video)
+        if not new_videos:
+            return 0
+        
+        row = max(0, min(row, len(self._videos)))
+        self.beginInsertRows(QModelIndex(), row, row + len(new_videos) - 1)
+        self._videos[row:row] = new_videos
+        self._reindex(row)
+        self.endInsertRows()
+        return len(new_videos)
+    
+    def remove_video(self, video_id: str):
+        """指定された動画IDの行を削除する"""
+        row = self._row_by_id.get(video_id)
+        if row is None:
+            return False
+        
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._videos[row]
+        del self._row_by_id[video_id]
+        self._reindex(row)
+        self.endRemoveRows()
+        return True
+    
+    def update_video(self, video_id: str, **fields):
+        """指定された動画IDの項目を更新し、その行だけ dataChanged を通知する"""
+        row = self._row_by_id.get(video_id)
+        if row is None:
+            return False
+        
+        video = self._videos[row]
+        for name, value in fields.items():
+            setattr(video, name, value)
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index)
+        return True
+    
+    def set_video_state(self, state, video_id=None):
+        """動画の状態（preloading/ready/playing、None で全解除）を設定し、変わった行だけ通知する"""
+        if state == 'playing':
+            self._playing_video_id = video_id
+        elif state in ['preloading', 'ready']:
+            self._preloaded_state = state
+            self._preloaded_video_id = video_id
+            if state == 'preloading':
+                self._readiness_by_id.pop(video_id, None)
+        elif state is None:
+            self._preloaded_state = None
+            self._preloaded_video_id = None
+            self._playing_video_id = None
+            self._readiness_by_id.clear()
+        
+        new_states = {}
+        if self._preloaded_video_id and self._preloaded_state:
+            new_states[self._preloaded_video_id] = (
+                VIDEO_STATE_PRELOADING if self._preloaded_state == 'preloading' else VIDEO_STATE_READY
+            )
+        if self._playing_video_id:
+            new_states[self._playing_video_id] = new_states.get(self._playing_video_id, VIDEO_STATE_NONE) | VIDEO_STATE_PLAYING
+        
+        changed_ids = {
+            changed_id for changed_id in set(self._state_by_id) | set(new_states)
+            if self._state_by_id.get(changed_id) != new_states.get(changed_id)
+        }
+        self._state_by_id = new_states
+        
+        for changed_id in changed_ids:
+            row = self._row_by_id.get(changed_id)
+            if row is not None:
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index, [StateRole])
+        return changed_ids
+    
+    def set_video_readiness(self, video_id: str, label):
+        """プリロードの準備状況（READY 表示に添えるラベル、None で消去）を設定する"""
+        if label is None:
+            self._readiness_by_id.pop(video_id, None)
+        else:
+            self._readiness_by_id[video_id] = label
+        row = self._row_by_id.get(video_id)
+        if row is not None:
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index, [ReadinessRole])
+    
+    def set_warm_videos(self, video_ids):
+        """候補として先読み済みの動画を設定し、変わった行だけ通知する"""
+        video_ids = set(video_ids)
+        changed_ids = self._warm_video_ids ^ video_ids
+        self._warm_video_ids = video_ids
+        for changed_id in changed_ids:
+            row = self._row_by_id.get(changed_id)
+            if row is not None:
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index, [StateRole])
+        return changed_ids
+    
+    def row_of(self, video_id: str) -> int:
+        """動画IDの行番号を返す（存在しない場合は -1）"""
+        return self._row_by_id.get(video_id, -1)
+    
+    def clear_videos(self):
+        """すべての動画を削除"""
+        self.set_videos([])
+    
+    def update_thumbnail(self, video_id: str, thumbnail_image, is_preview: bool = False):
+        """指定された動画IDのサムネイルを更新
+        
+        is_preview=True の場合は小サイズのプレビュー。本サイズが既に表示されていれば無視し、
+        本サイズの取得に失敗した場合はプレビューをそのまま残す。
+        """
+        row = self._row_by_id.get(video_id)
+        if row is None:
+            return
+        
+        video = self._videos[row]
+        has_thumbnail = video.has_thumbnail()
+        if is_preview and has_thumbnail and not video.thumbnail_is_preview:
+            # 本サイズが先に届いている
+            return
+        if not is_preview and not thumbnail_image and has_thumbnail:
+            # 本サイズの取得失敗時はプレビューを維持
+            return
+        
+        # GUIスレッドでQImageからQPixmapに変換
+        thumbnail = QPixmap.fromImage(thumbnail_image) if thumbnail_image else QPixmap()
+        self.update_video(video_id, thumbnail=thumbnail, thumbnail_is_preview=is_preview)
+        print(f"YouTubeListModel: Updated {'preview ' if is_preview else ''}thumbnail for video {video_id} at index {row}")
     
     def get_video_at(self, index):
-        """指定インデックスの動画情報を取得"""
+        """指定インデックスの動画情報（VideoItem）を取得"""
         if 0 <= index < len(self._videos):
             return self._videos[index]
         return None
@@ -130,7 +296,7 @@ class YouTubeListView(QListView):
                 self.setCurrentIndex(first_index)
     
     def get_selected_video(self):
-        """選択中の動画情報を取得"""
+        """選択中の動画情報（VideoItem）を取得"""
         current_index = self.currentIndex()
         if current_index.isValid():
             return self.model.get_video_at(current_index.row())
@@ -1,20 +1,62 @@
 // VJ YouTube Player - A/B 2プレイヤーによるプリロード+滑らかな切り替え
 
+// プレイヤースロットのID（A/B が再生・次の再生先、残りは候補の先読み用）
+const SLOT_IDS = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H'];
+const DEFAULT_POOL_SIZE = 4;
+// この回数だけ再生に使ったプレイヤーは、空いたときに作り直す（長時間の運用でメモリが増え続けないように）
+const DEFAULT_RECYCLE_AFTER = 50;
+// 読み込み画質の初期値（アプリが回線の状況に合わせて PRELOAD の quality で上げ下げする）
+const DEFAULT_QUALITY = 'hd720';
+
 class VJPlayer {
     constructor() {
         this.players = {};
+        // プレイヤースロット（A/B に加え、複数の候補を先読みしておく非表示プレイヤー）
+        this.slotIds = SLOT_IDS.slice(0, this.getPoolSizeFromQuery());
         this.currentPlayer = 'A';
         this.nextPlayer = 'B';
         this.currentVideoId = null;
         this.nextVideoId = null;
-        this.isReady = { A: false, B: false };
-        this.pollingInterval = null;
+        this.isReady = this.perSlot(false);
+        // スロットごとに読み込んでいる動画と最終使用時刻（LRU で再利用する）
+        this.slotVideoIds = this.perSlot(null);
+        this.slotUsedAt = this.perSlot(0);
+        // プレイヤーの作り直し（?recycleAfter=N、0 で無効）
+        this.recycleAfter = this.getRecycleAfterFromQuery();
+        // 読み込み画質（?quality= で初期値、以降は PRELOAD などの quality で切り替わる）
+        this.preloadQuality = this.getQualityFromQuery();
+        // 再生中の再バッファ（止まった時刻。シーク直後の BUFFERING は数えない）
+        this.rebufferCount = 0;
+        this._stallStartedAt = null;
+        this._seekedAtMs = 0;
+        this.slotSwitchCount = this.perSlot(0);
+        this._recycles = {};              // slot -> 作り直し中の { player, elementId }
+        this._recycleSerial = 0;
+        this.recycledCount = 0;
+        this._startedAt = performance.now();
+        this._initialStatesDone = false;
+        // コマンド受信チャネル（WebSocket、使えない場合はロングポーリング）
+        this.socket = null;
+        // アプリ内出力（QtWebEngine）の QWebChannel ブリッジ
+        this.bridge = null;
+        this.heartbeatInterval = null;
+        this._wsFailures = 0;
+        this._longPolling = false;
+        this._destroyed = false;
+        // 処理済みコマンドの連番（サーバーの epoch が変わったらリセット）
+        this._commandEpoch = null;
+        this._lastSeq = 0;
         // 接続先ポートは、読み込んでいるページ（player.html）のポートに追従
         // 例: http://localhost:8080/player.html → 8080
         const pagePort = window.location.port ? parseInt(window.location.port, 10) : 80;
+        // 出力画面ごとのID（複数画面にコマンドを配信するため、タブごとに固有）
+        this.clientId = this.getClientId();
         this.pollingPort = Number.isFinite(pagePort) ? pagePort : 8080;
         this.pollingUrl = `${window.location.protocol}//${window.location.hostname}:${this.pollingPort}/poll`;
         this.feedbackUrl = `${window.location.protocol}//${window.location.hostname}:${this.pollingPort}/feedback`;
+        this.timeUrl = `${window.location.protocol}//${window.location.hostname}:${this.pollingPort}/time`;
+        const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        this.wsUrl = `${wsProtocol}//${window.location.hostname}:${this.pollingPort}/ws?clientId=${encodeURIComponent(this.clientId)}`;
 
         // デフォルト動画（起動時に自動再生）
         // player側で固定値を持たず、ツール側が player.html のクエリで渡す
@@ -22,12 +64,44 @@ class VJPlayer {
         this.defaultVideoId = this.getDefaultVideoIdFromQuery();
 
         // エラーループ抑止
-        this._fallbackAttempts = { A: 0, B: 0 };
-        this._lastErrorAtMs = { A: 0, B: 0 };
-        this._errorBurstCount = { A: 0, B: 0 };
-        this._lastErrorCode = { A: null, B: null };
-        this._lastPlayerState = { A: null, B: null };
-        this._lastPlayingAtMs = { A: 0, B: 0 };
+        this._fallbackAttempts = this.perSlot(0);
+        this._lastErrorAtMs = this.perSlot(0);
+        this._errorBurstCount = this.perSlot(0);
+        this._lastErrorCode = this.perSlot(null);
+        this._lastPlayerState = this.perSlot(null);
+        this._lastPlayingAtMs = this.perSlot(0);
+
+        // プリロードの準備完了判定
+        // 非表示のプレイヤーをミュートで再生→再生可能になったら一時停止し、先読みが十分たまったら ready を送る
+        this.readyBufferSeconds = 4;      // この秒数以上先読みできたら ready
+        this.readyBufferFraction = 0.25;  // 短い動画は全体のこの割合以上で ready
+        this.readyTimeoutMs = 10000;      // これを過ぎたらその時点の先読み量で ready（timedOut 付き）
+        this._warmups = {};               // slot -> { playerId, videoId, startedAt, paused, timer }
+
+        // サーバーとの時計合わせ（PLAY_AT の時刻をこちらの時計に換算する）
+        // サーバー時計 = Date.now() + clockOffsetMs。往復時間が最も短いサンプルの推定値を使う
+        this.clockOffsetMs = 0;
+        this.clockRttMs = null;
+        this._clockSamples = [];
+        this._clockRequests = {};         // WebSocket の応答待ち（id -> resolve）
+        this._clockRequestId = 0;
+        this._clockSyncInterval = null;
+        // PLAY_AT の予約と、playVideo から再生開始までの時間の推定（予約時刻より先に再生を始めておく）
+        this._scheduledPlay = null;       // { videoId, at, timer }
+        this._startLatencyMs = 150;
+
+        // 複数出力の再生位置の同期（?sync=1 の出力は再生位置を報告し、リーダーの SYNC に合わせる）
+        this.syncEnabled = new URLSearchParams(window.location.search).get('sync') === '1';
+        this.syncDeadbandMs = 80;         // これ以下のずれは補正しない
+        this.syncSeekThresholdMs = 500;   // これを超えたらシーク、未満は再生速度で寄せる
+        this.syncMaxNudgeMs = 3000;       // 再生速度を変えておく最長時間
+        this._positionInterval = null;
+        this._lastSyncAt = 0;             // 最後に SYNC を受けた時刻（performance.now）
+        this._syncHoldUntil = 0;          // シーク直後は補正を控える
+        this._nudge = null;               // { timer }
+        this._lastDriftMs = null;         // 次の position で報告するずれと補正
+        this._lastCorrection = null;
+        this._timeEstimate = { value: null, at: 0 };
 
         console.log('VJ Player initialized');
         this.init();
@@ -38,75 +112,42 @@ class VJPlayer {
         if (typeof YT !== 'undefined' && typeof YT.Player !== 'undefined') {
             console.log('YouTube API already loaded');
             this.createPlayers();
-            this.startPolling();
+            this.startCommandChannel();
         } else {
             console.log('Waiting for YouTube API...');
             window.onYouTubeIframeAPIReady = () => {
                 console.log('YouTube IFrame API ready');
                 this.createPlayers();
-                this.startPolling();
+                this.startCommandChannel();
             };
         }
     }
 
+    // スロットごとの初期値を持つオブジェクト
+    perSlot(value) {
+        const result = {};
+        this.slotIds.forEach(id => { result[id] = value; });
+        return result;
+    }
+
+    // プレイヤー数（?poolSize=N、2〜8。A/B の2つは常に使う）
+    getPoolSizeFromQuery() {
+        const params = new URLSearchParams(window.location.search);
+        const size = parseInt(params.get('poolSize') || '', 10);
+        if (!Number.isFinite(size)) {
+            return DEFAULT_POOL_SIZE;
+        }
+        return Math.max(2, Math.min(SLOT_IDS.length, size));
+    }
+
     createPlayers() {
         console.log('Creating players...');
         console.log('YT.Player available:', typeof YT.Player);
 
         try {
-            // プレイヤーAの作成
-            this.players.A = new YT.Player('playerA', {
-                height: '100vh',
-                width: '100vw',
-                playerVars: {
-                    autoplay: 0,
-                    controls: 0,
-                    enablejsapi: 1,
-                    mute: 1,
-                    playsinline: 1,
-                    origin: window.location.origin,
-                    rel: 0,           // 関連動画を非表示
-                    showinfo: 0,       // 動画情報を非表示
-                    modestbranding: 1,  // YouTubeロゴを最小化
-                    iv_load_policy: 3,  // アノテーションを非表示
-                    cc_load_policy: 0,  // 字幕を非表示
-                    fs: 0            // 全画面ボタンを非表示
-                },
-                events: {
-                    onReady: (event) => this.onPlayerReady('A', event),
-                    onStateChange: (event) => this.onPlayerStateChange('A', event),
-                    onError: (event) => this.onPlayerError('A', event)
-                }
-            });
-
-            // プレイヤーBの作成
-            this.players.B = new YT.Player('playerB', {
-                height: '100vh',
-                width: '100vw',
-                playerVars: {
-                    autoplay: 0,
-                    controls: 0,
-                    enablejsapi: 1,
-                    mute: 1,
-                    playsinline: 1,
-                    origin: window.location.origin,
-                    rel: 0,           // 関連動画を非表示
-                    showinfo: 0,       // 動画情報を非表示
-                    modestbranding: 1,  // YouTubeロゴを最小化
-                    iv_load_policy: 3,  // アノテーションを非表示
-                    cc_load_policy: 0,  // 字幕を非表示
-                    fs: 0            // 全画面ボタンを非表示
-                },
-                events: {
-                    onReady: (event) => this.onPlayerReady('B', event),
-                    onStateChange: (event) => this.onPlayerStateChange('B', event),
-                    onError: (event) => this.onPlayerError('B', event)
-                }
-            });
+            this.slotIds.forEach(slotId => this.createPlayer(slotId));
 
-            console.log('Players created');
-            console.log('Player A created:', !!this.players.A);
-            console.log('Player B created:', !!this.players.B);
+            console.log('Players created:', this.slotIds.map(id => `${id}=${!!this.players[id]}`).join(' '));
         } catch (error) {
             console.error('Error creating players:', error);
             // プレイヤー作成失敗時は手動再生案内を表示
@@ -114,6 +155,150 @@ class VJPlayer {
         }
     }
 
+    // 1スロット分のプレイヤーを作成（player.html にない C 以降のコンテナはここで追加する）
+    createPlayer(slotId) {
+        this.players[slotId] = this.newYTPlayer(slotId, `player${slotId}`, (event) => this.onPlayerReady(slotId, event));
+    }
+
+    // YT.Player を作成する。イベントはそのプレイヤーがスロットの現役のときだけ処理する（作り直し中の新しいプレイヤーを除く）
+    newYTPlayer(slotId, elementId, onReady) {
+        if (!document.getElementById(`player${slotId}Container`)) {
+            const container = document.createElement('div');
+            container.id = `player${slotId}Container`;
+            container.className = 'player-container hidden';
+            const placeholder = document.createElement('div');
+            placeholder.id = `player${slotId}`;
+            container.appendChild(placeholder);
+            document.getElementById('stage').appendChild(container);
+        }
+
+        const player = new YT.Player(elementId, {
+            height: '100vh',
+            width: '100vw',
+            playerVars: {
+                autoplay: 0,
+                controls: 0,
+                enablejsapi: 1,
+                mute: 1,
+                playsinline: 1,
+                origin: window.location.origin,
+                rel: 0,           // 関連動画を非表示
+                showinfo: 0,       // 動画情報を非表示
+                modestbranding: 1,  // YouTubeロゴを最小化
+                iv_load_policy: 3,  // アノテーションを非表示
+                cc_load_policy: 0,  // 字幕を非表示
+                fs: 0            // 全画面ボタンを非表示
+            },
+            events: {
+                onReady: onReady,
+                onStateChange: (event) => {
+                    if (this.players[slotId] === player) {
+                        this.onPlayerStateChange(slotId, event);
+                    }
+                },
+                onError: (event) => {
+                    if (this.players[slotId] === player) {
+                        this.onPlayerError(slotId, event);
+                    }
+                }
+            }
+        });
+        return player;
+    }
+
+    getQualityFromQuery() {
+        const params = new URLSearchParams(window.location.search);
+        return params.get('quality') || DEFAULT_QUALITY;
+    }
+
+    getRecycleAfterFromQuery() {
+        const params = new URLSearchParams(window.location.search);
+        const value = parseInt(params.get('recycleAfter') || '', 10);
+        return Number.isFinite(value) && value >= 0 ? value : DEFAULT_RECYCLE_AFTER;
+    }
+
+    // 空いたプレイヤーを必要なら作り直す（再生回数が上限に達した、または iframe フォールバックになっている）
+    maybeRecycleSlot(slotId) {
+        if (this._recycles[slotId] || typeof YT === 'undefined' || !YT.Player) {
+            return;
+        }
+        const container = document.getElementById(`player${slotId}Container`);
+        const isFallback = !!container && container.dataset.embedFallback === '1';
+        const worn = this.recycleAfter > 0 && this.slotSwitchCount[slotId] >= this.recycleAfter;
+        if (!container || !(isFallback || worn)) {
+            return;
+        }
+
+        // 新しいプレイヤーを同じコンテナに作り、準備ができてから差し替える（それまでは古いものが使える）
+        const elementId = `player${slotId}-r${++this._recycleSerial}`;
+        const placeholder = document.createElement('div');
+        placeholder.id = elementId;
+        placeholder.style.display = 'none';
+        container.appendChild(placeholder);
+        console.log(`Recycling player ${slotId} (${isFallback ? 'iframe fallback' : `${this.slotSwitchCount[slotId]} switches`})`);
+        const recycle = { elementId, player: null };
+        this._recycles[slotId] = recycle;
+        recycle.player = this.newYTPlayer(slotId, elementId, () => this.finishRecycle(slotId, recycle));
+    }
+
+    finishRecycle(slotId, recycle) {
+        if (this._recycles[slotId] !== recycle) {
+            return;
+        }
+        delete this._recycles[slotId];
+        // 準備中にこのスロットが使われ始めた場合は捨てて、次に空いたときにやり直す
+        if (slotId === this.currentPlayer || this.slotVideoIds[slotId]) {
+            try { recycle.player.destroy(); } catch (e) { /* noop */ }
+            const leftover = document.getElementById(recycle.elementId);
+            if (leftover) {
+                leftover.remove();
+            }
+            return;
+        }
+
+        const oldPlayer = this.players[slotId];
+        this.players[slotId] = recycle.player;
+        if (oldPlayer && typeof oldPlayer.destroy === 'function') {
+            try { oldPlayer.destroy(); } catch (e) { console.warn('destroy failed:', e); }
+        }
+        // 古いプレイヤー・フォールバックの iframe を取り除き、DOM ノードが増え続けないようにする
+        const container = document.getElementById(`player${slotId}Container`);
+        const iframe = recycle.player.getIframe();
+        Array.from(container.children).forEach(child => {
+            if (child !== iframe) {
+                child.remove();
+            }
+        });
+        iframe.style.display = '';
+        delete container.dataset.embedFallback;
+        delete container.dataset.embedVideoId;
+
+        this.slotSwitchCount[slotId] = 0;
+        this._fallbackAttempts[slotId] = 0;
+        this._errorBurstCount[slotId] = 0;
+        this._lastPlayerState[slotId] = null;
+        this.isReady[slotId] = true;
+        this.recycledCount += 1;
+        console.log(`Player ${slotId} recycled (${this.recycledCount} total)`);
+    }
+
+    // ハートビートに載せるリソースの状況（performance.memory は Chromium 系のみ）
+    getResourceStats() {
+        const stats = {
+            domNodes: document.getElementsByTagName('*').length,
+            iframes: document.getElementsByTagName('iframe').length,
+            recycled: this.recycledCount,
+            uptimeS: Math.round((performance.now() - this._startedAt) / 1000)
+        };
+        if (performance.memory) {
+            const mb = (bytes) => Math.round(bytes / 1048576 * 10) / 10;
+            stats.heapUsedMb = mb(performance.memory.usedJSHeapSize);
+            stats.heapTotalMb = mb(performance.memory.totalJSHeapSize);
+            stats.heapLimitMb = mb(performance.memory.jsHeapSizeLimit);
+        }
+        return stats;
+    }
+
     showManualPlayback() {
         console.log('Showing error notification');
         this.showErrorNotification('この動画は再生できません');
@@ -146,9 +331,11 @@ class VJPlayer {
             animation: slideIn 0.3s ease-out;
         `;
 
-        // アニメーションを追加
-        const style = document.createElement('style');
-        style.textContent = `
+        // アニメーションの定義は1回だけ追加する
+        if (!document.getElementById('vj-notification-style')) {
+            const style = document.createElement('style');
+            style.id = 'vj-notification-style';
+            style.textContent = `
             @keyframes slideIn {
                 from { transform: translateX(100%); opacity: 0; }
                 to { transform: translateX(0); opacity: 1; }
@@ -157,8 +344,9 @@ class VJPlayer {
                 from { transform: translateX(0); opacity: 1; }
                 to { transform: translateX(100%); opacity: 0; }
             }
-        `;
-        document.head.appendChild(style);
+            `;
+            document.head.appendChild(style);
+        }
 
         document.body.appendChild(notification);
 
@@ -173,6 +361,25 @@ class VJPlayer {
         }, 3000);
     }
 
+    // クライアントIDを取得（?clientId= で指定可能。未指定ならタブごとに生成して再読み込み後も維持）
+    getClientId() {
+        try {
+            const params = new URLSearchParams(window.location.search);
+            const fromQuery = params.get('clientId');
+            if (fromQuery && fromQuery.trim()) {
+                return fromQuery.trim();
+            }
+            let stored = window.sessionStorage.getItem('vjClientId');
+            if (!stored) {
+                stored = `player-${Math.random().toString(36).slice(2, 10)}`;
+                window.sessionStorage.setItem('vjClientId', stored);
+            }
+            return stored;
+        } catch (e) {
+            return `player-${Math.random().toString(36).slice(2, 10)}`;
+        }
+    }
+
     getDefaultVideoIdFromQuery() {
         try {
             const params = new URLSearchParams(window.location.search);
@@ -188,8 +395,9 @@ class VJPlayer {
         console.log(`Player ${playerId} is ready`);
         this.isReady[playerId] = true;
 
-        // 両方のプレイヤーが準備完了したら
-        if (this.isReady.A && this.isReady.B) {
+        // 両方のプレイヤーが準備完了したら（最初の1回だけ）
+        if (this.isReady.A && this.isReady.B && !this._initialStatesDone) {
+            this._initialStatesDone = true;
             console.log('Both players are ready');
             this.setupInitialStates();
         }
@@ -220,12 +428,13 @@ class VJPlayer {
             this.players.A.loadVideoById({
                 videoId: this.defaultVideoId,
                 startSeconds: 0,
-                suggestedQuality: 'medium' // 品質を下げて安定性を向上
+                suggestedQuality: this.preloadQuality
             });
 
             // 状態を更新
             this.currentVideoId = this.defaultVideoId;
             this.currentPlayer = 'A';
+            this.slotVideoIds.A = this.defaultVideoId;
 
             // 状態フィードバックを送信
             this.sendFeedback('playing', this.defaultVideoId);
@@ -240,11 +449,21 @@ class VJPlayer {
 
     onPlayerStateChange(playerId, event) {
         const state = event.data;
+        const previousState = this._lastPlayerState[playerId];
         this._lastPlayerState[playerId] = state;
         if (state === YT.PlayerState.PLAYING) {
             this._lastPlayingAtMs[playerId] = Date.now();
         }
         console.log(`Player ${playerId} state changed: ${state}`);
+        if (playerId === this.currentPlayer && !this._warmups[playerId]) {
+            this.trackRebuffer(playerId, previousState, state);
+        }
+
+        // プリロード中の非表示プレイヤーは ready 判定側で扱う
+        if (this._warmups[playerId]) {
+            this.onWarmupStateChange(playerId, state);
+            return;
+        }
 
         // isReady状態の更新
         if (state === YT.PlayerState.CUED || state === YT.PlayerState.PLAYING) {
@@ -261,6 +480,49 @@ class VJPlayer {
         }
     }
 
+    // アプリが選んだ読み込み画質を反映する（YouTube にとってはヒントで、必ずその画質になるとは限らない）
+    setPreloadQuality(quality) {
+        if (quality && quality !== this.preloadQuality) {
+            console.log(`Preload quality: ${this.preloadQuality} -> ${quality}`);
+            this.preloadQuality = quality;
+        }
+    }
+
+    // 実際に再生されている画質（取得できなければ null）
+    getPlaybackQuality(playerId) {
+        try {
+            return this.players[playerId].getPlaybackQuality() || null;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    // 再生中に止まった（PLAYING → BUFFERING）時間を計り、再開したら rebuffer として報告する
+    trackRebuffer(playerId, previousState, state) {
+        if (state === YT.PlayerState.BUFFERING && previousState === YT.PlayerState.PLAYING) {
+            if (performance.now() - this._seekedAtMs >= 1000) {
+                this._stallStartedAt = performance.now();
+            }
+            return;
+        }
+        if (this._stallStartedAt === null) {
+            return;
+        }
+        const stallMs = Math.round(performance.now() - this._stallStartedAt);
+        this._stallStartedAt = null;
+        if (state !== YT.PlayerState.PLAYING) {
+            return;  // 一時停止・停止で終わった場合は数えない
+        }
+        this.rebufferCount++;
+        console.log(`Rebuffered ${stallMs}ms on player ${playerId} (${this.rebufferCount} total)`);
+        this.sendFeedback('rebuffer', this.currentVideoId || '', {
+            stallMs: stallMs,
+            rebufferCount: this.rebufferCount,
+            quality: this.preloadQuality,
+            playbackQuality: this.getPlaybackQuality(playerId)
+        });
+    }
+
     onPlayerError(playerId, event) {
         console.error(`Player ${playerId} error:`, event);
         console.error(`Error code: ${event.data}`);
@@ -277,6 +539,16 @@ class VJPlayer {
 
         console.error(`Error description: ${errorCodes[event.data] || 'Unknown error'}`);
 
+        // 裏で先読みしているだけの候補は、フォールバックせずに候補から外す
+        if (playerId !== this.currentPlayer && !(playerId === this.nextPlayer && this.nextVideoId)) {
+            console.log(`Dropping preload candidate on player ${playerId} after error`);
+            this.cancelWarmup(playerId);
+            this.slotVideoIds[playerId] = null;
+            this.isReady[playerId] = false;
+            this.reportPool();
+            return;
+        }
+
         // 150/153はフォールバックしても改善しないことが多く、黒画面ループの原因になる。
         // この環境では埋め込み再生が成立しない可能性が高いので、通知を表示
         if (event.data === 150 || event.data === 153) {
@@ -547,36 +819,249 @@ class VJPlayer {
         }
     }
 
-    // コマンドポーリング開始
-    startPolling() {
-        console.log('Starting command polling...');
-        this._lastHeartbeatAt = 0;
-        this.pollingInterval = setInterval(() => {
-            this.pollCommands();
-        }, 100); // 100msごとにポーリング
+    // コマンド受信開始（WebSocket を優先し、使えなければロングポーリング）
+    startCommandChannel() {
+        // 定期的に生存信号（Heartbeat）を送信（5秒に1回）
+        this.heartbeatInterval = setInterval(() => this.sendHeartbeat(), 5000);
+
+        if (this.useQtBridge()) {
+            this.connectQtBridge();
+        } else if (typeof WebSocket !== 'undefined') {
+            this.connectWebSocket();
+        } else {
+            this.startLongPolling();
+        }
+
+        // 時計合わせ（起動時にまとめて測り、以降は定期的に測り直す）
+        this.syncClock(5);
+        this._clockSyncInterval = setInterval(() => this.syncClock(3), 30000);
+
+        // 再生位置の報告（同期が有効な場合のみ送る）
+        this._positionInterval = setInterval(() => this.reportPosition(), 1000);
+    }
+
+    // 生存信号（時計合わせの結果とリソースの状況も載せる）
+    sendHeartbeat() {
+        this.sendFeedback('HEARTBEAT', this.currentVideoId || '', {
+            clockOffsetMs: Math.round(this.clockOffsetMs * 10) / 10,
+            clockRttMs: this.clockRttMs === null ? null : Math.round(this.clockRttMs * 10) / 10,
+            resources: this.getResourceStats()
+        });
+    }
+
+    // 時計合わせを count 回行う（間隔を空けて測り、往復時間の短いサンプルを選ぶ）
+    async syncClock(count) {
+        for (let i = 0; i < count && !this._destroyed; i++) {
+            await this.sampleClock();
+            await new Promise(resolve => setTimeout(resolve, 150));
+        }
+    }
+
+    // 1回分の計測（NTP と同じ方式: offset = ((t1 - t0) + (t2 - t3)) / 2）
+    async sampleClock() {
+        const t0 = Date.now();
+        let reply;
+        try {
+            reply = await this.requestServerTime(t0);
+        } catch (error) {
+            console.warn('Clock sync failed:', error.message);
+            return;
+        }
+        const t3 = Date.now();
+        if (!reply || typeof reply.t1 !== 'number' || typeof reply.t2 !== 'number') {
+            return;
+        }
+        const rtt = (t3 - t0) - (reply.t2 - reply.t1);
+        const offset = ((reply.t1 - t0) + (reply.t2 - t3)) / 2;
+        this._clockSamples.push({ offset, rtt });
+        if (this._clockSamples.length > 8) {
+            this._clockSamples.shift();
+        }
+        const best = this._clockSamples.reduce((a, b) => (b.rtt < a.rtt ? b : a));
+        this.clockOffsetMs = best.offset;
+        this.clockRttMs = best.rtt;
+    }
+
+    // サーバーの時刻を問い合わせる（ブリッジ → WebSocket → HTTP の順）
+    requestServerTime(t0) {
+        if (this.bridge) {
+            return new Promise(resolve => this.bridge.clock(String(t0), reply => resolve(JSON.parse(reply))));
+        }
+        if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+            const id = ++this._clockRequestId;
+            return new Promise((resolve, reject) => {
+                this._clockRequests[id] = resolve;
+                this.socket.send(JSON.stringify({ type: 'time', id: id, t0: t0 }));
+                setTimeout(() => {
+                    if (this._clockRequests[id]) {
+                        delete this._clockRequests[id];
+                        reject(new Error('timeout'));
+                    }
+                }, 2000);
+            });
+        }
+        return fetch(`${this.timeUrl}?t0=${t0}`).then(response => response.json());
+    }
+
+    // サーバー時計の現在時刻（ミリ秒）
+    serverNow() {
+        return Date.now() + this.clockOffsetMs;
+    }
+
+    // アプリ内出力（?transport=qwebchannel）で、QWebChannel が使えるか
+    useQtBridge() {
+        const params = new URLSearchParams(window.location.search);
+        return params.get('transport') === 'qwebchannel'
+            && typeof QWebChannel !== 'undefined'
+            && typeof qt !== 'undefined' && !!qt.webChannelTransport;
+    }
+
+    // QWebChannel でアプリと直接接続（HTTP を経由せずにコマンドを受け取り、フィードバックを返す）
+    connectQtBridge() {
+        new QWebChannel(qt.webChannelTransport, (channel) => {
+            this.bridge = channel.objects.vjBridge;
+            this.bridge.commands.connect((message) => {
+                let batch;
+                try {
+                    batch = JSON.parse(message);
+                } catch (error) {
+                    console.error('Invalid bridge message:', message);
+                    return;
+                }
+                this.handleCommandBatch(batch);
+            });
+            console.log('Qt bridge connected');
+            // WebSocket の hello と同様に、接続時の状態を知らせる
+            this.sendSnapshot();
+        });
     }
 
-    // コマンドポーリング
-    async pollCommands() {
+    // WebSocket 接続（コマンドはサーバーからプッシュされる）
+    connectWebSocket() {
+        if (this._destroyed) {
+            return;
+        }
+
+        console.log('Connecting command WebSocket:', this.wsUrl);
+        let opened = false;
+        let socket;
         try {
-            // 定期的に生存信号（Heartbeat）を送信（5秒に1回）
-            const now = Date.now();
-            if (now - this._lastHeartbeatAt > 5000) {
-                this.sendFeedback('HEARTBEAT', this.currentVideoId || '');
-                this._lastHeartbeatAt = now;
+            socket = new WebSocket(this.wsUrl);
+        } catch (error) {
+            console.error('WebSocket unavailable:', error.message);
+            this.startLongPolling();
+            return;
+        }
+
+        socket.onopen = () => {
+            opened = true;
+            this._wsFailures = 0;
+            this.socket = socket;
+            console.log('Command WebSocket connected');
+            this.sendHeartbeat();
+            // 経路が変わったので時計を合わせ直す
+            this.syncClock(3);
+        };
+
+        socket.onmessage = (event) => {
+            let data;
+            try {
+                data = JSON.parse(event.data);
+            } catch (error) {
+                console.error('Invalid WebSocket message:', event.data);
+                return;
+            }
+            if (data.type === 'time') {
+                const resolve = this._clockRequests[data.id];
+                if (resolve) {
+                    delete this._clockRequests[data.id];
+                    resolve(data);
+                }
+            } else if (data.type === 'hello') {
+                // 接続時のハンドシェイク（アプリ再起動後も現在の状態を1往復で復元させる）
+                this.sendSnapshot();
+            } else if (data.type === 'commands') {
+                this.handleCommandBatch(data);
+                // 処理済みの末尾連番を ack として返す
+                if (socket.readyState === WebSocket.OPEN) {
+                    socket.send(JSON.stringify({ type: 'ack', ack: this._lastSeq, epoch: this._commandEpoch }));
+                }
+            }
+        };
+
+        socket.onclose = () => {
+            if (this.socket === socket) {
+                this.socket = null;
+            }
+            if (this._destroyed) {
+                return;
+            }
+            if (!opened) {
+                this._wsFailures += 1;
+            }
+            // 一度もつながらない状態が続く場合はロングポーリングに切り替える
+            if (this._wsFailures >= 3) {
+                console.log('WebSocket unavailable, falling back to long polling');
+                this.startLongPolling();
+            } else {
+                setTimeout(() => this.connectWebSocket(), 1000);
             }
+        };
+    }
 
-            const response = await fetch(this.pollingUrl);
-            const data = await response.json();
+    // ロングポーリング（コマンドが届くまでサーバー側で保持される）
+    async startLongPolling() {
+        if (this._longPolling) {
+            return;
+        }
+        this._longPolling = true;
+        console.log('Starting command long polling...');
 
-            if (data.cmd && data.cmd.trim()) {
-                console.log('Received command:', data);
-                this.processCommand(data);
+        while (this._longPolling && !this._destroyed) {
+            try {
+                // 前回のバッチの ack を次のポーリングに載せる
+                let url = `${this.pollingUrl}?wait=25&clientId=${encodeURIComponent(this.clientId)}`;
+                if (this._commandEpoch) {
+                    url += `&ack=${this._lastSeq}&epoch=${encodeURIComponent(this._commandEpoch)}`;
+                }
+                const response = await fetch(url);
+                const data = await response.json();
+
+                // 未配信のコマンドがまとめて届く
+                this.handleCommandBatch(data);
+            } catch (error) {
+                // ポーリングエラーを詳細表示し、少し待って再試行
+                console.error('Polling error:', error.message);
+                console.log('Polling URL:', this.pollingUrl);
+                await new Promise(resolve => setTimeout(resolve, 1000));
             }
-        } catch (error) {
-            // ポーリングエラーを詳細表示
-            console.error('Polling error:', error.message);
-            console.log('Polling URL:', this.pollingUrl);
+        }
+    }
+
+    // コマンドのバッチを処理（再送による重複は連番で除外）
+    handleCommandBatch(batch) {
+        if (batch.epoch && batch.epoch !== this._commandEpoch) {
+            // アプリが再起動して連番が振り直された
+            this._commandEpoch = batch.epoch;
+            this._lastSeq = 0;
+        }
+        if (batch.hello) {
+            // ロングポーリングでのハンドシェイク（サーバーの epoch を知らない最初の応答に付く）
+            this.sendSnapshot();
+        }
+
+        (batch.commands || []).forEach(command => {
+            if (command.seq && command.seq <= this._lastSeq) {
+                return;
+            }
+            if (command.cmd && command.cmd.trim()) {
+                console.log('Received command:', command);
+                this.processCommand(command);
+            }
+        });
+
+        if (batch.through && batch.through > this._lastSeq) {
+            this._lastSeq = batch.through;
         }
     }
 
@@ -587,11 +1072,25 @@ class VJPlayer {
 
         switch (cmd) {
             case 'PRELOAD':
+                this.setPreloadQuality(command.quality);
                 this.handlePreload(videoId);
                 break;
+            case 'PRELOAD_MANY':
+                // videoId にカンマ区切りで優先度順の候補が入る
+                this.setPreloadQuality(command.quality);
+                this.handlePreloadMany((videoId || '').split(',').map(id => id.trim()).filter(id => id));
+                break;
             case 'PLAY':
                 this.handlePlay(videoId);
                 break;
+            case 'PLAY_AT':
+                // at はサーバー時計の Unix ミリ秒
+                this.setPreloadQuality(command.quality);
+                this.handlePlayAt(videoId, Number(command.at));
+                break;
+            case 'SYNC':
+                this.handleSync(command);
+                break;
             case 'REWIND':
                 this.handleRewind(parseFloat(videoId) || 10);
                 break;
@@ -610,30 +1109,52 @@ class VJPlayer {
         }
 
         console.log(`Preloading video: ${videoId}`);
+
+        // 候補として先読み済みなら、そのスロットをそのまま次の再生先にする
+        const warmSlot = this.findSlot(videoId);
+        if (warmSlot) {
+            this.nextPlayer = warmSlot;
+            this.nextVideoId = videoId;
+            this.touchSlot(warmSlot);
+            this.sendFeedback('preloading', videoId);
+            if (!this._warmups[warmSlot] && this.isReady[warmSlot]) {
+                console.log(`Reusing warm player ${warmSlot}: ${videoId}`);
+                this.sendFeedback('ready', videoId, {
+                    ...this.bufferStats(warmSlot),
+                    timeToReadyMs: 0,
+                    timedOut: false,
+                    reused: true,
+                    quality: this.preloadQuality,
+                    playbackQuality: this.getPlaybackQuality(warmSlot)
+                });
+            }
+            // 先読み中ならウォームアップ完了時に ready が送られる
+            this.reportPool();
+            return;
+        }
+
+        this.nextPlayer = this.pickSlot();
         this.nextVideoId = videoId;
+        this.slotVideoIds[this.nextPlayer] = videoId;
+        this.touchSlot(this.nextPlayer);
 
         // 状態フィードバックを送信
         this.sendFeedback('preloading', videoId);
 
         // 次のプレイヤーが存在する場合は通常の cue を使う
         const nextPlayerObj = this.players[this.nextPlayer];
-        if (nextPlayerObj && typeof nextPlayerObj.cueVideoById === 'function') {
+        if (nextPlayerObj && typeof nextPlayerObj.loadVideoById === 'function') {
             try {
-                this.players[this.nextPlayer].cueVideoById({
+                // cue だけでは先読みされないため、ミュートで再生を始めてバッファさせる（再生可能になったら一時停止）
+                this.startWarmup(this.nextPlayer, videoId);
+                nextPlayerObj.loadVideoById({
                     videoId: videoId,
                     startSeconds: 0,
-                    suggestedQuality: 'hd720'
+                    suggestedQuality: this.preloadQuality
                 });
-
-                // プリロード完了後にready状態を送信
-                setTimeout(() => {
-                    if (this.nextVideoId === videoId) {
-                        this.sendFeedback('ready', videoId);
-                        console.log(`Video ready: ${videoId}`);
-                    }
-                }, 1000); // 1秒後にready状態を送信
             } catch (e) {
-                console.warn('cueVideoById failed, falling back to iframe:', e);
+                this.cancelWarmup(this.nextPlayer);
+                console.warn('loadVideoById failed, falling back to iframe:', e);
                 // iframe フォールバックとして埋め込む（autoplayはしない）
                 if (this.ensureIframeFor(this.nextPlayer, videoId, false)) {
                     // iframe の場合は即 ready 扱いにする
@@ -654,25 +1175,222 @@ class VJPlayer {
         }
     }
 
+    // 複数候補の先読み（PRELOAD_MANY）。再生中と次の再生先以外のスロットに、優先度順に読み込む
+    handlePreloadMany(videoIds) {
+        const reserved = [this.currentPlayer];
+        if (this.nextVideoId) {
+            reserved.push(this.nextPlayer);
+        }
+        const capacity = this.slotIds.length - reserved.length;
+        const wanted = videoIds.filter(id => id !== this.currentVideoId && id !== this.nextVideoId).slice(0, capacity);
+        console.log(`Preloading ${wanted.length} candidates:`, wanted);
+
+        wanted.forEach(videoId => {
+            const slot = this.findSlot(videoId);
+            if (slot) {
+                reserved.push(slot);
+                this.touchSlot(slot);
+                return;
+            }
+            const target = this.pickSlot(reserved);
+            if (!target || reserved.includes(target)) {
+                return;
+            }
+            reserved.push(target);
+            this.loadCandidate(target, videoId);
+        });
+        this.reportPool();
+    }
+
+    // 候補をスロットに読み込む（iframe フォールバックのスロットには読み込まない）
+    loadCandidate(slotId, videoId) {
+        const playerObj = this.players[slotId];
+        if (!playerObj || typeof playerObj.loadVideoById !== 'function') {
+            return;
+        }
+        console.log(`Warming candidate on player ${slotId}: ${videoId}`);
+        this.slotVideoIds[slotId] = videoId;
+        this.touchSlot(slotId);
+        try {
+            this.startWarmup(slotId, videoId);
+            playerObj.loadVideoById({ videoId: videoId, startSeconds: 0, suggestedQuality: this.preloadQuality });
+        } catch (e) {
+            console.warn(`Candidate preload failed on player ${slotId}:`, e);
+            this.cancelWarmup(slotId);
+            this.slotVideoIds[slotId] = null;
+        }
+    }
+
+    // 再生中以外で videoId を読み込んでいるスロット
+    findSlot(videoId) {
+        return this.slotIds.find(id => id !== this.currentPlayer && this.slotVideoIds[id] === videoId) || null;
+    }
+
+    // 新しく読み込むスロットを選ぶ（再生中・exclude 以外で、空き → 最も長く使っていないもの）
+    pickSlot(exclude = []) {
+        let candidates = this.slotIds.filter(id => id !== this.currentPlayer && !exclude.includes(id));
+        if (candidates.length === 0) {
+            candidates = this.slotIds.filter(id => id !== this.currentPlayer);
+        }
+        const free = candidates.find(id => !this.slotVideoIds[id]);
+        if (free) {
+            return free;
+        }
+        return candidates.sort((a, b) => this.slotUsedAt[a] - this.slotUsedAt[b])[0] || null;
+    }
+
+    touchSlot(slotId) {
+        this.slotUsedAt[slotId] = performance.now();
+    }
+
+    // スロットの先読み量
+    bufferStats(slotId) {
+        let fraction = 0;
+        let duration = 0;
+        try {
+            fraction = this.players[slotId].getVideoLoadedFraction() || 0;
+            duration = this.players[slotId].getDuration() || 0;
+        } catch (e) {
+            // プレイヤーが差し替えられた場合などは 0 のまま
+        }
+        return {
+            bufferedFraction: Math.round(fraction * 1000) / 1000,
+            bufferedSeconds: Math.round(fraction * duration * 10) / 10
+        };
+    }
+
+    // 先読み中の候補の一覧をアプリへ送る（ready のものは PLAY で即座に切り替えられる）
+    reportPool() {
+        this.sendFeedback('pool', '', { pool: this.getPoolState() });
+    }
+
+    getPoolState() {
+        return this.slotIds
+            .filter(id => id !== this.currentPlayer && this.slotVideoIds[id])
+            .map(id => ({ slot: id, videoId: this.slotVideoIds[id], ready: !!this.isReady[id] && !this._warmups[id] }));
+    }
+
+    // 先読み（ウォームアップ）開始。ready は十分にバッファされてから送る
+    startWarmup(playerId, videoId) {
+        this.cancelWarmup(playerId);
+        this.isReady[playerId] = false;
+        const warmup = { playerId, videoId, startedAt: performance.now(), paused: false, timer: null };
+        this._warmups[playerId] = warmup;
+
+        const check = () => {
+            if (this._warmups[playerId] !== warmup) {
+                return;
+            }
+            const stats = this.bufferStats(playerId);
+            const elapsedMs = performance.now() - warmup.startedAt;
+            const enough = warmup.paused && (
+                stats.bufferedSeconds >= this.readyBufferSeconds || stats.bufferedFraction >= this.readyBufferFraction
+            );
+
+            if (enough || elapsedMs >= this.readyTimeoutMs) {
+                delete this._warmups[playerId];
+                if (!warmup.paused) {
+                    // 再生可能にならないまま時間切れ（止めておかないと裏で再生が続く）
+                    try { this.players[playerId].pauseVideo(); } catch (e) { /* noop */ }
+                }
+                this.isReady[playerId] = true;
+                console.log(`Video ready on player ${playerId}: ${videoId} (buffered ${stats.bufferedSeconds}s, ${Math.round(elapsedMs)}ms${enough ? '' : ', timed out'})`);
+                // ready は次の再生先（PRELOAD された動画）だけ。候補は pool で知らせる
+                if (this.nextPlayer === playerId && this.nextVideoId === videoId) {
+                    this.sendFeedback('ready', videoId, {
+                        ...stats,
+                        timeToReadyMs: Math.round(elapsedMs),
+                        timedOut: !enough,
+                        quality: this.preloadQuality,
+                        playbackQuality: this.getPlaybackQuality(playerId)
+                    });
+                }
+                this.reportPool();
+                return;
+            }
+            warmup.timer = setTimeout(check, 100);
+        };
+        warmup.timer = setTimeout(check, 100);
+    }
+
+    // 先読み中のプレイヤーの状態変化（再生が始まったら一時停止して先頭に戻す）
+    onWarmupStateChange(playerId, state) {
+        const warmup = this._warmups[playerId];
+        if (state === YT.PlayerState.PLAYING && !warmup.paused) {
+            const player = this.players[playerId];
+            try {
+                player.pauseVideo();
+                if (player.getCurrentTime() > 0.5) {
+                    player.seekTo(0, true);
+                }
+                warmup.paused = true;
+                console.log(`Warmup playable after ${Math.round(performance.now() - warmup.startedAt)}ms on player ${playerId}: ${warmup.videoId}`);
+            } catch (e) {
+                console.warn('Warmup pause failed:', e);
+            }
+        }
+    }
+
+    // 先読みの中止（ready 判定をやめるだけで、読み込み済みのバッファは残す）
+    cancelWarmup(playerId) {
+        const warmup = this._warmups[playerId];
+        if (warmup) {
+            clearTimeout(warmup.timer);
+            delete this._warmups[playerId];
+        }
+    }
+
     // 再生処理
-    handlePlay(videoId) {
+    handlePlay(videoId, schedule = null) {
         if (!videoId) {
             return;
         }
+        if (!schedule) {
+            // 通常の PLAY は予約中の PLAY_AT より優先する
+            this.cancelScheduledPlay();
+        }
 
         console.log(`Playing video: ${videoId}`);
         console.log(`Current state: isReady[${this.nextPlayer}]=${this.isReady[this.nextPlayer]}, nextVideoId=${this.nextVideoId}`);
 
+        // 先読み済み・先読み中のスロットがあれば読み込み直さずに使う（候補として先読みした動画も含む）
+        const slot = this.findSlot(videoId);
+        if (slot) {
+            this.nextPlayer = slot;
+            this.nextVideoId = videoId;
+            const warmup = this._warmups[slot];
+            if (warmup) {
+                const playable = warmup.paused;
+                this.cancelWarmup(slot);
+                if (playable) {
+                    console.log(`Warm player ${slot} playable - switching immediately`);
+                    this.isReady[slot] = true;
+                    this.switchAndPlay(videoId, schedule);
+                } else {
+                    // まだ再生可能になっていない。通常の状態変化で isReady が立つのを待つ
+                    console.log(`Player ${slot} still warming - waiting`);
+                    this.waitForReadyAndSwitch(videoId, schedule);
+                }
+                return;
+            }
+        }
+
         if (this.isReady[this.nextPlayer] && this.nextVideoId === videoId) {
             // 準備完了している場合、即座に切り替え
             console.log('Ready - switching immediately');
-            this.switchAndPlay(videoId);
+            this.switchAndPlay(videoId, schedule);
             return;
         }
 
         // 準備完了していない場合、YT.Player があれば load、なければ iframe フォールバックを作る
         console.log('Not ready - loading and waiting');
+        if (!slot) {
+            this.nextPlayer = this.pickSlot();
+        }
+        this.cancelWarmup(this.nextPlayer);
         this.nextVideoId = videoId;
+        this.slotVideoIds[this.nextPlayer] = videoId;
+        this.touchSlot(this.nextPlayer);
 
         const nextPlayerObj = this.players[this.nextPlayer];
         if (nextPlayerObj && typeof nextPlayerObj.loadVideoById === 'function') {
@@ -680,7 +1398,7 @@ class VJPlayer {
                 nextPlayerObj.loadVideoById({
                     videoId: videoId,
                     startSeconds: 0,
-                    suggestedQuality: 'hd720'
+                    suggestedQuality: this.preloadQuality
                 });
             } catch (e) {
                 console.warn('loadVideoById failed, falling back to iframe:', e);
@@ -698,18 +1416,208 @@ class VJPlayer {
         }
 
         // ロード完了を待って切り替え
-        this.waitForReadyAndSwitch(videoId);
+        this.waitForReadyAndSwitch(videoId, schedule);
+    }
+
+    // 時刻指定の再生（at: サーバー時計の Unix ミリ秒）。その時刻にクロスフェードを始める
+    handlePlayAt(videoId, at) {
+        if (!videoId) {
+            return;
+        }
+        if (!Number.isFinite(at)) {
+            this.handlePlay(videoId);
+            return;
+        }
+        this.cancelScheduledPlay();
+
+        // 先読みされていなければ今から読み込む（候補として先読み済みならそのプレイヤーを使う）
+        this.handlePreload(videoId);
+
+        // 再生開始にかかる時間だけ早めに再生を始め、フェードは予定時刻に合わせる
+        const delayMs = at - this.serverNow();
+        const plan = { videoId: videoId, at: at, timer: null };
+        this._scheduledPlay = plan;
+        console.log(`PLAY_AT scheduled: ${videoId} in ${Math.round(delayMs)}ms (clock offset ${Math.round(this.clockOffsetMs)}ms)`);
+        plan.timer = setTimeout(() => {
+            if (this._scheduledPlay !== plan) {
+                return;
+            }
+            this._scheduledPlay = null;
+            this.handlePlay(videoId, { scheduledAt: at });
+        }, Math.max(0, delayMs - this._startLatencyMs));
+    }
+
+    cancelScheduledPlay() {
+        if (this._scheduledPlay) {
+            clearTimeout(this._scheduledPlay.timer);
+            console.log(`PLAY_AT cancelled: ${this._scheduledPlay.videoId}`);
+            this._scheduledPlay = null;
+        }
+    }
+
+    // サーバー時計で at になったら callback を呼ぶ（過ぎていれば即座に呼ぶ）
+    atServerTime(at, callback) {
+        const delayMs = at - this.serverNow();
+        if (delayMs > 0) {
+            setTimeout(callback, delayMs);
+        } else {
+            callback();
+        }
+    }
+
+    // PLAY_AT の切り替えを報告（予定時刻と実際にフェードを始めた時刻の差）
+    reportScheduledSwitch(videoId, schedule) {
+        const actualAt = this.serverNow();
+        const offsetMs = Math.round((actualAt - schedule.scheduledAt) * 10) / 10;
+        console.log(`Scheduled switch: ${offsetMs}ms from target`);
+        this.sendFeedback('playing', videoId, {
+            scheduledAt: schedule.scheduledAt,
+            actualAt: Math.round(actualAt),
+            offsetMs: offsetMs,
+            clockOffsetMs: Math.round(this.clockOffsetMs * 10) / 10
+        });
+    }
+
+    // 再生中のプレイヤーの現在位置（秒）
+    // getCurrentTime は iframe からの通知でまとめて更新されるため、値が変わった時刻から経過分を補う
+    estimateCurrentTime() {
+        const playerObj = this.players[this.currentPlayer];
+        if (!playerObj || typeof playerObj.getCurrentTime !== 'function') {
+            return null;
+        }
+        const now = performance.now();
+        let value;
+        let rate = 1;
+        try {
+            value = playerObj.getCurrentTime();
+            rate = playerObj.getPlaybackRate() || 1;
+        } catch (e) {
+            return null;
+        }
+        if (value !== this._timeEstimate.value) {
+            this._timeEstimate = { value: value, at: now };
+            return value;
+        }
+        if (this._lastPlayerState[this.currentPlayer] !== YT.PlayerState.PLAYING) {
+            return value;
+        }
+        return value + (now - this._timeEstimate.at) / 1000 * rate;
+    }
+
+    // 再生位置を報告する（リーダーの位置は SYNC として全出力へ配信される）
+    reportPosition() {
+        const following = performance.now() - this._lastSyncAt < 10000;
+        if (!this.currentVideoId || !(this.syncEnabled || following)) {
+            return;
+        }
+        const currentTime = this.estimateCurrentTime();
+        if (currentTime === null) {
+            return;
+        }
+        let playbackRate = 1;
+        try {
+            playbackRate = this.players[this.currentPlayer].getPlaybackRate() || 1;
+        } catch (e) {
+            // 取得できなければ等速とみなす
+        }
+        this.sendFeedback('position', this.currentVideoId, {
+            currentTime: Math.round(currentTime * 1000) / 1000,
+            playbackRate: playbackRate,
+            playing: this._lastPlayerState[this.currentPlayer] === YT.PlayerState.PLAYING,
+            sampledAt: Math.round(this.serverNow()),
+            driftMs: this._lastDriftMs,
+            correction: this._lastCorrection
+        });
+        this._lastDriftMs = null;
+        this._lastCorrection = null;
+    }
+
+    // リーダーの再生位置（SYNC）に合わせる。小さいずれは再生速度、大きいずれはシークで補正する
+    handleSync(command) {
+        if (command.leader === this.clientId) {
+            return;
+        }
+        this._lastSyncAt = performance.now();
+        if (command.videoId !== this.currentVideoId || this._nudge || performance.now() < this._syncHoldUntil) {
+            return;
+        }
+        const playerObj = this.players[this.currentPlayer];
+        if (!playerObj || typeof playerObj.seekTo !== 'function'
+            || this._lastPlayerState[this.currentPlayer] !== YT.PlayerState.PLAYING) {
+            return;
+        }
+        const currentTime = this.estimateCurrentTime();
+        if (currentTime === null) {
+            return;
+        }
+
+        // リーダーが位置を測った時刻からの経過分を進める（ループ再生なので動画の長さで折り返す）
+        let expected = command.position + (this.serverNow() - command.at) / 1000 * (command.rate || 1);
+        const duration = playerObj.getDuration ? playerObj.getDuration() : 0;
+        if (duration > 0) {
+            expected %= duration;
+        }
+        let driftMs = (currentTime - expected) * 1000;
+        if (duration > 0 && Math.abs(driftMs) > duration * 500) {
+            // ループの境目をまたいでいる
+            driftMs -= Math.sign(driftMs) * duration * 1000;
+        }
+        this._lastDriftMs = Math.round(driftMs * 10) / 10;
+
+        if (Math.abs(driftMs) <= this.syncDeadbandMs) {
+            return;
+        }
+        if (Math.abs(driftMs) >= this.syncSeekThresholdMs) {
+            console.log(`Sync: drift ${Math.round(driftMs)}ms - seeking to ${expected.toFixed(2)}s`);
+            this._seekedAtMs = performance.now();
+            playerObj.seekTo(expected, true);
+            this._lastCorrection = 'seek';
+            this._syncHoldUntil = performance.now() + 2000;
+            return;
+        }
+        this.nudgePlaybackRate(playerObj, driftMs);
+    }
+
+    // 再生速度を一時的に変えてずれを詰める
+    // YouTube は決まった速度しか受け付けないため、使える速度のうち等速に最も近いものを使い、時間で調整する
+    nudgePlaybackRate(playerObj, driftMs) {
+        let rates = [];
+        try {
+            rates = playerObj.getAvailablePlaybackRates() || [];
+        } catch (e) {
+            rates = [];
+        }
+        // 進んでいる（drift > 0）なら遅く、遅れているなら速くする
+        const candidates = rates.filter(rate => (driftMs > 0 ? rate < 1 : rate > 1));
+        if (candidates.length === 0) {
+            return;
+        }
+        const rate = candidates.reduce((a, b) => (Math.abs(b - 1) < Math.abs(a - 1) ? b : a));
+        const durationMs = Math.min(this.syncMaxNudgeMs, Math.abs(driftMs) / Math.abs(rate - 1));
+        console.log(`Sync: drift ${Math.round(driftMs)}ms - playbackRate ${rate} for ${Math.round(durationMs)}ms`);
+        try {
+            playerObj.setPlaybackRate(rate);
+        } catch (e) {
+            return;
+        }
+        this._lastCorrection = 'nudge';
+        this._nudge = {
+            timer: setTimeout(() => {
+                try { playerObj.setPlaybackRate(1); } catch (e) { /* noop */ }
+                this._nudge = null;
+            }, durationMs)
+        };
     }
 
     // 準備完了を待って切り替え
-    waitForReadyAndSwitch(videoId) {
+    waitForReadyAndSwitch(videoId, schedule = null) {
         const checkReady = () => {
             // YT.Player が消えて iframe フォールバックになっている場合、iframe が目的の動画を指していれば即座に切替
             const nextContainer = document.getElementById(`player${this.nextPlayer}Container`);
             const iframePresent = nextContainer && nextContainer.dataset && nextContainer.dataset.embedFallback === '1' && nextContainer.dataset.embedVideoId === videoId;
 
             if ((this.isReady[this.nextPlayer] && this.nextVideoId === videoId) || iframePresent) {
-                this.switchAndPlay(videoId);
+                this.switchAndPlay(videoId, schedule);
             } else {
                 setTimeout(checkReady, 100);
             }
@@ -726,6 +1634,7 @@ class VJPlayer {
             try {
                 const currentTime = currentPlayerObj.getCurrentTime();
                 const newTime = Math.max(0, currentTime - seconds);
+                this._seekedAtMs = performance.now();
                 currentPlayerObj.seekTo(newTime, true);
                 console.log(`Rewound to ${newTime} seconds`);
             } catch (error) {
@@ -746,6 +1655,7 @@ class VJPlayer {
                 const currentTime = currentPlayerObj.getCurrentTime();
                 const duration = currentPlayerObj.getDuration();
                 const newTime = Math.min(duration || currentTime + seconds, currentTime + seconds);
+                this._seekedAtMs = performance.now();
                 currentPlayerObj.seekTo(newTime, true);
                 console.log(`Forwarded to ${newTime} seconds`);
             } catch (error) {
@@ -756,8 +1666,8 @@ class VJPlayer {
         }
     }
 
-    // プレイヤー切り替えと再生
-    switchAndPlay(videoId) {
+    // プレイヤー切り替えと再生（schedule があれば、その時刻にフェードを始める）
+    switchAndPlay(videoId, schedule = null) {
         console.log(`Switching to player ${this.nextPlayer} with video: ${videoId}`);
 
         // DOMの準備状態を確認
@@ -768,11 +1678,19 @@ class VJPlayer {
         });
 
         // 状態更新（切り替え前に実行）
+        const wasPreloaded = this.nextVideoId === videoId && !!this.isReady[this.nextPlayer];
         const oldPlayer = this.currentPlayer;
         const oldPlayerObj = this.players[oldPlayer];
         this.currentVideoId = videoId;
         this.currentPlayer = this.nextPlayer;
-        this.nextPlayer = this.nextPlayer === 'A' ? 'B' : 'A';
+        this._stallStartedAt = null;
+        this.slotVideoIds[this.currentPlayer] = videoId;
+        this.touchSlot(this.currentPlayer);
+        this.slotSwitchCount[this.currentPlayer] += 1;
+        // 前のプレイヤーはフェード後に停止するので空きスロットにする。次の再生先はフェード中のものを避けて選ぶ
+        this.slotVideoIds[oldPlayer] = null;
+        this.isReady[oldPlayer] = false;
+        this.nextPlayer = this.pickSlot([oldPlayer]);
         this.nextVideoId = null;
 
         // プレイヤー切り替え（フェード処理付き）
@@ -790,6 +1708,7 @@ class VJPlayer {
             // 新しい動画を再生開始（フェードは待機）
             const nextPlayerObj = this.players[this.currentPlayer];
             let videoStarted = false;
+            const playRequestedAt = performance.now();
 
             if (nextPlayerObj && typeof nextPlayerObj.playVideo === 'function') {
                 try {
@@ -824,6 +1743,9 @@ class VJPlayer {
 
                 // 同時にフェード開始
                 requestAnimationFrame(() => {
+                    if (schedule) {
+                        this.reportScheduledSwitch(videoId, schedule);
+                    }
                     // 現在のプレイヤーをフェードアウト
                     currentContainer.style.opacity = '0';
                     currentContainer.classList.remove('active');
@@ -835,7 +1757,8 @@ class VJPlayer {
 
                 // フェードアウト完了後に古い動画を停止
                 setTimeout(() => {
-                    if (oldPlayerObj && typeof oldPlayerObj.stopVideo === 'function') {
+                    // フェード中にそのスロットへ別の動画が読み込まれていたら止めない
+                    if (!this.slotVideoIds[oldPlayer] && oldPlayerObj && typeof oldPlayerObj.stopVideo === 'function') {
                         try {
                             oldPlayerObj.stopVideo();
                             console.log('Stopped previous video after fade-out');
@@ -843,6 +1766,9 @@ class VJPlayer {
                             console.warn('stopVideo failed:', e);
                         }
                     }
+                    if (!this.slotVideoIds[oldPlayer] && oldPlayer !== this.currentPlayer) {
+                        this.maybeRecycleSlot(oldPlayer);
+                    }
                     // z-indexをリセット
                     currentContainer.classList.remove('crossfade-out');
                     nextContainer.classList.remove('crossfade-in');
@@ -850,12 +1776,25 @@ class VJPlayer {
             };
 
             if (videoStarted) {
-                // プリロード済みかどうかで待機時間を調整
-                // プリロード済み（ready状態）なら即フェード、未プリロードなら300ms待機
-                const wasPreloaded = this.nextVideoId === videoId;
-                const waitTime = wasPreloaded ? 50 : 300; // プリロード済みは50ms、未プリロードは300ms
-                console.log(`Video was preloaded: ${wasPreloaded}, waiting ${waitTime}ms before fade`);
-                setTimeout(startFade, waitTime);
+                // 実際に再生が始まってからフェードする（黒いフレームを出さない）
+                // 待ちすぎないよう、プリロード済みは最大500ms、未プリロードは最大3秒で打ち切る
+                const maxWait = wasPreloaded ? 500 : 3000;
+                console.log(`Video was preloaded: ${wasPreloaded}, waiting up to ${maxWait}ms for playback before fade`);
+                const playerId = this.currentPlayer;
+                this.whenPlaying(playerId, maxWait, () => {
+                    if (this._lastPlayerState[playerId] === YT.PlayerState.PLAYING) {
+                        // 再生開始までの時間を学習し、次の PLAY_AT で早めに再生を始める量にする
+                        const latency = performance.now() - playRequestedAt;
+                        this._startLatencyMs = Math.min(1000, this._startLatencyMs * 0.8 + latency * 0.2);
+                    }
+                    if (schedule) {
+                        this.atServerTime(schedule.scheduledAt, startFade);
+                    } else {
+                        startFade();
+                    }
+                });
+            } else if (schedule) {
+                this.atServerTime(schedule.scheduledAt, startFade);
             } else {
                 // 再生開始できなかった場合は即時フェード
                 startFade();
@@ -885,35 +1824,111 @@ class VJPlayer {
 
             // フォールバック時も古い動画は停止
             setTimeout(() => {
-                if (oldPlayerObj && typeof oldPlayerObj.stopVideo === 'function') {
+                if (!this.slotVideoIds[oldPlayer] && oldPlayerObj && typeof oldPlayerObj.stopVideo === 'function') {
                     try { oldPlayerObj.stopVideo(); } catch (e) { console.warn('stopVideo failed:', e); }
                 }
             }, 500);
         }
 
-        // 状態フィードバックを送信
-        this.sendFeedback('playing', videoId);
+        // 状態フィードバックを送信（PLAY_AT はフェード開始時に時刻のずれを付けて送る）
+        if (!schedule) {
+            this.sendFeedback('playing', videoId);
+        } else if (!currentContainer || !nextContainer) {
+            this.reportScheduledSwitch(videoId, schedule);
+        }
+        this.reportPool();
 
         console.log(`Switch complete. Current player: ${this.currentPlayer}`);
     }
 
+    // プレイヤーが再生状態になったら（または maxWaitMs 経過したら）callback を呼ぶ
+    whenPlaying(playerId, maxWaitMs, callback) {
+        const startedAt = performance.now();
+        const check = () => {
+            const playerObj = this.players[playerId];
+            const hasApi = playerObj && typeof playerObj.getPlayerState === 'function';
+            // iframe フォールバックでは状態が取れないので、従来どおり少し待つだけにする
+            if (!hasApi) {
+                setTimeout(callback, 300);
+                return;
+            }
+            if (this._lastPlayerState[playerId] === YT.PlayerState.PLAYING || performance.now() - startedAt >= maxWaitMs) {
+                callback();
+                return;
+            }
+            setTimeout(check, 20);
+        };
+        check();
+    }
+
     // ポーリングポート設定
     setPollingPort(port) {
         this.pollingPort = port;
         this.pollingUrl = `http://127.0.0.1:${port}/poll`;
         this.feedbackUrl = `http://127.0.0.1:${port}/feedback`;
+        this.timeUrl = `http://127.0.0.1:${port}/time`;
+        this.wsUrl = `ws://127.0.0.1:${port}/ws?clientId=${encodeURIComponent(this.clientId)}`;
         console.log(`Polling URL updated: ${this.pollingUrl}`);
+        // 接続中の WebSocket は閉じて新しいポートへ再接続させる
+        if (this.socket) {
+            this.socket.close();
+        }
+    }
+
+    // 現在の A/B プレイヤーの状態（アプリ側が再起動後に表示を復元するために使う）
+    getStateSnapshot() {
+        const currentPlayerObj = this.players[this.currentPlayer];
+        let currentTime = null;
+        if (currentPlayerObj && typeof currentPlayerObj.getCurrentTime === 'function') {
+            try {
+                currentTime = currentPlayerObj.getCurrentTime();
+            } catch (e) {
+                currentTime = null;
+            }
+        }
+        const playerState = this._lastPlayerState[this.currentPlayer];
+        return {
+            currentVideoId: this.currentVideoId,
+            currentPlayer: this.currentPlayer,
+            playing: !!this.currentVideoId && (typeof YT === 'undefined' || playerState !== YT.PlayerState.PAUSED),
+            currentTime: currentTime,
+            nextVideoId: this.nextVideoId,
+            nextPlayer: this.nextPlayer,
+            nextReady: !!this.nextVideoId && !!this.isReady[this.nextPlayer],
+            pool: this.getPoolState()
+        };
+    }
+
+    // 状態スナップショットを送信（hello への応答）
+    sendSnapshot() {
+        const snapshot = this.getStateSnapshot();
+        console.log('Sending state snapshot:', snapshot);
+        this.sendFeedback('snapshot', snapshot.currentVideoId || '', snapshot);
     }
 
     // 状態フィードバック送信
-    async sendFeedback(state, videoId) {
+    async sendFeedback(state, videoId, extra = {}) {
         try {
             const feedbackData = {
+                ...extra,
                 state: state,
                 videoId: videoId,
+                clientId: this.clientId,
                 timestamp: Date.now()
             };
 
+            // アプリ内出力ではブリッジで直接返す
+            if (this.bridge) {
+                this.bridge.feedback(JSON.stringify(feedbackData));
+                return;
+            }
+
+            // WebSocket 接続中は同じ接続で返す
+            if (this.socket && this.socket.readyState === WebSocket.OPEN) {
+                this.socket.send(JSON.stringify({ type: 'feedback', ...feedbackData }));
+                return;
+            }
+
             const response = await fetch(this.feedbackUrl, {
                 method: 'POST',
                 headers: {
@@ -935,8 +1950,20 @@ class VJPlayer {
 
     // 破棄
     destroy() {
-        if (this.pollingInterval) {
-            clearInterval(this.pollingInterval);
+        this._destroyed = true;
+        this._longPolling = false;
+        if (this.heartbeatInterval) {
+            clearInterval(this.heartbeatInterval);
+        }
+        if (this._clockSyncInterval) {
+            clearInterval(this._clockSyncInterval);
+        }
+        if (this._positionInterval) {
+            clearInterval(this._positionInterval);
+        }
+        this.cancelScheduledPlay();
+        if (this.socket) {
+            this.socket.close();
         }
 
         // プレイヤーの破棄